@@ -1,123 +1,603 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from .models.base import Base, engine, get_db
-from .services.ai_service import AIAssistant
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models.base import engine, async_engine, get_async_db, SessionLocal, AsyncSessionLocal
+from .services.ai_service import get_ai_assistant
+from .services.task_service import TaskService
+from .services.meeting_service import MeetingService
+from .services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .services.change_tracker import ChangeTracker, MAX_CHANGES
+from .services.event_hub import event_hub
+from .migrate import migrate
+from .worker import BackgroundServices
+from .services.logging_config import configure_logging, SAMPLED
+from .services.tracing import TracingMiddleware, trace_database
+from .services.calendar_sync import CalendarLinks, CalendarLinkError
+from .services.jobs import JobQueue
+from .services.projections import (
+    TASK_ROW, MEETING_ROW, TaskOut, MeetingOut, TaskPage, MeetingPage, ChangeFeed, dumps, json_response
+)
+from .services.auth_service import (
+    AuthService, AuthError, SigningKeyMissing, ANONYMOUS_USER_ID, current_user_id, signing_key, websocket_user_id
+)
 from .models.models import Task, Meeting
-from datetime import datetime
-from pydantic import BaseModel
+from config.settings import settings
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import json
 import logging
-import os
+import re
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Ensure OpenAI API key is set
-if not os.getenv('OPENAI_API_KEY'):
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+router = APIRouter()
 
-app = FastAPI()
-ai_assistant = AIAssistant()
-
-# CORS setup
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+EXPORT_BATCH_SIZE = 500
 
 class MessageRequest(BaseModel):
     message: str
 
-@app.post("/api/chat")
-async def chat(message: MessageRequest, db: Session = Depends(get_db)):
+class BatchMessageRequest(BaseModel):
+    messages: List[str] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+
+# Only the fields a PATCH sends are changed (see model_fields_set)
+class TaskUpdate(BaseModel):
+    # Naive times are wall-clock times in TIMEZONE; null clears the due time
+    due_at: Optional[datetime] = None
+
+class MeetingUpdate(BaseModel):
+    # Null turns the meeting's reminder off
+    reminder_minutes: Optional[int] = Field(None, ge=0, le=7 * 24 * 60)
+
+class CalendarLinkRequest(BaseModel):
+    # The characters Google calendar ids use, e.g. "en.usa#holiday@group.v.calendar.google.com";
+    # omitted, the account email, i.e. the user's primary calendar
+    calendar_id: Optional[str] = Field(None, min_length=1, max_length=1024, pattern=r"^[A-Za-z0-9_.+#@-]+$")
+
+class Credentials(BaseModel):
+    email: str = Field(min_length=3, max_length=254, pattern=r"^[^@\s]+@[^@\s]+$")
+    password: str = Field(min_length=8, max_length=128)
+
+def build_action_row(action_data: dict, user_id: int):
+    """Returns ``(row, reply)`` for actions that insert a row, else ``None``."""
+    if action_data["action"] == "add_task":
+        task = Task(
+            user_id=user_id,
+            title=action_data["task"]
+        )
+        return task, f"✅ Task added: {task.title}"
+        
+    elif action_data["action"] == "schedule_meeting":
+        meeting = Meeting(
+            user_id=user_id,
+            title=action_data["meeting"]["title"],
+            start_time=datetime.fromisoformat(action_data["meeting"]["start_time"]),
+            end_time=datetime.fromisoformat(action_data["meeting"]["end_time"])
+        )
+        return meeting, f"📅 Meeting scheduled: {meeting.title}"
+
+    return None
+
+async def execute_action(response: dict, db: AsyncSession, user_id: int) -> dict:
+    if response["type"] != "action":
+        return response
+
+    action_data = response["content"]
+    logger.info(f"Processing action: {action_data['action']}", extra=SAMPLED)
+
+    built = build_action_row(action_data, user_id)
+    if built:
+        # Create task or meeting in database
+        row, reply = built
+        db.add(row)
+        await db.commit()
+        logger.info(f"{type(row).__name__} created: {row.id}", extra=SAMPLED)
+        return {"type": "message", "content": reply}
+
+    return response
+
+async def execute_batch(messages: List[str], db: AsyncSession, user_id: int) -> List[dict]:
+    """Classifies all messages concurrently, then applies the results.
+
+    Lookups, completions and deletions run in message order; every new task
+    and meeting is then written in one transaction, so an item can't refer
+    to a row added earlier in the same batch.
+    """
+    assistant = get_ai_assistant()
+    limiter = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def classify(message: str) -> dict:
+        async with limiter:
+            return await assistant.classify_async(message)
+
+    parsed = await asyncio.gather(*(classify(message) for message in messages))
+
+    results = [None] * len(messages)
+    inserts = []
+    for index, (message, parsed_response) in enumerate(zip(messages, parsed)):
+        try:
+            response = await assistant.handle_parsed_async(parsed_response, db, user_id)
+            built = build_action_row(response["content"], user_id) if response["type"] == "action" else None
+            if built:
+                inserts.append((index, *built))
+                continue
+            results[index] = {"message": message, "status": "ok", "response": response}
+        except Exception as e:
+            logger.error(f"Error processing batch item {index}: {str(e)}")
+            results[index] = {"message": message, "status": "error", "detail": str(e)}
+
+    # All new rows go in with a single flush and commit
     try:
-        logger.info(f"Received message: {message.message}")
+        db.add_all([row for _, row, _ in inserts])
+        await db.commit()
+        for index, row, reply in inserts:
+            results[index] = {"message": messages[index], "status": "ok", "response": {"type": "message", "content": reply}}
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error saving batch: {str(e)}")
+        for index, _, _ in inserts:
+            results[index] = {"message": messages[index], "status": "error", "detail": str(e)}
+
+    return results
+
+def list_etag(request: Request, user_id: int, version: int) -> str:
+    # Each user and page/filter combination gets its own tag for the same data version
+    params = hashlib.sha1(f"{user_id}:{request.query_params}".encode()).hexdigest()[:12]
+    return f'W/"{request.url.path}-{version}-{params}"'
+
+def list_headers(etag: str) -> dict:
+    # The body depends on who is asking, so shared caches must key on it too
+    return {"ETag": etag, "Vary": "Authorization, Cookie"}
+
+def not_modified(request: Request, etag: str) -> bool:
+    return request.headers.get("if-none-match") == etag
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def chat_session_id(request: Request) -> Optional[str]:
+    """The caller's conversation, from ``X-Session-Id`` or the ``session_id``
+    cookie. Without a usable one the request is stateless: one-off calls such
+    as the dashboard's would otherwise each leave a conversation behind."""
+    session_id = request.headers.get("X-Session-Id") or request.cookies.get("session_id")
+    if not session_id or not SESSION_ID_PATTERN.match(session_id):
+        return None
+    return session_id
+
+def attach_session(response: Response, session_id: Optional[str]):
+    if session_id is None:
+        return
+    response.headers["X-Session-Id"] = session_id
+    response.set_cookie("session_id", session_id, httponly=True, samesite="lax")
+
+@router.post("/api/auth/register", status_code=201)
+async def register(credentials: Credentials, db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await AuthService.register_async(db, credentials.email, credentials.password)
+    except SigningKeyMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AuthError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"access_token": AuthService.create_access_token(user.id), "token_type": "bearer"}
+
+@router.post("/api/auth/token")
+async def login(credentials: Credentials, db: AsyncSession = Depends(get_async_db)):
+    try:
+        signing_key()
+        user = await AuthService.authenticate_async(db, credentials.email, credentials.password)
+    except SigningKeyMissing as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return {"access_token": AuthService.create_access_token(user.id), "token_type": "bearer"}
+
+@router.get("/api/auth/me")
+async def me(user_id: int = Depends(current_user_id)):
+    return {"user_id": user_id, "anonymous": user_id == ANONYMOUS_USER_ID}
+
+@router.post("/api/chat")
+async def chat(
+    message: MessageRequest,
+    request: Request,
+    http_response: Response,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        logger.info(f"Received message ({len(message.message)} chars)", extra=SAMPLED)
+        session_id = chat_session_id(request)
+        attach_session(http_response, session_id)
         
         # Pass db session to process_message
-        response = ai_assistant.process_message(message.message, db)
-        logger.info(f"AI response: {response}")
+        response = await get_ai_assistant().process_message_async(message.message, db, user_id, session_id)
+        logger.info(f"AI response: {response['type']}", extra=SAMPLED)
         
         # Handle actions
-        if response["type"] == "action":
-            action_data = response["content"]
-            logger.info(f"Processing action: {action_data}")
-            
-            if action_data["action"] == "add_task":
-                # Create task in database
-                task = Task(
-                    title=action_data["task"]
-                )
-                db.add(task)
-                db.commit()
-                logger.info(f"Task created: {task.title}")
-                return {"type": "message", "content": f"✅ Task added: {task.title}"}
-                
-            elif action_data["action"] == "schedule_meeting":
-                # Create meeting in database
-                meeting = Meeting(
-                    title=action_data["meeting"]["title"],
-                    start_time=datetime.fromisoformat(action_data["meeting"]["start_time"]),
-                    end_time=datetime.fromisoformat(action_data["meeting"]["start_time"])
-                )
-                db.add(meeting)
-                db.commit()
-                logger.info(f"Meeting created: {meeting.title}")
-                return {"type": "message", "content": f"📅 Meeting scheduled: {meeting.title}"}
-        
-        return response
+        return await execute_action(response, db, user_id)
 
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/chat/batch")
+async def chat_batch(
+    batch: BatchMessageRequest,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        logger.info(f"Received batch of {len(batch.messages)} messages", extra=SAMPLED)
+        results = await execute_batch(batch.messages, db, user_id)
+        return {
+            "results": results,
+            "succeeded": sum(1 for result in results if result["status"] == "ok"),
+            "failed": sum(1 for result in results if result["status"] == "error")
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/chat/stream")
+async def chat_stream(message: MessageRequest, request: Request, user_id: int = Depends(current_user_id)):
+    logger.info(f"Received streaming message ({len(message.message)} chars)", extra=SAMPLED)
+    session_id = chat_session_id(request)
+
+    async def events():
+        # Owns its session, since the stream outlives the request's dependencies
+        async with AsyncSessionLocal() as db:
+            try:
+                async for event, data in get_ai_assistant().stream_message(message.message, db, user_id, session_id):
+                    if event == "done":
+                        data = await execute_action(data, db, user_id)
+                        logger.info(f"AI response: {data['type']}", extra=SAMPLED)
+                    yield sse_event(event, data)
+            except Exception as e:
+                logger.error(f"Error streaming message: {str(e)}", exc_info=True)
+                yield sse_event("error", {"detail": str(e)})
+
+    response = StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    attach_session(response, session_id)
+    return response
+
 # Add a test endpoint
-@app.get("/api/health")
+@router.get("/api/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "llm_backend": settings.LLM_BACKEND}
+
+@router.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/api/stats/intents")
+async def intent_stats():
+    return get_ai_assistant().intent_router.stats()
+
+@router.get("/api/stats/cache")
+async def cache_stats():
+    return get_ai_assistant().response_cache.stats()
+
+@router.get("/api/stats/llm")
+async def llm_stats():
+    return get_ai_assistant().llm_gateway.stats()
+
+@router.get("/api/stats/tokens")
+async def token_stats():
+    return get_ai_assistant().token_usage.stats()
+
+@router.get("/api/stats/conversations")
+async def conversation_stats():
+    return get_ai_assistant().conversations.stats()
 
-@app.get("/api/tasks")
-async def get_tasks(db: Session = Depends(get_db)):
+@router.get("/api/stats/availability")
+async def availability_stats():
+    return get_ai_assistant().availability.stats()
+
+@router.get("/api/stats/calendar")
+async def calendar_stats(request: Request):
+    calendar_sync = request.app.state.background.calendar_sync
+    return {"enabled": calendar_sync is not None, **(calendar_sync.stats() if calendar_sync else {})}
+
+@router.get("/api/stats/jobs")
+async def job_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Queue depth is shared; the runner's counts and latencies are this process's
+    job_runner = request.app.state.background.job_runner
+    return {**await JobQueue.depth_async(db), "runner": job_runner.stats() if job_runner else None}
+
+@router.get("/api/stats/reminders")
+async def reminder_stats(request: Request):
+    scheduler = request.app.state.background.reminder_scheduler
+    return scheduler.stats() if scheduler else {"enabled": False}
+
+@router.get("/api/tasks", response_model=TaskPage)
+async def get_tasks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        tasks = db.query(Task).order_by(Task.created_at.desc()).all()
-        return {
-            "tasks": [
-                {
-                    "id": task.id,
-                    "title": task.title,
-                    "completed": task.completed,
-                    "created_at": task.created_at
-                } for task in tasks
-            ]
-        }
+        version = await ChangeTracker.current_version_async(db, user_id, "tasks")
+        etag = list_etag(request, user_id, version)
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=list_headers(etag))
+
+        tasks, next_cursor = await TaskService.list_tasks_async(db, user_id, limit, cursor, completed, since, until)
+        return json_response(
+            {"tasks": TASK_ROW.dicts(tasks), "next_cursor": next_cursor, "version": version},
+            headers={**list_headers(etag), "Cache-Control": "no-cache"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching tasks: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch tasks")
 
-@app.get("/api/meetings")
-async def get_meetings(db: Session = Depends(get_db)):
+@router.get("/api/meetings", response_model=MeetingPage)
+async def get_meetings(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        meetings = db.query(Meeting).order_by(Meeting.start_time.asc()).all()
-        return {
-            "meetings": [
-                {
-                    "id": meeting.id,
-                    "title": meeting.title,
-                    "start_time": meeting.start_time,
-                    "end_time": meeting.end_time
-                } for meeting in meetings
-            ]
-        }
+        version = await ChangeTracker.current_version_async(db, user_id, "meetings")
+        etag = list_etag(request, user_id, version)
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=list_headers(etag))
+
+        meetings, next_cursor = await MeetingService.list_meetings_async(db, user_id, limit, cursor, since, until)
+        return json_response(
+            {"meetings": MEETING_ROW.dicts(meetings), "next_cursor": next_cursor, "version": version},
+            headers={**list_headers(etag), "Cache-Control": "no-cache"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching meetings: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch meetings")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch meetings")
+
+@router.patch("/api/tasks/{task_id}", response_model=TaskOut)
+async def update_task(
+    task_id: int,
+    update: TaskUpdate,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if "due_at" in update.model_fields_set:
+        task = await TaskService.set_due_async(db, user_id, task_id, update.due_at)
+    else:
+        task = await TaskService.get_task_async(db, user_id, task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return json_response(TaskService.to_dict(task))
+
+@router.patch("/api/meetings/{meeting_id}", response_model=MeetingOut)
+async def update_meeting(
+    meeting_id: int,
+    update: MeetingUpdate,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if "reminder_minutes" in update.model_fields_set:
+        meeting = await MeetingService.set_reminder_async(db, user_id, meeting_id, update.reminder_minutes)
+    else:
+        meeting = await MeetingService.get_meeting_async(db, user_id, meeting_id)
+    if meeting is None:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    return json_response(MeetingService.to_dict(meeting))
+
+@router.get("/api/availability")
+async def check_availability(
+    start: datetime,
+    end: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    end = end or start + timedelta(hours=1)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    availability = get_ai_assistant().availability
+    conflicts = await availability.conflicts_async(db, user_id, start, end)
+    return {
+        "free": not conflicts,
+        "conflicts": [availability.to_dict(busy) for busy in conflicts]
+    }
+
+@router.get("/api/availability/next")
+async def next_free_slot(
+    duration: int = Query(60, ge=5, le=24 * 60, description="minutes"),
+    after: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Naive times are read in the configured TIMEZONE
+    assistant = get_ai_assistant()
+    after = after or datetime.now(assistant.date_parser.tz)
+    until = until or after + timedelta(days=settings.FREE_SLOT_HORIZON_DAYS)
+    slot = await assistant.availability.next_free_slot_async(db, user_id, timedelta(minutes=duration), after, until)
+    if slot is None:
+        return {"start_time": None, "end_time": None}
+    return {"start_time": slot, "end_time": slot + timedelta(minutes=duration)}
+
+@router.get("/api/meetings/{meeting_id}/conflicts")
+async def meeting_conflicts(
+    meeting_id: int,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    availability = get_ai_assistant().availability
+    meeting, conflicts = await availability.meeting_conflicts_async(db, user_id, meeting_id)
+    if meeting is None:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    return {
+        "meeting": availability.to_dict(meeting),
+        "conflicts": [availability.to_dict(busy) for busy in conflicts]
+    }
+
+@router.get("/api/calendar")
+async def calendar_status(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return await CalendarLinks.status_async(db, user_id)
+
+@router.put("/api/calendar")
+async def link_calendar(
+    link: CalendarLinkRequest,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Meetings are queued either way; they are pushed by workers with CALENDAR_SYNC_ENABLED
+    try:
+        await CalendarLinks.link_async(db, user_id, link.calendar_id)
+    except CalendarLinkError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return await CalendarLinks.status_async(db, user_id)
+
+@router.delete("/api/calendar", status_code=204)
+async def unlink_calendar(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    if not await CalendarLinks.unlink_async(db, user_id):
+        raise HTTPException(status_code=404, detail="No calendar linked")
+    return Response(status_code=204)
+
+@router.get("/api/changes", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(MAX_CHANGES, ge=1, le=MAX_CHANGES),
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return json_response(await ChangeTracker.changes_since_async(db, user_id, since, limit))
+    except Exception as e:
+        logger.error(f"Error fetching changes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch changes")
+
+@router.websocket("/ws/updates")
+async def updates(websocket: WebSocket, user_id: int = Depends(websocket_user_id)):
+    await websocket.accept()
+    subscriber = event_hub.subscribe(user_id)
+    try:
+        while True:
+            update = await subscriber.get()
+            if update is None:
+                # Fell too far behind; the client resyncs through /api/changes
+                await websocket.close(code=1013, reason="Subscriber too slow")
+                return
+            await websocket.send_text(dumps(update).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+def ndjson_lines(build_query, projection):
+    # Uses its own session so rows keep streaming after the request scope ends
+    db = SessionLocal()
+    try:
+        for row in build_query(db).yield_per(EXPORT_BATCH_SIZE):
+            yield dumps(projection.dict(row)) + b"\n"
+    finally:
+        db.close()
+
+@router.get("/api/tasks/export")
+def export_tasks(
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id)
+):
+    return StreamingResponse(
+        ndjson_lines(
+            lambda db: TaskService.filter_tasks(db, user_id, completed, since, until, TASK_ROW)
+                .order_by(Task.created_at.desc(), Task.id.desc()),
+            TASK_ROW
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/api/meetings/export")
+def export_meetings(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id)
+):
+    return StreamingResponse(
+        ndjson_lines(
+            lambda db: MeetingService.filter_meetings(db, user_id, since, until, MEETING_ROW)
+                .order_by(Meeting.start_time.asc(), Meeting.id.asc()),
+            MEETING_ROW
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        signing_key()
+    except SigningKeyMissing:
+        if not settings.ALLOW_ANONYMOUS:
+            # Nobody could sign in, and tokens signed with a placeholder could be forged
+            raise RuntimeError("SECRET_KEY must be set when ALLOW_ANONYMOUS is off")
+        logger.warning("SECRET_KEY is not set: sign-in is disabled and only anonymous access works")
+    if settings.AUTO_MIGRATE:
+        await asyncio.to_thread(migrate)
+    # Time queries and commits into the request trace
+    trace_database()
+    # Registers the change log, calendar outbox, job and reminder listeners, and
+    # runs jobs, calendar sync and reminders here unless `python -m app.worker` does
+    app.state.background = BackgroundServices(
+        jobs=settings.JOBS_IN_PROCESS,
+        calendar=settings.CALENDAR_SYNC_ENABLED,
+        reminders=settings.REMINDERS_ENABLED
+    )
+    app.state.background.start()
+    yield
+    await app.state.background.stop()
+    await async_engine.dispose()
+    engine.dispose()
+
+def create_app() -> FastAPI:
+    """Builds the ASGI app. Nothing here touches the database or the LLM
+    backend: migration runs in the lifespan and the assistant on first use."""
+    # Records are written by a background thread
+    configure_logging(settings.LOG_LEVEL, settings.LOG_SAMPLE_RATE)
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag", "X-Trace-Id", "Server-Timing", "X-Session-Id"],
+    )
+    app.add_middleware(
+        TracingMiddleware,
+        profile_dir=settings.PROFILE_DIR if settings.PROFILING_ENABLED else None
+    )
+    app.include_router(router)
+    return app
+
+app = create_app()
@@ -0,0 +1,32 @@
+"""Brings the database schema up to date.
+
+Runs on app startup unless ``AUTO_MIGRATE`` is off; multi-worker
+deployments run it once before starting the workers:
+
+    python -m app.migrate
+"""
+import logging
+import time
+from .models.base import Base, engine, SessionLocal, add_missing_columns, create_missing_indexes
+from .services.search_service import create_search_indexes
+from .services.auth_service import AuthService, ANONYMOUS_USER_ID
+
+logger = logging.getLogger(__name__)
+
+def migrate(bind=engine):
+    started = time.perf_counter()
+    # Rows from before multi-user support belong to the anonymous user
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind, {"user_id": ANONYMOUS_USER_ID, "version": 0})
+    create_missing_indexes(bind)
+    create_search_indexes(bind)
+    with SessionLocal(bind=bind) as db:
+        AuthService.ensure_anonymous_user(db)
+    logger.info(f"Schema up to date in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,149 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index, ForeignKey
 from sqlalchemy.sql import func
 from .base import Base
 
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    email = Column(String, nullable=False, unique=True)
+    # Empty for the built-in anonymous user, who can't log in
+    hashed_password = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Task(Base):
     __tablename__ = "tasks"
     
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     completed = Column(Boolean, default=False)
+    # Reminded at this time unless completed by then
+    due_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Keyset pagination within one user's tasks, newest first, optionally filtered by status
+    __table_args__ = (
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_id_completed_created_at_id", "user_id", "completed", "created_at", "id"),
+        # The reminder scheduler loads one time window at a time across all users
+        Index("ix_tasks_due_at_id", "due_at", "id"),
+    )
+
 class Meeting(Base):
     __tablename__ = "meetings"
     
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    # Google Calendar event this meeting mirrors, once pushed or when pulled from there
+    calendar_event_id = Column(String)
+    # Minutes before start_time to remind, or none; remind_at is derived from both on flush
+    reminder_minutes = Column(Integer)
+    remind_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_meetings_user_id_start_time_id", "user_id", "start_time", "id"),
+        Index("ix_meetings_user_id_calendar_event_id", "user_id", "calendar_event_id"),
+        Index("ix_meetings_remind_at_id", "remind_at", "id"),
+    )
+
+class Change(Base):
+    """Append-only log of task and meeting writes; ``id`` doubles as the data version."""
+    __tablename__ = "changes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Each user's feed, and its per-table versions for ETags
+    __table_args__ = (
+        Index("ix_changes_user_id_id", "user_id", "id"),
+        Index("ix_changes_user_id_table_name_id", "user_id", "table_name", "id"),
+    )
+
+class CalendarLink(Base):
+    """A user whose meetings are mirrored to a Google calendar, with the
+    sync token that lets the next pull fetch only what changed since."""
+    __tablename__ = "calendar_links"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # The user's primary calendar, whose id is their account email
+    calendar_id = Column(String, nullable=False)
+    sync_token = Column(String)
+    pulled_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class CalendarOutbox(Base):
+    """Meeting writes waiting to be pushed to Google Calendar.
+
+    Written in the same transaction as the meeting. ``event_id`` is the
+    event's id on Google's side and doubles as the idempotency key, so a
+    retried insert can't create a second event. Rows past their last
+    attempt keep ``next_attempt_at`` empty and ``last_error`` set.
+    """
+    __tablename__ = "calendar_outbox"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    meeting_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)
+    event_id = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set by the worker holding the row until its lease (next_attempt_at) runs out
+    claim_token = Column(String)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_calendar_outbox_next_attempt_at_id", "next_attempt_at", "id"),
+        Index("ix_calendar_outbox_claim_token", "claim_token"),
+    )
+
+class Conversation(Base):
+    """Chat memory for one session: a rolling summary plus the recent turns as JSON."""
+    __tablename__ = "conversations"
+
+    session_id = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    turns = Column(Text, nullable=False, default="[]")
+    # Turns recorded so far; a late write never replaces a newer one
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Job(Base):
+    """Background work, queued in the transaction of the write that caused it.
+
+    Lower ``priority`` runs first. While a worker runs a job, ``run_at`` is
+    its lease: a job whose worker died becomes due again when it runs out.
+    Finished jobs are deleted; jobs out of attempts stay as ``failed``.
+    ``dedupe_key`` lets at most one queued job stand for many triggers.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    priority = Column(Integer, nullable=False, default=100)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    claim_token = Column(String)
+    dedupe_key = Column(String)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Claim order: highest priority first, then oldest due
+        Index("ix_jobs_status_priority_run_at_id", "status", "priority", "run_at", "id"),
+        Index("ix_jobs_claim_token", "claim_token"),
+        Index("ix_jobs_dedupe_key", "dedupe_key"),
+    )
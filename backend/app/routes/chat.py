@@ -1,25 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..models.base import get_db
-from ..services.ai_service import AIAssistant
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import get_async_db
+from ..services.auth_service import current_user_id
+from ..services.ai_service import get_ai_assistant
 from ..services.task_service import TaskService
 from ..services.meeting_service import MeetingService
+from ..services.projections import Projection, MEETING_ROW, MeetingOut, json_response
+from ..models.models import Task
 from pydantic import BaseModel
 from datetime import datetime, timedelta
+from typing import List
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-ai_assistant = AIAssistant()
 task_service = TaskService()
 meeting_service = MeetingService()
 
 class MessageRequest(BaseModel):
     message: str
 
+class TaskSummary(BaseModel):
+    id: int
+    title: str
+    completed: bool
+
+class TaskList(BaseModel):
+    tasks: List[TaskSummary]
+
+class MeetingList(BaseModel):
+    meetings: List[MeetingOut]
+
+TASK_SUMMARY = Projection(TaskSummary, Task.id, Task.title, Task.completed)
+
 @router.post("/chat")
-async def process_message(message_request: MessageRequest, db: Session = Depends(get_db)):
-    response = ai_assistant.process_message(message_request.message)
-    print("AI Response:", response)  # Debug print
+async def process_message(
+    message_request: MessageRequest,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    response = await get_ai_assistant().process_message_async(message_request.message, db, user_id)
+    logger.debug(f"AI response: {response}")
     
     if isinstance(response, dict) and response.get("type") == "action":
         action_data = response["content"]
@@ -27,12 +50,13 @@ async def process_message(message_request: MessageRequest, db: Session = Depends
         if action_data.get("action") == "add_task":
             # Get task title from the correct field
             task_title = action_data.get("task", "")
-            print("Task title:", task_title)  # Debug print
+            logger.debug(f"Task title: {task_title}")
             
             if task_title:
-                task = task_service.create_task(
+                task = await task_service.create_task_async(
                     db=db,
-                    title=task_title
+                    title=task_title,
+                    user_id=user_id
                 )
                 return {
                     "type": "message",
@@ -41,27 +65,12 @@ async def process_message(message_request: MessageRequest, db: Session = Depends
     
     return response
 
-@router.get("/tasks")
-async def get_tasks(db: Session = Depends(get_db)):
-    tasks = task_service.get_tasks(db)
-    return {
-        "tasks": [
-            {
-                "id": task.id,
-                "title": task.title,
-                "completed": task.completed
-            } for task in tasks
-        ]
-    }
+@router.get("/tasks", response_model=TaskList)
+async def get_tasks(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    tasks = await task_service.get_tasks_async(db, user_id, TASK_SUMMARY)
+    return json_response({"tasks": TASK_SUMMARY.dicts(tasks)})
 
-@router.get("/meetings")
-async def get_meetings(db: Session = Depends(get_db)):
-    meetings = meeting_service.get_meetings(db)
-    return {"meetings": [
-        {
-            "id": meeting.id,
-            "title": meeting.title,
-            "start_time": meeting.start_time,
-            "end_time": meeting.end_time
-        } for meeting in meetings
-    ]} 
\ No newline at end of file
+@router.get("/meetings", response_model=MeetingList)
+async def get_meetings(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    meetings = await meeting_service.get_meetings_async(db, user_id, MEETING_ROW)
+    return json_response({"meetings": MEETING_ROW.dicts(meetings)})
@@ -1,21 +1,27 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..models.base import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import get_async_db
+from ..services.auth_service import current_user_id
 from ..services.meeting_service import MeetingService
+from ..services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..services.projections import MEETING_ROW, json_response
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/meetings", tags=["meetings"])
 meeting_service = MeetingService()
 
 @router.get("")
-async def get_meetings(db: Session = Depends(get_db)):
-    meetings = meeting_service.get_meetings(db)
-    return {
-        "meetings": [
-            {
-                "id": meeting.id,
-                "title": meeting.title,
-                "start_time": meeting.start_time,
-                "end_time": meeting.end_time
-            } for meeting in meetings
-        ]
-    } 
\ No newline at end of file
+async def get_meetings(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        meetings, next_cursor = await meeting_service.list_meetings_async(db, user_id, limit, cursor, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"meetings": MEETING_ROW.dicts(meetings), "next_cursor": next_cursor})
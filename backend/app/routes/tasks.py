@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..models.base import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import get_async_db
+from ..services.auth_service import current_user_id
 from ..services.task_service import TaskService
+from ..services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..services.projections import TASK_ROW, json_response
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 task_service = TaskService()
 
 @router.get("")
-async def get_tasks(db: Session = Depends(get_db)):
-    tasks = task_service.get_tasks(db)
-    return {
-        "tasks": [
-            {
-                "id": task.id,
-                "title": task.title,
-                "completed": task.completed
-            } for task in tasks
-        ]
-    } 
\ No newline at end of file
+async def get_tasks(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        tasks, next_cursor = await task_service.list_tasks_async(db, user_id, limit, cursor, completed, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"tasks": TASK_ROW.dicts(tasks), "next_cursor": next_cursor})
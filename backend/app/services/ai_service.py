@@ -1,51 +1,65 @@
-from openai import OpenAI
 from datetime import datetime, timedelta
-import os
+import asyncio
 import json
+import logging
+import re
+import threading
+import time
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.models import Task, Meeting
-import pytz
-from dateutil import parser
-from dateutil.relativedelta import relativedelta
+from config.settings import settings
+from .stream_parser import ReplyStreamParser
+from .intent_router import IntentRouter
+from .response_cache import create_response_cache, self_contained
+from .search_service import SearchService
+from .prompts import SYSTEM_PROMPTS, RESPONSE_FORMATS
+from .token_usage import TokenUsage
+from .llm_gateway import LLMGateway, LLMUnavailable
+from .llm_backends import create_llm_backend
+from .tracing import span, record_span
+from .date_parser import DateParser, DateParseError
+from .conversation_store import ConversationStore
+from .availability import Availability
+
+logger = logging.getLogger(__name__)
 
 class AIAssistant:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.system_prompt = """You are a friendly AI assistant that helps manage tasks and meetings.
-        
-        For scheduling meetings, respond with:
-        {"type": "action", "content": {"action": "schedule_meeting", "meeting": {"title": "Meeting with [name]", "date_info": "[extracted date/time]"}}}
-        
-        For tasks management:
-        1. Adding tasks:
-        {"type": "action", "content": {"action": "add_task", "task": "task description"}}
-        
-        2. Completing tasks:
-        {"type": "action", "content": {"action": "complete_task", "task": "task description"}}
-        
-        3. Deleting tasks:
-        {"type": "action", "content": {"action": "delete_task", "task": "task description"}}
-        
-        4. Viewing tasks:
-        {"type": "action", "content": {"action": "get_tasks"}}
-        
-        For meetings management:
-        1. Scheduling (with various date formats):
-        - "tomorrow at 2pm"
-        - "day after tomorrow at 3:30pm"
-        - "next Monday at 10am"
-        - "December 15 at 2pm"
-        
-        2. Viewing meetings:
-        {"type": "action", "content": {"action": "get_meetings"}}
-        
-        3. Deleting meetings:
-        {"type": "action", "content": {"action": "delete_meeting", "meeting": "meeting title"}}
-
-        For general conversation or questions, respond with:
-        {"type": "message", "content": "your helpful response"}
-
-        Always maintain context and provide helpful responses."""
+        # OpenAI, an OpenAI-compatible server or the in-process stub, per LLM_BACKEND
+        self.llm_backend = create_llm_backend(settings)
+        self.client = self.llm_backend.client
+        self.async_client = self.llm_backend.async_client
+        # Owns retries, deadlines and the circuit breaker for both clients
+        self.llm_gateway = LLMGateway(self.client, self.async_client, settings)
+        # Answers unambiguous commands without a model round-trip
+        self.intent_router = IntentRouter()
+        # Parsed action replies, keyed on the normalized message
+        self.response_cache = create_response_cache(settings)
+        # Caps the number of in-flight completions per worker
+        self.llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.prompt_version = settings.PROMPT_VERSION
+        self.system_prompt = SYSTEM_PROMPTS[self.prompt_version]
+        # Memoized natural-language dates, in the configured zone
+        self.date_parser = DateParser(settings.TIMEZONE)
+        # Interval-indexed free/busy lookups over each user's meetings
+        self.availability = Availability(
+            settings.TIMEZONE,
+            settings.WORKDAY_START_HOUR,
+            settings.WORKDAY_END_HOUR,
+            settings.AVAILABILITY_MAX_USERS,
+            settings.AVAILABILITY_RECHECK_INTERVAL
+        )
+        # Recent turns and a rolling summary per chat session
+        self.conversations = ConversationStore(
+            settings.CONVERSATION_MAX_SESSIONS,
+            settings.CONVERSATION_WINDOW_TURNS,
+            settings.CONVERSATION_TOKEN_BUDGET,
+            settings.CONVERSATION_SUMMARY_TOKENS
+        )
+        # Per-request prompt/completion token accounting
+        self.token_usage = TokenUsage()
 
         # Add greeting patterns
         self.greetings = [
@@ -55,76 +69,49 @@ class AIAssistant:
         self.thanks = [
             "thank", "thanks", "appreciate", "grateful", "thx", "great"
         ]
+        # Whole words only, so "this" or "history" don't read as "hi"
+        self.greeting_pattern = re.compile(rf"\b(?:{'|'.join(self.greetings)})\b")
+        self.thanks_pattern = re.compile(rf"\b(?:{'|'.join(self.thanks)})\b")
 
     def parse_date_info(self, date_info: str) -> datetime:
-        try:
-            now = datetime.now(pytz.UTC)
-            
-            # Handle relative dates
-            lower_date = date_info.lower()
-            if "tomorrow" in lower_date:
-                base_date = now + timedelta(days=1)
-            elif "day after tomorrow" in lower_date:
-                base_date = now + timedelta(days=2)
-            elif "next" in lower_date:
-                # Handle "next Monday", "next week", etc.
-                try:
-                    base_date = parser.parse(date_info, fuzzy=True)
-                except:
-                    base_date = now + timedelta(weeks=1)
-            else:
-                # Parse absolute dates
-                base_date = parser.parse(date_info, fuzzy=True)
-            
-            # If no time was specified, default to current time
-            if base_date.hour == 0 and base_date.minute == 0:
-                base_date = base_date.replace(
-                    hour=now.hour,
-                    minute=now.minute
-                )
-            
-            return base_date
+        return self.date_parser.parse(date_info).start
 
-        except Exception as e:
-            print(f"Date parsing error: {str(e)}")
-            # Default to tomorrow at current time if parsing fails
-            return now + timedelta(days=1)
-
-    def get_tasks_text(self, db: Session) -> str:
-        tasks = db.query(Task).all()
+    def get_tasks_text(self, db: Session, user_id: int) -> str:
+        # Just the two columns the listing shows, as tuples
+        tasks = db.execute(
+            select(Task.title, Task.completed).where(Task.user_id == user_id).order_by(Task.created_at, Task.id)
+        ).all()
         if not tasks:
             return "You don't have any tasks at the moment."
         
-        task_list = "\n".join([f"- {task.title} ({'completed' if task.completed else 'pending'})" for task in tasks])
+        task_list = "\n".join([f"- {title} ({'completed' if completed else 'pending'})" for title, completed in tasks])
         return f"Here are your tasks:\n{task_list}"
 
-    def get_meetings_text(self, db: Session, date_filter=None) -> str:
-        query = db.query(Meeting)
+    def get_meetings_text(self, db: Session, user_id: int, date_filter=None) -> str:
+        query = select(Meeting.title, Meeting.start_time).where(Meeting.user_id == user_id)
         
         if date_filter:
             # Filter meetings for specific date
             start_of_day = date_filter.replace(hour=0, minute=0, second=0, microsecond=0)
             end_of_day = start_of_day + timedelta(days=1)
-            query = query.filter(Meeting.start_time >= start_of_day, Meeting.start_time < end_of_day)
+            query = query.where(Meeting.start_time >= start_of_day, Meeting.start_time < end_of_day)
         
-        meetings = query.order_by(Meeting.start_time).all()
+        meetings = db.execute(query.order_by(Meeting.start_time)).all()
         
         if not meetings:
             return f"You don't have any meetings{'tomorrow' if date_filter else ''}."
         
         meeting_list = "\n".join([
-            f"- {meeting.title} at {meeting.start_time.strftime('%I:%M %p')}"
-            for meeting in meetings
+            f"- {title} at {start_time.strftime('%I:%M %p')}"
+            for title, start_time in meetings
         ])
         
         date_str = "tomorrow" if date_filter else ""
         return f"Here are your meetings {date_str}:\n{meeting_list}"
 
-    def complete_task(self, db: Session, task_description: str) -> str:
-        # Find task by fuzzy matching the description
-        task = db.query(Task).filter(
-            Task.title.ilike(f"%{task_description}%")
-        ).first()
+    def complete_task(self, db: Session, user_id: int, task_description: str) -> str:
+        # Find the best-ranked task whose title contains the description
+        task = SearchService.find_task(db, task_description, user_id)
         
         if task:
             task.completed = True
@@ -132,10 +119,8 @@ class AIAssistant:
             return f"✅ Marked task '{task.title}' as complete!"
         return f"❌ Couldn't find a task matching '{task_description}'"
 
-    def delete_task(self, db: Session, task_description: str) -> str:
-        task = db.query(Task).filter(
-            Task.title.ilike(f"%{task_description}%")
-        ).first()
+    def delete_task(self, db: Session, user_id: int, task_description: str) -> str:
+        task = SearchService.find_task(db, task_description, user_id)
         
         if task:
             db.delete(task)
@@ -143,10 +128,8 @@ class AIAssistant:
             return f"🗑️ Deleted task '{task.title}'"
         return f"❌ Couldn't find a task matching '{task_description}'"
 
-    def delete_meeting(self, db: Session, meeting_title: str) -> str:
-        meeting = db.query(Meeting).filter(
-            Meeting.title.ilike(f"%{meeting_title}%")
-        ).first()
+    def delete_meeting(self, db: Session, user_id: int, meeting_title: str) -> str:
+        meeting = SearchService.find_meeting(db, meeting_title, user_id)
         
         if meeting:
             db.delete(meeting)
@@ -154,13 +137,64 @@ class AIAssistant:
             return f"🗑️ Deleted meeting '{meeting.title}'"
         return f"❌ Couldn't find a meeting matching '{meeting_title}'"
 
+    def format_slot(self, start: datetime) -> str:
+        return start.strftime('%a %b %d at %I:%M %p')
+
+    def free_slot_window(self, date_info: str = None):
+        """The ``(after, until)`` range a free-slot search covers for ``date_info``."""
+        now = datetime.now(self.date_parser.tz).replace(second=0, microsecond=0)
+        week = re.search(r"\b(this|next)\s+week\b", (date_info or "").lower())
+        if week:
+            next_monday = (now + timedelta(days=7 - now.weekday())).replace(hour=0, minute=0)
+            # On a weekend "this week" can only mean the coming one
+            if week.group(1) == "this" and now.weekday() < 5:
+                return now, next_monday
+            return next_monday, next_monday + timedelta(days=7)
+
+        if date_info:
+            parsed = self.date_parser.parse(date_info, now)
+            if not parsed.timed:
+                # A day on its own means all of that day
+                day_start = parsed.start.replace(hour=0, minute=0)
+                return max(now, day_start), day_start + timedelta(days=1)
+            return max(now, parsed.start), parsed.start + timedelta(days=settings.FREE_SLOT_HORIZON_DAYS)
+
+        return now, now + timedelta(days=settings.FREE_SLOT_HORIZON_DAYS)
+
+    def check_availability(self, db: Session, user_id: int, date_info: str) -> str:
+        parsed = self.date_parser.parse(date_info)
+        end = parsed.start + (parsed.duration or timedelta(hours=1))
+        conflicts = self.availability.conflicts(db, user_id, parsed.start, end)
+        if not conflicts:
+            return f"✅ You're free {self.format_slot(parsed.start)}."
+        titles = ", ".join(f"'{busy.title}' ({busy.start.strftime('%I:%M %p')})" for busy in conflicts)
+        return f"⚠️ You're busy {self.format_slot(parsed.start)}: {titles}"
+
+    def find_free_slot(self, db: Session, user_id: int, duration_minutes: int = 60, date_info: str = None) -> str:
+        duration = timedelta(minutes=duration_minutes or 60)
+        after, until = self.free_slot_window(date_info)
+        slot = self.availability.next_free_slot(db, user_id, duration, after, until)
+        if slot is None:
+            return f"❌ No free {duration_minutes}-minute slot during working hours {date_info or 'in the next week'}."
+        return f"🗓️ Your next free {duration_minutes}-minute slot is {self.format_slot(slot)}."
+
+    def find_conflicts(self, db: Session, user_id: int, meeting_title: str) -> str:
+        meeting = SearchService.find_meeting(db, meeting_title, user_id)
+        if not meeting:
+            return f"❌ Couldn't find a meeting matching '{meeting_title}'"
+        _, conflicts = self.availability.meeting_conflicts(db, user_id, meeting.id)
+        if not conflicts:
+            return f"✅ Nothing overlaps '{meeting.title}'."
+        conflict_list = "\n".join(f"- {busy.title} at {self.format_slot(busy.start)}" for busy in conflicts)
+        return f"⚠️ These overlap '{meeting.title}':\n{conflict_list}"
+
     def is_greeting(self, message: str) -> bool:
-        return any(greeting in message.lower() for greeting in self.greetings)
+        return self.greeting_pattern.search(message.lower()) is not None
 
     def is_thanks(self, message: str) -> bool:
-        return any(thank in message.lower() for thank in self.thanks)
+        return self.thanks_pattern.search(message.lower()) is not None
 
-    def process_message(self, message: str, db: Session) -> dict:
+    def quick_reply(self, message: str):
         # Handle greetings
         if self.is_greeting(message):
             return {
@@ -175,98 +209,339 @@ class AIAssistant:
                 "content": "You're welcome! Let me know if you need help with tasks or meetings."
             }
 
+        return None
+
+    def build_messages(self, message: str, history: list = None) -> list:
+        # The system prompt stays first and byte-identical so its prefix is cacheable
+        return [
+            {"role": "system", "content": self.system_prompt},
+            *(history or []),
+            {"role": "user", "content": message}
+        ]
+
+    def completion_kwargs(self, message: str, history: list = None) -> dict:
+        kwargs = {
+            "model": settings.OPENAI_MODEL,
+            "messages": self.build_messages(message, history),
+            "temperature": 0.7
+        }
+        response_format = RESPONSE_FORMATS[self.prompt_version]
+        if response_format and settings.LLM_JSON_MODE:
+            kwargs["response_format"] = response_format
+        return kwargs
+
+    @property
+    def llm_params(self) -> dict:
+        return {
+            "model": settings.OPENAI_MODEL,
+            "temperature": 0.7,
+            "prompt": self.prompt_version
+        }
+
+    def local_reply(self, message: str, history: list = None):
+        """Answers ``message`` without the model when possible, else ``None``."""
+        with span("intent"):
+            routed = self.intent_router.match(message)
+            if routed:
+                return routed
+
+            reply = self.quick_reply(message)
+            if reply:
+                return reply
+
+            # After earlier turns a cached reply must not depend on them
+            return self.response_cache.get(message, self.llm_params, self_contained_only=bool(history))
+
+    def fallback_reply(self, message: str) -> dict:
+        """Best rule-based answer while the model is unavailable."""
+        routed = self.intent_router.match_loose(message)
+        if routed:
+            return routed
+
+        return {
+            "type": "message",
+            "content": "I can't reach my language model right now, but direct commands still work, e.g. 'add task buy milk', 'show my tasks' or 'schedule a meeting with Sam tomorrow at 3pm'."
+        }
+
+    def process_message(self, message: str, db: Session, user_id: int) -> dict:
+        reply = self.local_reply(message)
+        if reply:
+            return self.handle_parsed(reply, db, user_id)
+
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                temperature=0.7
-            )
+            started = time.perf_counter()
+            with span("llm"):
+                response = self.llm_gateway.create(**self.completion_kwargs(message))
+            latency = time.perf_counter() - started
+            self.token_usage.record(self.prompt_version, response.usage, latency)
             
-            assistant_message = response.choices[0].message.content
+            parsed_response = self.parse_completion(message, response.choices[0].message.content, latency)
+            return self.handle_parsed(parsed_response, db, user_id)
+
+        except LLMUnavailable as e:
+            logger.warning(f"LLM unavailable, using rules: {str(e)}")
+            return self.handle_parsed(self.fallback_reply(message), db, user_id)
+                
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            return {
+                "type": "message",
+                "content": "Sorry, I encountered an error. Please try again."
+            }
+
+    async def classify_async(self, message: str, history: list = None) -> dict:
+        """Returns the reply envelope for ``message`` without touching the database.
+
+        With conversation ``history`` the reply may depend on earlier turns,
+        so only actions whose arguments all come from ``message`` itself are
+        read from or written to the response cache.
+        """
+        reply = self.local_reply(message, history)
+        if reply:
+            return reply
+
+        try:
+            async with self.llm_semaphore:
+                started = time.perf_counter()
+                with span("llm"):
+                    response = await self.llm_gateway.create_async(**self.completion_kwargs(message, history))
+            latency = time.perf_counter() - started
+            self.token_usage.record(self.prompt_version, response.usage, latency)
             
-            try:
-                parsed_response = json.loads(assistant_message)
+            return self.parse_completion(message, response.choices[0].message.content, latency, history)
+
+        except LLMUnavailable as e:
+            logger.warning(f"LLM unavailable, using rules: {str(e)}")
+            return self.fallback_reply(message)
                 
-                if parsed_response["type"] == "action":
-                    action = parsed_response["content"]["action"]
-                    
-                    # Handle meetings
-                    if action == "schedule_meeting":
-                        meeting_data = parsed_response["content"]["meeting"]
-                        try:
-                            meeting_time = self.parse_date_info(meeting_data["date_info"])
-                            end_time = meeting_time + timedelta(hours=1)
-                            return {
-                                "type": "action",
-                                "content": {
-                                    "action": "schedule_meeting",
-                                    "meeting": {
-                                        "title": meeting_data["title"],
-                                        "start_time": meeting_time.isoformat(),
-                                        "end_time": end_time.isoformat()
-                                    }
-                                }
-                            }
-                        except Exception as e:
-                            print(f"Meeting scheduling error: {str(e)}")
-                            return {
-                                "type": "message",
-                                "content": "I had trouble with the date/time. Please try: 'tomorrow at 2pm' or 'December 15 at 14:00'"
-                            }
-                    
-                    # Handle tasks
-                    elif action == "add_task":
-                        return parsed_response
-                    elif action == "complete_task":
-                        return {
-                            "type": "message",
-                            "content": self.complete_task(db, parsed_response["content"]["task"])
-                        }
-                    elif action == "delete_task":
-                        return {
-                            "type": "message",
-                            "content": self.delete_task(db, parsed_response["content"]["task"])
-                        }
-                    elif action == "get_tasks":
-                        return {
-                            "type": "message",
-                            "content": self.get_tasks_text(db)
-                        }
-                    
-                    # Handle meeting queries/deletions
-                    elif action == "get_meetings":
-                        return {
-                            "type": "message",
-                            "content": self.get_meetings_text(db)
-                        }
-                    elif action == "delete_meeting":
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            return {
+                "type": "message",
+                "content": "Sorry, I encountered an error. Please try again."
+            }
+
+    @staticmethod
+    def conversation_key(user_id: int, session_id: str) -> str:
+        # A session id only ever resumes a conversation of the user who started it
+        return f"{user_id}:{session_id}"
+
+    async def process_message_async(self, message: str, db: AsyncSession, user_id: int, session_id: str = None) -> dict:
+        key = self.conversation_key(user_id, session_id) if session_id else None
+        history = await self.conversations.history_async(db, key) if key else None
+        parsed_response = await self.classify_async(message, history)
+        response = await self.handle_parsed_async(parsed_response, db, user_id)
+        if key:
+            await self.conversations.append_async(db, key, message, parsed_response)
+        return response
+
+    async def stream_message(self, message: str, db: AsyncSession, user_id: int, session_id: str = None):
+        """Yields ``(event, data)`` pairs while the completion streams in.
+
+        ``token`` events carry message text as it arrives, ``action`` signals
+        that the reply is an action envelope, and ``done`` carries the final
+        response exactly as ``process_message_async`` would return it.
+        """
+        key = self.conversation_key(user_id, session_id) if session_id else None
+        history = await self.conversations.history_async(db, key) if key else None
+
+        async def finish(parsed_response: dict) -> dict:
+            response = await self.handle_parsed_async(parsed_response, db, user_id)
+            if key:
+                await self.conversations.append_async(db, key, message, parsed_response)
+            return response
+
+        reply = self.local_reply(message, history)
+        if reply:
+            yield "done", await finish(reply)
+            return
+
+        # Off-topic replies get replaced at the end, so don't forward them early
+        forward_tokens = self.is_on_topic(message, history)
+        parser = ReplyStreamParser()
+
+        try:
+            async with self.llm_semaphore:
+                started = time.perf_counter()
+                stream = await self.llm_gateway.create_async(
+                    **self.completion_kwargs(message, history),
+                    stream=True,
+                    # Usage arrives in a final chunk with no choices
+                    stream_options={"include_usage": True}
+                )
+                announced_action = False
+                async for chunk in stream:
+                    if chunk.usage:
+                        self.token_usage.record(self.prompt_version, chunk.usage, time.perf_counter() - started)
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    text = parser.feed(chunk.choices[0].delta.content)
+                    if parser.reply_type == "action" and not announced_action:
+                        announced_action = True
+                        yield "action", {}
+                    if text and forward_tokens:
+                        yield "token", {"content": text}
+            # Covers the whole stream, not just the time to the first token
+            record_span("llm", started, time.perf_counter() - started)
+
+        except LLMUnavailable as e:
+            logger.warning(f"LLM unavailable, using rules: {str(e)}")
+            yield "done", await finish(self.fallback_reply(message))
+            return
+
+        except Exception as e:
+            logger.error(f"Error streaming message: {str(e)}")
+            yield "done", {
+                "type": "message",
+                "content": "Sorry, I encountered an error. Please try again."
+            }
+            return
+
+        parsed_response = self.parse_completion(message, parser.buffer, time.perf_counter() - started, history)
+        yield "done", await finish(parsed_response)
+
+    def is_on_topic(self, message: str, history: list = None) -> bool:
+        # A follow-up inherits the topic of the user's previous turn
+        previous = next((turn["content"] for turn in reversed(history or []) if turn["role"] == "user"), "")
+        return any(
+            action_word in text.lower()
+            for text in (message, previous)
+            for action_word in ["task", "meeting", "schedule", "calendar", "free", "busy", "available", "slot"]
+        )
+
+    def parse_completion(self, message: str, assistant_message: str, latency: float = 0.0, history: list = None) -> dict:
+        try:
+            with span("parse"):
+                parsed_response = json.loads(assistant_message)
+        except json.JSONDecodeError:
+            return {
+                "type": "message",
+                "content": "I'm a personal assistant focused on tasks and meetings. Could you please rephrase your request specifically about tasks or meetings?"
+            }
+
+        if parsed_response["type"] == "action":
+            # Only the action envelope is reusable; rendered text depends on the database
+            if not history or self_contained(message, parsed_response):
+                self.response_cache.set(message, self.llm_params, parsed_response, latency)
+
+        # For any other general questions; follow-ups inherit the conversation's topic
+        elif parsed_response["type"] == "message":
+            if not self.is_on_topic(message, history):
+                return {
+                    "type": "message",
+                    "content": "I am a personal assistant focused on helping you manage tasks and meetings. Is there anything specific about tasks or meetings that I can help you with?"
+                }
+
+        return parsed_response
+
+    async def handle_parsed_async(self, parsed_response: dict, db: AsyncSession, user_id: int) -> dict:
+        # The DB helpers are synchronous; run_sync executes them over the async connection
+        return await db.run_sync(lambda session: self.handle_parsed(parsed_response, session, user_id))
+
+    def handle_parsed(self, parsed_response: dict, db: Session, user_id: int) -> dict:
+        """Applies a reply envelope for ``user_id``; every lookup stays within their rows."""
+        if parsed_response["type"] == "action":
+            action = parsed_response["content"]["action"]
+            
+            # Handle meetings
+            if action == "schedule_meeting":
+                meeting_data = parsed_response["content"]["meeting"]
+                try:
+                    with span("date_parse"):
+                        parsed_date = self.date_parser.parse(meeting_data["date_info"])
+                    meeting_time = parsed_date.start
+                    end_time = meeting_time + (parsed_date.duration or timedelta(hours=1))
+                    conflicts = self.availability.conflicts(db, user_id, meeting_time, end_time)
+                    if conflicts:
+                        # Don't double-book; offer the nearest opening instead
+                        duration = end_time - meeting_time
+                        slot = self.availability.next_free_slot(
+                            db, user_id, duration, meeting_time,
+                            meeting_time + timedelta(days=settings.FREE_SLOT_HORIZON_DAYS)
+                        )
+                        suggestion = f" The next free slot is {self.format_slot(slot)}." if slot else ""
                         return {
                             "type": "message",
-                            "content": self.delete_meeting(db, parsed_response["content"]["meeting"])
+                            "content": f"⚠️ That overlaps '{conflicts[0].title}' at {self.format_slot(conflicts[0].start)}.{suggestion}"
                         }
-                
-                # For any other general questions
-                if parsed_response["type"] == "message":
-                    if not any(action_word in message.lower() for action_word in ["task", "meeting", "schedule"]):
-                        return {
-                            "type": "message",
-                            "content": "I am a personal assistant focused on helping you manage tasks and meetings. Is there anything specific about tasks or meetings that I can help you with?"
+                    return {
+                        "type": "action",
+                        "content": {
+                            "action": "schedule_meeting",
+                            "meeting": {
+                                "title": meeting_data["title"],
+                                "start_time": meeting_time.isoformat(),
+                                "end_time": end_time.isoformat()
+                            }
                         }
-                
+                    }
+                except Exception as e:
+                    logger.warning(f"Meeting scheduling error: {str(e)}")
+                    return {
+                        "type": "message",
+                        "content": "I had trouble with the date/time. Please try: 'tomorrow at 2pm' or 'December 15 at 14:00'"
+                    }
+            
+            # Handle tasks
+            elif action == "add_task":
                 return parsed_response
-
-            except json.JSONDecodeError:
+            elif action == "complete_task":
                 return {
                     "type": "message",
-                    "content": "I'm a personal assistant focused on tasks and meetings. Could you please rephrase your request specifically about tasks or meetings?"
+                    "content": self.complete_task(db, user_id, parsed_response["content"]["task"])
                 }
-                
-        except Exception as e:
-            print(f"Error processing message: {str(e)}")
-            return {
-                "type": "message",
-                "content": "Sorry, I encountered an error. Please try again."
-            } 
\ No newline at end of file
+            elif action == "delete_task":
+                return {
+                    "type": "message",
+                    "content": self.delete_task(db, user_id, parsed_response["content"]["task"])
+                }
+            elif action == "get_tasks":
+                return {
+                    "type": "message",
+                    "content": self.get_tasks_text(db, user_id)
+                }
+            
+            # Handle meeting queries/deletions
+            elif action == "get_meetings":
+                return {
+                    "type": "message",
+                    "content": self.get_meetings_text(db, user_id)
+                }
+            elif action == "delete_meeting":
+                return {
+                    "type": "message",
+                    "content": self.delete_meeting(db, user_id, parsed_response["content"]["meeting"])
+                }
+
+            # Handle availability
+            elif action in ("check_availability", "find_free_slot", "find_conflicts"):
+                content = parsed_response["content"]
+                try:
+                    if action == "check_availability":
+                        reply = self.check_availability(db, user_id, content["date_info"])
+                    elif action == "find_free_slot":
+                        reply = self.find_free_slot(db, user_id, content.get("duration_minutes") or 60, content.get("date_info"))
+                    else:
+                        reply = self.find_conflicts(db, user_id, content["meeting"])
+                except DateParseError as e:
+                    logger.warning(f"Availability date error: {str(e)}")
+                    reply = "I had trouble with the date/time. Please try: 'tomorrow at 2pm' or 'this week'"
+                return {"type": "message", "content": reply}
+        
+        return parsed_response
+
+_assistant = None
+_assistant_lock = threading.Lock()
+
+def get_ai_assistant() -> AIAssistant:
+    """The process-wide assistant, built on first use.
+
+    Construction sets up the LLM client, caches and indexes, so it is kept
+    out of import time; every router shares the one instance.
+    """
+    global _assistant
+    if _assistant is None:
+        with _assistant_lock:
+            if _assistant is None:
+                _assistant = AIAssistant()
+    return _assistant
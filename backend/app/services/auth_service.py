@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import bcrypt
+from fastapi import Depends, HTTPException, Query, WebSocketException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import AsyncSessionLocal, get_async_db
+from ..models.models import User
+from config.settings import settings
+
+# Owns every row written by unauthenticated requests when ALLOW_ANONYMOUS is on
+ANONYMOUS_USER_ID = 1
+ANONYMOUS_EMAIL = "anonymous@localhost"
+
+# bcrypt only reads the first 72 bytes
+MAX_PASSWORD_BYTES = 72
+
+# Keys anyone can sign with: unset, or the placeholder earlier versions defaulted to
+INSECURE_SECRET_KEYS = {None, "", "your-secret-key"}
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+class AuthError(Exception):
+    """Bad credentials, a missing or invalid token, or a taken email."""
+
+class SigningKeyMissing(Exception):
+    """SECRET_KEY is unset or a known placeholder, so tokens would be forgeable."""
+
+def signing_key() -> str:
+    if settings.SECRET_KEY in INSECURE_SECRET_KEYS:
+        raise SigningKeyMissing("Sign-in is disabled until SECRET_KEY is set")
+    return settings.SECRET_KEY
+
+class AuthService:
+    @staticmethod
+    def hash_password(password: str) -> str:
+        return bcrypt.hashpw(password.encode()[:MAX_PASSWORD_BYTES], bcrypt.gensalt()).decode()
+
+    @staticmethod
+    def verify_password(password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode()[:MAX_PASSWORD_BYTES], hashed_password.encode())
+
+    @staticmethod
+    def create_access_token(user_id: int) -> str:
+        expires = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        return jwt.encode({"sub": str(user_id), "exp": expires}, signing_key(), algorithm=settings.JWT_ALGORITHM)
+
+    @staticmethod
+    def decode_access_token(token: str) -> int:
+        """Returns the user id a token was issued to; signature and expiry are checked."""
+        try:
+            key = signing_key()
+        except SigningKeyMissing as e:
+            raise AuthError(str(e))
+        try:
+            claims = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+            return int(claims["sub"])
+        except (JWTError, KeyError, ValueError):
+            raise AuthError("Invalid or expired token")
+
+    @staticmethod
+    def ensure_anonymous_user(db: Session):
+        if db.get(User, ANONYMOUS_USER_ID) is None:
+            db.add(User(id=ANONYMOUS_USER_ID, email=ANONYMOUS_EMAIL))
+            db.commit()
+
+    @staticmethod
+    def register(db: Session, email: str, password: str) -> User:
+        # No accounts that couldn't get a token
+        signing_key()
+        email = email.strip().lower()
+        if db.query(User.id).filter(User.email == email).first():
+            raise AuthError(f"'{email}' is already registered")
+        user = User(email=email, hashed_password=AuthService.hash_password(password))
+        db.add(user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent sign-up with the same email got there first
+            db.rollback()
+            raise AuthError(f"'{email}' is already registered")
+        return user
+
+    @staticmethod
+    def authenticate(db: Session, email: str, password: str) -> User:
+        user = db.query(User).filter(User.email == email.strip().lower()).first()
+        if not user or not user.hashed_password or not AuthService.verify_password(password, user.hashed_password):
+            raise AuthError("Incorrect email or password")
+        return user
+
+    @staticmethod
+    async def register_async(db: AsyncSession, email: str, password: str) -> User:
+        return await db.run_sync(AuthService.register, email, password)
+
+    @staticmethod
+    async def authenticate_async(db: AsyncSession, email: str, password: str) -> User:
+        return await db.run_sync(AuthService.authenticate, email, password)
+
+def user_id_for_token(token: Optional[str]) -> int:
+    if token:
+        return AuthService.decode_access_token(token)
+    if settings.ALLOW_ANONYMOUS:
+        return ANONYMOUS_USER_ID
+    raise AuthError("Not authenticated")
+
+async def existing_user_id(db: AsyncSession, token: Optional[str]) -> int:
+    """Like ``user_id_for_token``, but a valid token for a deleted user is refused too."""
+    user_id = user_id_for_token(token)
+    if user_id != ANONYMOUS_USER_ID and await db.scalar(select(User.id).where(User.id == user_id)) is None:
+        raise AuthError("Invalid or expired token")
+    return user_id
+
+async def current_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> int:
+    """Dependency: the caller's user id, from an ``Authorization: Bearer`` token."""
+    try:
+        return await existing_user_id(db, credentials.credentials if credentials else None)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+async def websocket_user_id(token: Optional[str] = Query(None)) -> int:
+    # Browsers can't set headers on WebSocket handshakes, so the token comes as ?token=.
+    # Its own session: one from get_async_db would be held for the socket's lifetime
+    try:
+        async with AsyncSessionLocal() as db:
+            return await existing_user_id(db, token)
+    except AuthError as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
@@ -0,0 +1,301 @@
+import bisect
+import itertools
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.models import Meeting, Change
+from .change_tracker import ChangeTracker
+
+Busy = namedtuple("Busy", ["id", "title", "start", "end"])
+
+class IntervalIndex:
+    """One user's meetings, sorted by ``(start, id)`` in parallel arrays.
+
+    Overlap queries bisect to the first meeting that could still be running
+    at the query start (one that started at most ``longest`` earlier) and
+    scan to the query end, so they cost O(log n + meetings in that window).
+    Writes are O(log n) to locate plus a memmove of the arrays' tails; the
+    durations are kept sorted the same way so ``longest`` stays exact.
+    """
+
+    def __init__(self, meetings=(), version: int = 0):
+        self.meetings = sorted(meetings, key=lambda busy: (busy.start, busy.id))
+        self.keys = [(busy.start, busy.id) for busy in self.meetings]
+        self.by_id = {busy.id: busy for busy in self.meetings}
+        self.durations = sorted(busy.end - busy.start for busy in self.meetings)
+        # Last change log entry applied
+        self.version = version
+        # Last in-process meeting write seen (see Availability.written) and
+        # when the change log was last read
+        self.seen_write = 0
+        self.checked_at = float("-inf")
+
+    @property
+    def longest(self) -> timedelta:
+        return self.durations[-1] if self.durations else timedelta(0)
+
+    def __len__(self):
+        return len(self.meetings)
+
+    def add(self, busy: Busy):
+        self.remove(busy.id)
+        index = bisect.bisect_left(self.keys, (busy.start, busy.id))
+        self.keys.insert(index, (busy.start, busy.id))
+        self.meetings.insert(index, busy)
+        self.by_id[busy.id] = busy
+        bisect.insort(self.durations, busy.end - busy.start)
+
+    def remove(self, meeting_id: int):
+        busy = self.by_id.pop(meeting_id, None)
+        if busy is None:
+            return
+        index = bisect.bisect_left(self.keys, (busy.start, busy.id))
+        del self.keys[index]
+        del self.meetings[index]
+        del self.durations[bisect.bisect_left(self.durations, busy.end - busy.start)]
+
+    def first_candidate(self, start: datetime) -> int:
+        # A 1-tuple sorts before every (start, id) key with the same start
+        return bisect.bisect_left(self.keys, (start - self.longest,))
+
+    def overlapping(self, start: datetime, end: datetime, exclude_id: int = None) -> list:
+        """Meetings intersecting ``[start, end)``, in start order."""
+        last = bisect.bisect_left(self.keys, (end,))
+        return [
+            busy for busy in self.meetings[self.first_candidate(start):last]
+            if busy.end > start and busy.id != exclude_id
+        ]
+
+    def next_free(self, start: datetime, end: datetime, duration: timedelta):
+        """Earliest time in ``[start, end - duration]`` followed by ``duration``
+        without meetings, or ``None``."""
+        cursor = start
+        for index in range(self.first_candidate(start), len(self.meetings)):
+            busy = self.meetings[index]
+            if busy.start >= cursor + duration or cursor + duration > end:
+                break
+            cursor = max(cursor, busy.end)
+        return cursor if cursor + duration <= end else None
+
+class Availability:
+    """Free/busy answers over each user's meetings.
+
+    Indexes are built on first use and kept in an LRU. Before a query the
+    user's index replays the ``changes`` entries for meetings it hasn't seen
+    yet, so writes from any code path or worker process show up without
+    rebuilding. That read is skipped while no meeting write of the user has
+    committed in this process (see ``track_availability``) and the last read
+    is under ``recheck_interval`` seconds old, which bounds how late other
+    processes' writes show up. Times are compared as wall-clock times in
+    ``tz_name``, which is how SQLite hands them back.
+    """
+
+    def __init__(self, tz_name: str = "UTC", workday_start_hour: int = 9, workday_end_hour: int = 17,
+                 max_users: int = 256, recheck_interval: float = 0):
+        self.tz = ZoneInfo(tz_name)
+        self.workday_start_hour = workday_start_hour
+        self.workday_end_hour = workday_end_hour
+        self.max_users = max_users
+        self.recheck_interval = recheck_interval
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+        # User id -> sequence number of their last committed meeting write
+        self.writes = {}
+        self.sequence = itertools.count(1)
+        self.builds = 0
+        self.refreshes = 0
+        self.skipped = 0
+        AVAILABILITIES.add(self)
+
+    def written(self, user_ids: set):
+        """Marks the users' indexes stale after a commit touched their meetings."""
+        with self.lock:
+            for user_id in user_ids:
+                self.writes[user_id] = next(self.sequence)
+            if len(self.writes) > 4 * self.max_users:
+                # Only indexed users need theirs; the rest are read afresh on build
+                self.writes = {user_id: seq for user_id, seq in self.writes.items() if user_id in self.indexes}
+
+    def wall_clock(self, value: datetime) -> datetime:
+        return value.astimezone(self.tz).replace(tzinfo=None) if value.tzinfo else value
+
+    def to_busy(self, meeting_id: int, title: str, start: datetime, end: datetime) -> Busy:
+        return Busy(meeting_id, title, self.wall_clock(start), self.wall_clock(end))
+
+    def meeting_rows(self, db: Session, user_id: int):
+        return db.query(Meeting.id, Meeting.title, Meeting.start_time, Meeting.end_time).filter(
+            Meeting.user_id == user_id
+        )
+
+    def build(self, db: Session, user_id: int) -> IntervalIndex:
+        # Version first: changes racing the load get replayed, which is idempotent
+        version = ChangeTracker.current_version(db, user_id, "meetings")
+        self.builds += 1
+        return IntervalIndex([self.to_busy(*row) for row in self.meeting_rows(db, user_id)], version)
+
+    def changed_meetings(self, db: Session, user_id: int, version: int):
+        """``(last change id, changed ids, their current rows)`` for the user's
+        meetings changed after ``version``, or ``None`` if there are none."""
+        changed = db.query(Change.id, Change.row_id).filter(
+            Change.user_id == user_id,
+            Change.table_name == "meetings",
+            Change.id > version
+        ).all()
+        if not changed:
+            return None
+
+        row_ids = {row_id for _, row_id in changed}
+        rows = self.meeting_rows(db, user_id).filter(Meeting.id.in_(row_ids)).all()
+        return max(change_id for change_id, _ in changed), row_ids, [self.to_busy(*row) for row in rows]
+
+    def refresh(self, index: IntervalIndex, version: int, row_ids: set, meetings: list):
+        """Applies ``changed_meetings``; call with ``self.lock`` held."""
+        if version <= index.version:
+            # An overlapping refresh already got this far
+            return
+        for row_id in row_ids:
+            index.remove(row_id)
+        for busy in meetings:
+            index.add(busy)
+        index.version = version
+        self.refreshes += 1
+
+    def index(self, db: Session, user_id: int) -> IntervalIndex:
+        """The user's up-to-date index; read it with ``self.lock`` held.
+
+        The queries run without the lock. The async wrappers run this on the
+        event loop thread, where a caller waiting for the lock would block
+        the loop that the holder's query needs to finish.
+        """
+        with self.lock:
+            index = self.indexes.get(user_id)
+            # Read before the query, so a write committing during it stays unseen
+            seen_write = self.writes.get(user_id, 0)
+            if (index is not None and index.seen_write == seen_write
+                    and time.monotonic() - index.checked_at < self.recheck_interval):
+                self.skipped += 1
+                self.indexes.move_to_end(user_id)
+                return index
+            version = None if index is None else index.version
+        checked_at = time.monotonic()
+        if index is None:
+            built = self.build(db, user_id)
+        else:
+            changed = self.changed_meetings(db, user_id, version)
+
+        with self.lock:
+            if index is None:
+                # Another caller may have built one meanwhile; keep the newer
+                index = self.indexes.get(user_id)
+                if index is None or index.version < built.version:
+                    index = built
+            elif changed is not None:
+                self.refresh(index, *changed)
+            if checked_at > index.checked_at:
+                index.seen_write, index.checked_at = seen_write, checked_at
+            self.indexes[user_id] = index
+            self.indexes.move_to_end(user_id)
+            while len(self.indexes) > self.max_users:
+                evicted, _ = self.indexes.popitem(last=False)
+                self.writes.pop(evicted, None)
+        return index
+
+    def conflicts(self, db: Session, user_id: int, start: datetime, end: datetime, exclude_id: int = None) -> list:
+        index = self.index(db, user_id)
+        with self.lock:
+            return index.overlapping(self.wall_clock(start), self.wall_clock(end), exclude_id)
+
+    def is_free(self, db: Session, user_id: int, start: datetime, end: datetime) -> bool:
+        return not self.conflicts(db, user_id, start, end)
+
+    def meeting_conflicts(self, db: Session, user_id: int, meeting_id: int):
+        """``(meeting, conflicts)`` for one of the user's meetings, or ``(None, [])``."""
+        index = self.index(db, user_id)
+        with self.lock:
+            busy = index.by_id.get(meeting_id)
+            if busy is None:
+                return None, []
+            return busy, index.overlapping(busy.start, busy.end, exclude_id=meeting_id)
+
+    def workday_windows(self, after: datetime, until: datetime):
+        day = after.date()
+        while day <= until.date():
+            if day.weekday() < 5:
+                opens = datetime(day.year, day.month, day.day, self.workday_start_hour)
+                closes = datetime(day.year, day.month, day.day, self.workday_end_hour)
+                if closes > after and opens < until:
+                    yield max(opens, after), min(closes, until)
+            day += timedelta(days=1)
+
+    def next_free_slot(self, db: Session, user_id: int, duration: timedelta, after: datetime, until: datetime):
+        """Start of the first ``duration``-long gap within weekday working hours
+        between ``after`` and ``until``, in ``tz_name``, or ``None``."""
+        after, until = self.wall_clock(after), self.wall_clock(until)
+        index = self.index(db, user_id)
+        with self.lock:
+            for opens, closes in self.workday_windows(after, until):
+                slot = index.next_free(opens, closes, duration)
+                if slot is not None:
+                    return slot.replace(tzinfo=self.tz)
+        return None
+
+    async def conflicts_async(self, db: AsyncSession, user_id: int, start: datetime, end: datetime) -> list:
+        return await db.run_sync(self.conflicts, user_id, start, end)
+
+    async def meeting_conflicts_async(self, db: AsyncSession, user_id: int, meeting_id: int):
+        return await db.run_sync(self.meeting_conflicts, user_id, meeting_id)
+
+    async def next_free_slot_async(self, db: AsyncSession, user_id: int, duration: timedelta,
+                                   after: datetime, until: datetime):
+        return await db.run_sync(self.next_free_slot, user_id, duration, after, until)
+
+    def to_dict(self, busy: Busy) -> dict:
+        return {
+            "id": busy.id,
+            "title": busy.title,
+            "start_time": busy.start.replace(tzinfo=self.tz),
+            "end_time": busy.end.replace(tzinfo=self.tz)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.indexes),
+            "meetings": sum(len(index) for index in self.indexes.values()),
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+            "skipped": self.skipped
+        }
+
+# Every live Availability, told about meeting writes this process commits
+AVAILABILITIES = weakref.WeakSet()
+
+def collect_meeting_writes(session: Session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Meeting):
+            session.info.setdefault("meeting_writers", set()).add(instance.user_id)
+
+def apply_meeting_writes(session: Session):
+    user_ids = session.info.pop("meeting_writers", None)
+    if user_ids:
+        for availability in list(AVAILABILITIES):
+            availability.written(user_ids)
+
+def discard_meeting_writes(session: Session):
+    session.info.pop("meeting_writers", None)
+
+def track_availability():
+    """Tells this process's availability indexes which users' meetings a
+    commit wrote, so the others can skip reading the change log."""
+    for name, listener in (
+        ("after_flush", collect_meeting_writes),
+        ("after_commit", apply_meeting_writes),
+        ("after_rollback", discard_meeting_writes),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
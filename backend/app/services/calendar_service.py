@@ -1,50 +1,215 @@
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+"""Google Calendar over plain HTTP: batched event writes and incremental pulls.
+
+Requests go to ``GOOGLE_CALENDAR_API_URL``, which can point at
+``devtools.fake_calendar_server`` for local runs. Credentials are never
+obtained interactively on the request path; authorize once with
+
+    python -m app.services.calendar_service authorize
+
+which writes ``GOOGLE_CALENDAR_TOKEN_FILE`` for the sync worker to refresh.
+"""
+import asyncio
+import json
 import os.path
 import pickle
+import re
+import uuid
 from datetime import datetime
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+from config.settings import settings
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-class CalendarService:
-    def __init__(self):
+# Google accepts at most 50 calls per Calendar batch request
+MAX_BATCH_SIZE = 50
+
+class CalendarError(Exception):
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        # No status means the request never got an answer; a 401 may pass once the token is refreshed
+        return self.status is None or self.status in (401, 403, 429) or self.status >= 500
+
+class CalendarCall(NamedTuple):
+    method: str
+    path: str
+    body: Optional[dict] = None
+
+class CalendarResponse(NamedTuple):
+    status: int
+    body: dict
+
+class AccessTokens:
+    """Bearer tokens from ``GOOGLE_CALENDAR_ACCESS_TOKEN`` if set, else from the
+    stored OAuth credentials, refreshed off the event loop when they expire."""
+
+    def __init__(self, access_token: str = None, token_file: str = None):
+        self.access_token = access_token
+        self.token_file = token_file
         self.creds = None
-        self.service = None
-        self.initialize_credentials()
-
-    def initialize_credentials(self):
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
-                self.creds = pickle.load(token)
-        
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                self.creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
-                self.creds = flow.run_local_server(port=0)
-            
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(self.creds, token)
-
-        self.service = build('calendar', 'v3', credentials=self.creds)
-
-    def create_event(self, title: str, start_time: datetime, end_time: datetime, description: str = None):
-        event = {
-            'summary': title,
-            'description': description,
-            'start': {
-                'dateTime': start_time.isoformat(),
-                'timeZone': 'UTC',
-            },
-            'end': {
-                'dateTime': end_time.isoformat(),
-                'timeZone': 'UTC',
-            },
-        }
-
-        event = self.service.events().insert(calendarId='primary', body=event).execute()
-        return event['id'] 
\ No newline at end of file
+        self.lock = asyncio.Lock()
+
+    def load(self):
+        if not self.token_file or not os.path.exists(self.token_file):
+            raise CalendarError(f"No Google credentials at {self.token_file}; run `python -m app.services.calendar_service authorize`")
+        with open(self.token_file, 'rb') as token:
+            return pickle.load(token)
+
+    def refresh(self):
+        # The Google client libraries are slow to import and only needed here
+        from google.auth.transport.requests import Request
+
+        creds = self.creds or self.load()
+        if not creds.valid:
+            creds.refresh(Request())
+            with open(self.token_file, 'wb') as token:
+                pickle.dump(creds, token)
+        self.creds = creds
+        return creds.token
+
+    async def token(self) -> str:
+        if self.access_token:
+            return self.access_token
+        async with self.lock:
+            if self.creds is None or not self.creds.valid:
+                return await asyncio.to_thread(self.refresh)
+            return self.creds.token
+
+def encode_batch(calls: list, boundary: str) -> bytes:
+    parts = []
+    for index, call in enumerate(calls):
+        body = json.dumps(call.body) if call.body is not None else ""
+        parts.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <item{index}>\r\n\r\n"
+            f"{call.method} {call.path} HTTP/1.1\r\n"
+            "Content-Type: application/json\r\n\r\n"
+            f"{body}\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts).encode()
+
+RESPONSE_ID = re.compile(r"Content-ID:\s*<response-item(\d+)>", re.IGNORECASE)
+STATUS_LINE = re.compile(r"^HTTP/1\.1 (\d{3})", re.MULTILINE)
+
+def decode_batch(content: bytes, content_type: str, size: int) -> list:
+    """One ``CalendarResponse`` per call, in call order; parts the server
+    left out come back as a 500 so they are retried."""
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
+        raise CalendarError(f"Batch response without a boundary: {content_type}", 502)
+
+    responses = [CalendarResponse(500, {"error": {"message": "missing from batch response"}})] * size
+    for part in content.decode().split(f"--{match.group(1)}"):
+        index, status = RESPONSE_ID.search(part), STATUS_LINE.search(part)
+        if not index or not status or int(index.group(1)) >= size:
+            continue
+        # The embedded response's body follows its own blank line
+        payload = part[status.start():].split("\r\n\r\n", 1)
+        body = payload[1].strip() if len(payload) == 2 else ""
+        try:
+            parsed = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            parsed = {"error": {"message": body}}
+        responses[int(index.group(1))] = CalendarResponse(int(status.group(1)), parsed)
+    return responses
+
+class CalendarClient:
+    def __init__(self, api_url: str = None, tokens: AccessTokens = None, timeout: float = None):
+        import httpx
+
+        self.api_url = (api_url or settings.GOOGLE_CALENDAR_API_URL).rstrip("/")
+        self.tokens = tokens or AccessTokens(settings.GOOGLE_CALENDAR_ACCESS_TOKEN, settings.GOOGLE_CALENDAR_TOKEN_FILE)
+        self.http = httpx.AsyncClient(timeout=timeout or settings.CALENDAR_TIMEOUT)
+        self.requests = 0
+        self.calls = 0
+
+    async def close(self):
+        await self.http.aclose()
+
+    @staticmethod
+    def events_path(calendar_id: str, event_id: str = None) -> str:
+        # Ids such as holiday calendars' contain "#" and "@"; encoded, nothing
+        # in them can change the path or break a batch part's request line
+        path = f"/calendar/v3/calendars/{quote(calendar_id, safe='')}/events"
+        return f"{path}/{quote(event_id, safe='')}" if event_id else path
+
+    async def send(self, method: str, url: str, **kwargs):
+        import httpx
+
+        headers = {"Authorization": f"Bearer {await self.tokens.token()}", **kwargs.pop("headers", {})}
+        self.requests += 1
+        try:
+            response = await self.http.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            raise CalendarError(f"{method} {url}: {e!r}")
+        if response.status_code >= 400:
+            raise CalendarError(f"{method} {url}: HTTP {response.status_code} {response.text[:200]}", response.status_code)
+        return response
+
+    async def batch(self, calls: list) -> list:
+        """Sends up to ``MAX_BATCH_SIZE`` calls in one HTTP request; each gets
+        its own status, so one failed call doesn't fail the rest."""
+        if len(calls) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} calls per batch")
+        boundary = f"batch_{uuid.uuid4().hex}"
+        self.calls += len(calls)
+        response = await self.send(
+            "POST", f"{self.api_url}/batch/calendar/v3",
+            content=encode_batch(calls, boundary),
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"}
+        )
+        return decode_batch(response.content, response.headers.get("content-type", ""), len(calls))
+
+    async def changes(self, calendar_id: str, sync_token: str = None):
+        """``(events, next sync token)``: everything when ``sync_token`` is
+        empty, else only events changed since, cancellations included. A
+        410 means the token expired and a full pull is needed."""
+        events, page_token = [], None
+        while True:
+            params = {"maxResults": 250, "showDeleted": "true"}
+            if sync_token:
+                params["syncToken"] = sync_token
+            if page_token:
+                params["pageToken"] = page_token
+            self.calls += 1
+            page = (await self.send("GET", self.api_url + self.events_path(calendar_id), params=params)).json()
+            events.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return events, page.get("nextSyncToken")
+
+def event_body(title: str, start_time: datetime, end_time: datetime, event_id: str = None, description: str = None) -> dict:
+    # Naive times are wall-clock times in TIMEZONE, like everywhere else
+    body = {
+        'summary': title,
+        'start': {'dateTime': start_time.isoformat(), 'timeZone': settings.TIMEZONE},
+        'end': {'dateTime': end_time.isoformat(), 'timeZone': settings.TIMEZONE},
+    }
+    if event_id:
+        body['id'] = event_id
+    if description:
+        body['description'] = description
+    return body
+
+def authorize():
+    """Runs the interactive OAuth flow once and stores the credentials."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    flow = InstalledAppFlow.from_client_secrets_file(settings.GOOGLE_CALENDAR_CREDENTIALS or 'credentials.json', SCOPES)
+    creds = flow.run_local_server(port=0)
+    with open(settings.GOOGLE_CALENDAR_TOKEN_FILE, 'wb') as token:
+        pickle.dump(creds, token)
+    print(f"Saved credentials to {settings.GOOGLE_CALENDAR_TOKEN_FILE}")
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["authorize"]:
+        raise SystemExit("usage: python -m app.services.calendar_service authorize")
+    authorize()
@@ -0,0 +1,521 @@
+import asyncio
+import logging
+import random
+import re
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import SessionLocal
+from ..models.models import Meeting, CalendarLink, CalendarOutbox, User
+from .auth_service import ANONYMOUS_USER_ID
+from .calendar_service import CalendarClient, CalendarCall, CalendarError, MAX_BATCH_SIZE, event_body
+from .jobs import job_handler, enqueue
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Session.info flag for the worker's own writes, which must not be queued back
+SYNC_ORIGIN = "calendar_sync"
+
+OWN_EVENT_ID = re.compile(r"^pau\d+m\d+$")
+
+class CalendarLinkError(Exception):
+    """A calendar the user may not link; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+def owned_links():
+    """Links the sync worker may act on.
+
+    Every user's calendar is reached with the server's one Google
+    credential, so a link is only honoured for the user's own primary
+    calendar, whose id is their account email, and only while no other
+    user links the same calendar. Links from before that rule stay in
+    place but are neither pushed to nor pulled from.
+    """
+    shared = select(CalendarLink.calendar_id).group_by(CalendarLink.calendar_id).having(func.count() > 1)
+    return select(CalendarLink).join(User, User.id == CalendarLink.user_id).where(
+        func.lower(CalendarLink.calendar_id) == User.email,
+        CalendarLink.calendar_id.not_in(shared)
+    )
+
+def event_id_for(user_id: int, meeting_id: int) -> str:
+    # Google event ids are 5-1024 base32hex characters (a-v, 0-9)
+    return f"pau{user_id}m{meeting_id}"
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def queue_push(db: Session):
+    # Only processes with sync on push; elsewhere the rows wait for one that does
+    if settings.CALENDAR_SYNC_ENABLED:
+        enqueue(db, "calendar.push", dedupe_key="calendar.push")
+
+def queue_meeting_writes(session: Session, flush_context):
+    if session.info.get(SYNC_ORIGIN):
+        return
+    writes = []
+    for operation, instances in (
+        ("create", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted),
+    ):
+        for instance in instances:
+            if not isinstance(instance, Meeting):
+                continue
+            if operation == "update" and not session.is_modified(instance, include_collections=False):
+                continue
+            writes.append((operation, instance))
+    if not writes:
+        return
+
+    connection = session.connection()
+    linked = set(connection.execute(
+        select(CalendarLink.user_id).where(CalendarLink.user_id.in_({instance.user_id for _, instance in writes}))
+    ).scalars())
+    now = utcnow()
+    rows = [
+        {
+            "user_id": instance.user_id,
+            "meeting_id": instance.id,
+            "operation": operation,
+            "event_id": instance.calendar_event_id or event_id_for(instance.user_id, instance.id),
+            "next_attempt_at": now
+        }
+        for operation, instance in writes if instance.user_id in linked
+    ]
+    # Same connection as the meeting write, so the two commit or roll back together
+    if rows:
+        connection.execute(insert(CalendarOutbox), rows)
+        queue_push(session)
+
+def track_calendar_writes():
+    """Queues every ORM write to a linked user's meetings for the sync worker."""
+    if not event.contains(Session, "after_flush", queue_meeting_writes):
+        event.listen(Session, "after_flush", queue_meeting_writes)
+
+class Push:
+    """The outbox rows claimed for one meeting, coalesced into one call."""
+    __slots__ = ("row_ids", "attempts", "user_id", "meeting_id", "event_id", "method", "call")
+
+    def __init__(self, row_ids, attempts, user_id, meeting_id, event_id, method, call):
+        self.row_ids = row_ids
+        self.attempts = attempts
+        self.user_id = user_id
+        self.meeting_id = meeting_id
+        self.event_id = event_id
+        self.method = method
+        self.call = call
+
+class CalendarSync:
+    """Drains the calendar outbox and mirrors remote changes back.
+
+    Each round claims up to ``batch_size`` due rows with a lease, so
+    several workers can share the outbox without sending a write twice.
+    Rows for the same meeting collapse into one call built from the
+    meeting's current state: an insert under its deterministic event id
+    until the insert has succeeded, a patch after, a delete once the
+    meeting is gone. A retried insert therefore hits 409 instead of
+    creating a duplicate. Failed calls back off exponentially with
+    jitter; after ``max_attempts`` the rows stay behind with their error.
+
+    Linked calendars are pulled every ``pull_interval`` seconds with
+    their sync token, so only events changed since the last pull come
+    back. Meetings with writes still in the outbox keep the local
+    version; remote deletions win otherwise.
+    """
+
+    def __init__(self, client: CalendarClient = None, session_factory=SessionLocal,
+                 batch_size: int = None, max_attempts: int = None, base_delay: float = None,
+                 max_delay: float = None, interval: float = None, pull_interval: float = None):
+        self.client = client or CalendarClient()
+        self.session_factory = session_factory
+        self.batch_size = min(batch_size or settings.CALENDAR_BATCH_SIZE, MAX_BATCH_SIZE)
+        self.max_attempts = max_attempts or settings.CALENDAR_MAX_ATTEMPTS
+        self.base_delay = settings.CALENDAR_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.CALENDAR_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.interval = interval or settings.CALENDAR_SYNC_INTERVAL
+        self.pull_interval = settings.CALENDAR_PULL_INTERVAL if pull_interval is None else pull_interval
+        # A claimed batch that outlives this (a crashed worker) becomes due again
+        self.lease = timedelta(seconds=settings.CALENDAR_TIMEOUT * 2)
+        self.tz = ZoneInfo(settings.TIMEZONE)
+        self.pushed = 0
+        self.retried = 0
+        self.dead = 0
+        self.pulled = 0
+
+    def wall_clock(self, value: datetime) -> datetime:
+        return value.astimezone(self.tz).replace(tzinfo=None) if value.tzinfo else value
+
+    def claim(self) -> list:
+        token = uuid.uuid4().hex
+        now = utcnow()
+        with self.session_factory() as db:
+            due = select(CalendarOutbox.id).where(
+                CalendarOutbox.next_attempt_at <= now
+            ).order_by(CalendarOutbox.id).limit(self.batch_size)
+            # One statement, so two workers can't both claim a row
+            db.execute(update(CalendarOutbox).where(
+                CalendarOutbox.id.in_(due),
+                CalendarOutbox.next_attempt_at <= now
+            ).values(claim_token=token, next_attempt_at=now + self.lease))
+            db.commit()
+
+            rows = db.query(CalendarOutbox).filter(CalendarOutbox.claim_token == token).order_by(CalendarOutbox.id).all()
+            if not rows:
+                return []
+            meetings = {
+                meeting.id: meeting
+                for meeting in db.query(Meeting).filter(Meeting.id.in_({row.meeting_id for row in rows}))
+            }
+            # Rows of links that aren't honoured are dropped like an unlinked user's
+            calendars = dict(db.execute(owned_links().with_only_columns(
+                CalendarLink.user_id, CalendarLink.calendar_id
+            ).where(CalendarLink.user_id.in_({row.user_id for row in rows}))).all())
+
+            groups = OrderedDict()
+            for row in rows:
+                groups.setdefault((row.user_id, row.meeting_id), []).append(row)
+            return [self.coalesce(group, meetings.get(meeting_id), calendars.get(user_id))
+                    for (user_id, meeting_id), group in groups.items()]
+
+    def coalesce(self, rows: list, meeting: Meeting, calendar_id: str) -> Push:
+        first = rows[0]
+        row_ids = [row.id for row in rows]
+        attempts = max(row.attempts for row in rows)
+        if calendar_id is None:
+            # Unlinked since the write; nothing to send
+            return Push(row_ids, attempts, first.user_id, first.meeting_id, first.event_id, None, None)
+        if meeting is None or meeting.user_id != first.user_id:
+            event_id = rows[-1].event_id
+            return Push(row_ids, attempts, first.user_id, first.meeting_id, event_id, "delete",
+                        CalendarCall("DELETE", CalendarClient.events_path(calendar_id, event_id)))
+
+        start, end = self.wall_clock(meeting.start_time), self.wall_clock(meeting.end_time)
+        if meeting.calendar_event_id:
+            event_id = meeting.calendar_event_id
+            return Push(row_ids, attempts, first.user_id, first.meeting_id, event_id, "patch",
+                        CalendarCall("PATCH", CalendarClient.events_path(calendar_id, event_id),
+                                     event_body(meeting.title, start, end)))
+        event_id = first.event_id
+        return Push(row_ids, attempts, first.user_id, first.meeting_id, event_id, "insert",
+                    CalendarCall("POST", CalendarClient.events_path(calendar_id),
+                                 event_body(meeting.title, start, end, event_id)))
+
+    def backoff(self, attempts: int) -> timedelta:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    def outcome(self, push: Push, status: int, error: str = None, retryable: bool = True) -> tuple:
+        """``(state, error)`` with state one of done, linked, again, retry, dead."""
+        if push.method is None or 200 <= status < 300:
+            return ("linked" if push.method == "insert" else "done"), None
+        if push.method == "insert" and status == 409:
+            # An earlier attempt got through; patch it with the current state
+            return "linked_again", None
+        if push.method in ("patch", "delete") and status in (404, 410):
+            # Already gone remotely; the next pull removes a patched meeting locally
+            return "done", None
+        if not retryable or push.attempts + 1 >= self.max_attempts:
+            return "dead", error
+        return "retry", error
+
+    def record(self, results: list):
+        now = utcnow()
+        with self.session_factory(info={SYNC_ORIGIN: True}) as db:
+            for push, (state, error) in results:
+                rows = CalendarOutbox.id.in_(push.row_ids)
+                if state in ("done", "linked"):
+                    db.execute(CalendarOutbox.__table__.delete().where(rows))
+                    self.pushed += 1
+                elif state == "linked_again":
+                    db.execute(update(CalendarOutbox).where(rows).values(claim_token=None, next_attempt_at=now))
+                elif state == "retry":
+                    db.execute(update(CalendarOutbox).where(rows).values(
+                        claim_token=None, attempts=push.attempts + 1, last_error=error,
+                        next_attempt_at=now + self.backoff(push.attempts)
+                    ))
+                    self.retried += 1
+                else:
+                    db.execute(update(CalendarOutbox).where(rows).values(
+                        claim_token=None, attempts=push.attempts + 1, last_error=error, next_attempt_at=None
+                    ))
+                    self.dead += 1
+                    logger.warning(f"Gave up syncing meeting {push.meeting_id}: {error}")
+
+                if state in ("linked", "linked_again"):
+                    # Core update: not a meeting change worth logging or queueing
+                    db.execute(update(Meeting).where(
+                        Meeting.id == push.meeting_id, Meeting.calendar_event_id.is_(None)
+                    ).values(calendar_event_id=push.event_id))
+            db.commit()
+
+    def release(self, pushes: list):
+        """Makes claimed rows due again without counting an attempt."""
+        row_ids = [row_id for push in pushes for row_id in push.row_ids]
+        with self.session_factory(info={SYNC_ORIGIN: True}) as db:
+            # Rows record() got to are no longer claimed
+            db.execute(update(CalendarOutbox).where(
+                CalendarOutbox.id.in_(row_ids), CalendarOutbox.claim_token.is_not(None)
+            ).values(claim_token=None, next_attempt_at=utcnow()))
+            db.commit()
+
+    async def push(self) -> int:
+        """Sends one batch of due outbox rows; returns how many rows it claimed."""
+        pushes = await asyncio.to_thread(self.claim)
+        if not pushes:
+            return 0
+        recorded = False
+        try:
+            sendable = [push for push in pushes if push.call is not None]
+            results = [(push, self.outcome(push, 204)) for push in pushes if push.call is None]
+            if sendable:
+                try:
+                    responses = await self.client.batch([push.call for push in sendable])
+                    for push, response in zip(sendable, responses):
+                        message = (response.body.get("error") or {}).get("message") if response.status >= 400 else None
+                        error = CalendarError(f"HTTP {response.status} {message}", response.status)
+                        results.append((push, self.outcome(push, response.status, str(error), error.retryable)))
+                except CalendarError as e:
+                    results.extend((push, self.outcome(push, e.status or 0, str(e), e.retryable)) for push in sendable)
+            await asyncio.to_thread(self.record, results)
+            recorded = True
+        finally:
+            if not recorded:
+                # Anything but a calendar error, or cancellation: hand the rows back
+                # now rather than when the lease runs out. Not in a thread, since
+                # the loop may be shutting down
+                try:
+                    self.release(pushes)
+                except Exception:
+                    logger.exception(f"Releasing {len(pushes)} claimed calendar pushes failed")
+        return sum(len(push.row_ids) for push in pushes)
+
+    def event_time(self, value: dict):
+        # All-day events only carry a date; they don't map to a meeting
+        if not value or "dateTime" not in value:
+            return None
+        parsed = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        return parsed.astimezone(self.tz) if parsed.tzinfo else parsed.replace(tzinfo=self.tz)
+
+    def claim_pull(self) -> list:
+        """Links due for a pull, each marked as pulled so other workers skip it."""
+        now = utcnow()
+        cutoff = now - timedelta(seconds=self.pull_interval)
+        claimed = []
+        with self.session_factory() as db:
+            for user_id, calendar_id, sync_token in db.execute(owned_links().with_only_columns(
+                CalendarLink.user_id, CalendarLink.calendar_id, CalendarLink.sync_token
+            ).where((CalendarLink.pulled_at.is_(None)) | (CalendarLink.pulled_at <= cutoff))).all():
+                taken = db.execute(update(CalendarLink).where(
+                    CalendarLink.user_id == user_id,
+                    (CalendarLink.pulled_at.is_(None)) | (CalendarLink.pulled_at <= cutoff)
+                ).values(pulled_at=now))
+                if taken.rowcount:
+                    claimed.append((user_id, calendar_id, sync_token))
+            db.commit()
+        return claimed
+
+    def apply_events(self, user_id: int, events: list, sync_token: str) -> int:
+        applied = 0
+        with self.session_factory(info={SYNC_ORIGIN: True}) as db:
+            event_ids = [item["id"] for item in events]
+            meetings = {
+                meeting.calendar_event_id: meeting
+                for meeting in db.query(Meeting).filter(Meeting.user_id == user_id, Meeting.calendar_event_id.in_(event_ids))
+            }
+            unpushed = set(db.scalars(select(CalendarOutbox.event_id).where(
+                CalendarOutbox.user_id == user_id, CalendarOutbox.event_id.in_(event_ids)
+            )))
+
+            for item in events:
+                if item["id"] in unpushed:
+                    continue
+                meeting = meetings.get(item["id"])
+                if item.get("status") == "cancelled":
+                    if meeting is not None:
+                        db.delete(meeting)
+                        applied += 1
+                    continue
+
+                start, end = self.event_time(item.get("start")), self.event_time(item.get("end"))
+                if start is None or end is None:
+                    continue
+                title = item.get("summary") or "(no title)"
+                if meeting is None:
+                    # Our own event whose meeting is already deleted here
+                    if OWN_EVENT_ID.match(item["id"]):
+                        continue
+                    db.add(Meeting(user_id=user_id, title=title, start_time=start, end_time=end, calendar_event_id=item["id"]))
+                    applied += 1
+                elif (meeting.title, self.wall_clock(meeting.start_time), self.wall_clock(meeting.end_time)) != (
+                    title, self.wall_clock(start), self.wall_clock(end)
+                ):
+                    meeting.title, meeting.start_time, meeting.end_time = title, start, end
+                    applied += 1
+
+            if sync_token:
+                db.execute(update(CalendarLink).where(CalendarLink.user_id == user_id).values(sync_token=sync_token))
+            db.commit()
+        self.pulled += applied
+        return applied
+
+    async def pull(self, user_id: int, calendar_id: str, sync_token: str = None) -> int:
+        try:
+            events, next_token = await self.client.changes(calendar_id, sync_token)
+        except CalendarError as e:
+            if e.status != 410 or not sync_token:
+                raise
+            # Expired token: start over with a full pull
+            events, next_token = await self.client.changes(calendar_id)
+        return await asyncio.to_thread(self.apply_events, user_id, events, next_token)
+
+    async def pull_due(self) -> int:
+        applied = 0
+        for user_id, calendar_id, sync_token in await asyncio.to_thread(self.claim_pull):
+            try:
+                applied += await self.pull(user_id, calendar_id, sync_token)
+            except CalendarError as e:
+                logger.warning(f"Calendar pull for user {user_id} failed: {e}")
+        return applied
+
+    async def drain(self) -> int:
+        """Pushes until nothing is due; returns the number of rows handled."""
+        handled = 0
+        while True:
+            claimed = await self.push()
+            if not claimed:
+                return handled
+            handled += claimed
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                claimed = await self.push()
+                if claimed < self.batch_size:
+                    await self.pull_due()
+            except Exception:
+                logger.exception("Calendar sync round failed")
+                claimed = 0
+            # Keep going without a pause while there is a backlog
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "pushed": self.pushed,
+            "retried": self.retried,
+            "dead": self.dead,
+            "pulled": self.pulled,
+            "http_requests": self.client.requests,
+            "api_calls": self.client.calls
+        }
+
+_calendar_sync = None
+
+def get_calendar_sync() -> CalendarSync:
+    """This process's sync worker, built on first use."""
+    global _calendar_sync
+    if _calendar_sync is None:
+        _calendar_sync = CalendarSync()
+    return _calendar_sync
+
+@job_handler("calendar.push")
+async def push_calendar(payload: dict):
+    # Pushes right after the write commits; the polling loop covers retries and pulls.
+    # Jobs queued before sync was turned off are dropped, not failed
+    if not settings.CALENDAR_SYNC_ENABLED:
+        return
+    await get_calendar_sync().drain()
+
+class CalendarLinks:
+    @staticmethod
+    def link(db: Session, user_id: int, calendar_id: str = None) -> CalendarLink:
+        """Starts mirroring the user's meetings to their primary calendar;
+        meetings that aren't there yet are queued right away.
+
+        ``calendar_id`` defaults to the account email, the only calendar a
+        user may link (see ``owned_links``). Raises ``CalendarLinkError``
+        for anyone else's calendar.
+        """
+        user = db.get(User, user_id)
+        if user is None or user_id == ANONYMOUS_USER_ID:
+            raise CalendarLinkError("Sign in to link a calendar", 403)
+        calendar_id = calendar_id or user.email
+        if calendar_id.lower() != user.email:
+            raise CalendarLinkError(f"Only your own calendar, {user.email}, can be linked", 403)
+        if db.scalar(select(CalendarLink.user_id).where(
+            CalendarLink.calendar_id == calendar_id, CalendarLink.user_id != user_id
+        )) is not None:
+            raise CalendarLinkError("This calendar is linked to another account", 409)
+
+        link = db.get(CalendarLink, user_id)
+        if link is None:
+            link = CalendarLink(user_id=user_id, calendar_id=calendar_id)
+            db.add(link)
+        elif link.calendar_id != calendar_id:
+            # A different calendar: everything is new there
+            link.calendar_id, link.sync_token, link.pulled_at = calendar_id, None, None
+            db.execute(update(Meeting).where(Meeting.user_id == user_id).values(calendar_event_id=None))
+        db.flush()
+
+        queued = set(db.scalars(select(CalendarOutbox.meeting_id).where(CalendarOutbox.user_id == user_id)))
+        now = utcnow()
+        rows = [
+            {"user_id": user_id, "meeting_id": meeting_id, "operation": "create",
+             "event_id": event_id_for(user_id, meeting_id), "next_attempt_at": now}
+            for meeting_id in db.scalars(select(Meeting.id).where(
+                Meeting.user_id == user_id, Meeting.calendar_event_id.is_(None)
+            )) if meeting_id not in queued
+        ]
+        if rows:
+            db.execute(insert(CalendarOutbox), rows)
+            queue_push(db)
+        db.commit()
+        return link
+
+    @staticmethod
+    def unlink(db: Session, user_id: int) -> bool:
+        link = db.get(CalendarLink, user_id)
+        if link is None:
+            return False
+        db.delete(link)
+        db.execute(CalendarOutbox.__table__.delete().where(CalendarOutbox.user_id == user_id))
+        db.commit()
+        return True
+
+    @staticmethod
+    def status(db: Session, user_id: int) -> dict:
+        link = db.get(CalendarLink, user_id)
+        pending, failed = db.query(
+            func.count(CalendarOutbox.id).filter(CalendarOutbox.next_attempt_at.isnot(None)),
+            func.count(CalendarOutbox.id).filter(CalendarOutbox.next_attempt_at.is_(None))
+        ).filter(CalendarOutbox.user_id == user_id).one()
+        return {
+            "linked": link is not None,
+            "calendar_id": link.calendar_id if link else None,
+            "pulled_at": link.pulled_at if link else None,
+            "pending": pending,
+            "failed": failed
+        }
+
+    @staticmethod
+    async def link_async(db: AsyncSession, user_id: int, calendar_id: str = None) -> CalendarLink:
+        return await db.run_sync(CalendarLinks.link, user_id, calendar_id)
+
+    @staticmethod
+    async def unlink_async(db: AsyncSession, user_id: int) -> bool:
+        return await db.run_sync(CalendarLinks.unlink, user_id)
+
+    @staticmethod
+    async def status_async(db: AsyncSession, user_id: int) -> dict:
+        return await db.run_sync(CalendarLinks.status, user_id)
@@ -0,0 +1,128 @@
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.models import Task, Meeting, Change
+from .task_service import TaskService
+from .meeting_service import MeetingService
+from .event_hub import event_hub
+from .projections import TASK_ROW, MEETING_ROW
+
+TRACKED_MODELS = {
+    Task: "tasks",
+    Meeting: "meetings",
+}
+
+SERIALIZERS = {
+    "tasks": (Task, TaskService.to_dict),
+    "meetings": (Meeting, MeetingService.to_dict),
+}
+
+# What /api/changes reads back for each table; the same shape as the serializers
+PROJECTIONS = {
+    "tasks": (Task, TASK_ROW),
+    "meetings": (Meeting, MEETING_ROW),
+}
+
+MAX_CHANGES = 1000
+
+EVENT_NAMES = {
+    ("tasks", "create"): "task.created",
+    ("tasks", "update"): "task.updated",
+    ("tasks", "delete"): "task.deleted",
+    ("meetings", "create"): "meeting.created",
+    ("meetings", "update"): "meeting.updated",
+    ("meetings", "delete"): "meeting.deleted",
+}
+
+def build_event(table_name: str, operation: str, instance) -> dict:
+    name = EVENT_NAMES[(table_name, operation)]
+    if name == "task.updated" and instance.completed:
+        name = "task.completed"
+
+    _, to_dict = SERIALIZERS[table_name]
+    return {"event": name, "data": to_dict(instance)}
+
+def record_changes(session: Session, flush_context):
+    rows = []
+    for operation, instances in (
+        ("create", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted),
+    ):
+        for instance in instances:
+            table_name = TRACKED_MODELS.get(type(instance))
+            if table_name is None:
+                continue
+            if operation == "update" and not session.is_modified(instance, include_collections=False):
+                continue
+            rows.append({"user_id": instance.user_id, "table_name": table_name, "row_id": instance.id, "operation": operation})
+            # Serialized now, while deleted rows are still readable
+            session.info.setdefault("pending_events", []).append(
+                (instance.user_id, build_event(table_name, operation, instance))
+            )
+
+    # Written on the flush's own connection so the log commits or rolls back with the data
+    if rows:
+        session.connection().execute(insert(Change), rows)
+
+def publish_changes(session: Session):
+    for user_id, update in session.info.pop("pending_events", []):
+        event_hub.publish(update, user_id)
+
+def discard_changes(session: Session):
+    session.info.pop("pending_events", None)
+
+def track_changes():
+    """Logs every ORM write to tasks and meetings, whichever code path makes it,
+    and sends it to the owner's live subscribers once the transaction commits."""
+    for name, listener in (
+        ("after_flush", record_changes),
+        ("after_commit", publish_changes),
+        ("after_rollback", discard_changes),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+class ChangeTracker:
+    @staticmethod
+    def current_version(db: Session, user_id: int, table_name: str = None) -> int:
+        query = db.query(func.max(Change.id)).filter(Change.user_id == user_id)
+        if table_name:
+            query = query.filter(Change.table_name == table_name)
+        return query.scalar() or 0
+
+    @staticmethod
+    def changes_since(db: Session, user_id: int, since: int, limit: int = MAX_CHANGES) -> dict:
+        """Returns ``user_id``'s rows created, modified or deleted after version ``since``.
+
+        Rows are reported in their current state, so several writes to the same
+        row collapse into one entry. ``more`` is set when the delta was cut off
+        at ``limit`` log entries; fetch again from the returned ``version``.
+        """
+        changes = db.query(Change.id, Change.table_name, Change.row_id).filter(
+            Change.user_id == user_id,
+            Change.id > since
+        ).order_by(Change.id).limit(limit).all()
+        version = changes[-1].id if changes else max(since, ChangeTracker.current_version(db, user_id))
+
+        touched = {table_name: set() for table_name in PROJECTIONS}
+        for change in changes:
+            touched[change.table_name].add(change.row_id)
+
+        result = {"version": version, "more": len(changes) == limit}
+        for table_name, row_ids in touched.items():
+            model, projection = PROJECTIONS[table_name]
+            rows = projection.query(db).filter(model.user_id == user_id, model.id.in_(row_ids)).all() if row_ids else []
+            result[table_name] = {
+                "upserted": projection.dicts(rows),
+                "deleted": sorted(row_ids - {row.id for row in rows})
+            }
+        return result
+
+    @staticmethod
+    async def current_version_async(db: AsyncSession, user_id: int, table_name: str = None) -> int:
+        return await db.run_sync(ChangeTracker.current_version, user_id, table_name)
+
+    @staticmethod
+    async def changes_since_async(db: AsyncSession, user_id: int, since: int, limit: int = MAX_CHANGES) -> dict:
+        return await db.run_sync(ChangeTracker.changes_since, user_id, since, limit)
@@ -0,0 +1,161 @@
+import json
+import threading
+from collections import OrderedDict
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import SessionLocal
+from ..models.models import Conversation
+from .jobs import job_handler, enqueue, PRIORITY_HIGH
+from .token_usage import estimate_tokens
+
+class ConversationState:
+    __slots__ = ("session_id", "summary", "turns", "version")
+
+    def __init__(self, session_id: str, summary: str = "", turns: list = None, version: int = 0):
+        self.session_id = session_id
+        self.summary = summary
+        # [{"user": message, "assistant": reply envelope as JSON}], oldest first
+        self.turns = turns or []
+        # Turns recorded over the session's lifetime, summarized ones included
+        self.version = version
+
+def describe_reply(reply_json: str) -> str:
+    """One-line gist of a stored reply envelope for the summary."""
+    try:
+        reply = json.loads(reply_json)
+    except json.JSONDecodeError:
+        return reply_json
+
+    content = reply.get("content")
+    if reply.get("type") == "action" and isinstance(content, dict):
+        target = content.get("task") or content.get("meeting") or ""
+        if isinstance(target, dict):
+            target = f"{target.get('title', '')} {target.get('date_info', '')}".strip()
+        return f"{content.get('action')} {target}".strip()
+    return str(content)
+
+class ConversationStore:
+    """Per-session chat memory with constant context cost.
+
+    The newest turns are replayed verbatim up to ``window_turns`` and
+    ``token_budget``; older ones are folded into a rolling summary capped
+    at ``summary_tokens``. Sessions are cached in an LRU and persisted to
+    the ``conversations`` table by a background job, so evicted or
+    restarted sessions pick up where they left off while the chat request
+    only queues the job.
+    """
+
+    def __init__(self, max_sessions: int = 1000, window_turns: int = 6,
+                 token_budget: int = 400, summary_tokens: int = 120):
+        self.max_sessions = max_sessions
+        self.window_turns = window_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        # Queued snapshots need their handler; the runner may be in this process
+        register_jobs()
+
+    def cached(self, session_id: str):
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is not None:
+                self.sessions.move_to_end(session_id)
+            return state
+
+    def remember(self, state: ConversationState):
+        with self.lock:
+            self.sessions[state.session_id] = state
+            self.sessions.move_to_end(state.session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, db: Session, session_id: str) -> ConversationState:
+        state = self.cached(session_id)
+        if state is not None:
+            return state
+
+        self.loads += 1
+        row = db.get(Conversation, session_id)
+        state = (
+            ConversationState(session_id, row.summary, json.loads(row.turns), row.version or 0)
+            if row else ConversationState(session_id)
+        )
+        self.remember(state)
+        return state
+
+    def history(self, state: ConversationState) -> list:
+        """Chat messages to place between the system prompt and the new message."""
+        messages = []
+        if state.summary:
+            messages.append({"role": "system", "content": f"Earlier in this conversation: {state.summary}"})
+        for turn in state.turns:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        return messages
+
+    def turns_tokens(self, turns: list) -> int:
+        return sum(estimate_tokens(turn["user"]) + estimate_tokens(turn["assistant"]) for turn in turns)
+
+    def compact(self, state: ConversationState):
+        # Fold the oldest turns into the summary until the window fits both caps
+        while state.turns and (
+            len(state.turns) > self.window_turns or self.turns_tokens(state.turns) > self.token_budget
+        ):
+            turn = state.turns.pop(0)
+            line = f"user: {turn['user']} -> {describe_reply(turn['assistant'])}"
+            summary = f"{state.summary} | {line}" if state.summary else line
+            # Keep the newest part when the summary outgrows its budget
+            max_chars = self.summary_tokens * 4
+            state.summary = summary if len(summary) <= max_chars else "..." + summary[-max_chars:]
+
+    def append(self, db: Session, session_id: str, message: str, reply: dict):
+        """Records a turn and queues the session's new state for saving; the caller commits."""
+        state = self.get(db, session_id)
+        with self.lock:
+            state.turns.append({"user": message, "assistant": json.dumps(reply, separators=(",", ":"))})
+            self.compact(state)
+            state.version += 1
+            snapshot = {"session_id": session_id, "summary": state.summary, "turns": list(state.turns), "version": state.version}
+
+        # Turns arriving before the job runs fold into the one queued job
+        enqueue(db, "conversation.persist", snapshot, dedupe_key=f"conversation:{session_id}")
+
+    async def history_async(self, db: AsyncSession, session_id: str) -> list:
+        state = self.cached(session_id)
+        if state is None:
+            state = await db.run_sync(self.get, session_id)
+        return self.history(state)
+
+    async def append_async(self, db: AsyncSession, session_id: str, message: str, reply: dict):
+        await db.run_sync(self.append, session_id, message, reply)
+        await db.commit()
+
+    def stats(self) -> dict:
+        return {"sessions": len(self.sessions), "loads": self.loads, "evictions": self.evictions}
+
+def persist_conversation(snapshot: dict):
+    """Saves a session's state unless a newer one is already stored."""
+    values = {"summary": snapshot["summary"], "turns": json.dumps(snapshot["turns"]), "version": snapshot["version"]}
+    with SessionLocal() as db:
+        saved = db.execute(update(Conversation).where(
+            Conversation.session_id == snapshot["session_id"],
+            Conversation.version < snapshot["version"]
+        ).values(**values))
+        if not saved.rowcount and db.get(Conversation, snapshot["session_id"]) is None:
+            db.add(Conversation(session_id=snapshot["session_id"], **values))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another runner inserted the row first; the retry compares versions
+            db.rollback()
+            raise
+
+def register_jobs():
+    """Registers the handlers for this module's job kinds; safe to repeat."""
+    job_handler("conversation.persist", priority=PRIORITY_HIGH)(persist_conversation)
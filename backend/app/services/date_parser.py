@@ -0,0 +1,252 @@
+import calendar
+import re
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+class DateParseError(ValueError):
+    """The expression doesn't describe a date or time we understand."""
+
+# What an expression means relative to a reference day. ``offset`` is set for
+# "in 2 hours" style expressions, which are relative to the exact time instead.
+DatePlan = namedtuple("DatePlan", ["day", "time", "offset", "duration"])
+# ``timed`` is false when the expression named only a day, e.g. "tomorrow"
+ParsedDate = namedtuple("ParsedDate", ["start", "duration", "timed"])
+
+CACHE_SIZE = 4096
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tues": 1, "tue": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thurs": 3, "thur": 3, "thu": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+
+NAMED_TIMES = {
+    "noon": time(12), "midday": time(12), "midnight": time(0),
+    "morning": time(9), "afternoon": time(14), "evening": time(18), "tonight": time(20),
+}
+UNIT_SECONDS = {"minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+WEEKDAY_NAMES = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+ORDINAL = r"(?:st|nd|rd|th)?"
+AMOUNT = r"(an?|half\s+an?|\d+(?:\.\d+)?)"
+UNIT = r"(minutes?|mins?|hours?|hrs?|days?|weeks?)"
+
+# Order matters: each pattern consumes its match before the next one runs
+DURATION = re.compile(rf"\bfor\s+{AMOUNT}\s*{UNIT}\b")
+OFFSET = re.compile(rf"\bin\s+{AMOUNT}\s*{UNIT}\b")
+RELATIVE_DAY = re.compile(r"\b(day\s+after\s+tomorrow|tomorrow|tmrw|tmr|today|tonight)\b")
+RELATIVE_PERIOD = re.compile(r"\bnext\s+(week|month)\b")
+WEEKDAY = re.compile(rf"\b(?:(next|this|coming|on)\s+)?({WEEKDAY_NAMES})\b")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MONTH_DAY = re.compile(rf"\b({MONTH_NAMES})\.?\s+(\d{{1,2}}){ORDINAL}(?:,?\s+(\d{{4}}))?\b")
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}}){ORDINAL}\s+(?:of\s+)?({MONTH_NAMES})\.?(?:,?\s+(\d{{4}}))?\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+CLOCK_12H = re.compile(r"\b(?:at\s+|@\s*)?(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?m\b\.?")
+CLOCK_24H = re.compile(r"\b(?:at\s+|@\s*)?([01]?\d|2[0-3]):([0-5]\d)\b")
+BARE_HOUR = re.compile(r"\b(?:at|@)\s*(\d{1,2})\b")
+NAMED_TIME = re.compile(rf"\b(?:in\s+the\s+|at\s+|this\s+)?({'|'.join(NAMED_TIMES)})\b")
+
+PUNCTUATION = re.compile(r"[^\w\s:/.@-]")
+WHITESPACE = re.compile(r"\s+")
+
+def normalize_expression(expression: str) -> str:
+    return WHITESPACE.sub(" ", PUNCTUATION.sub(" ", expression.lower())).strip()
+
+def amount_seconds(amount: str, unit: str) -> float:
+    if amount in ("a", "an"):
+        value = 1.0
+    elif amount.startswith("half"):
+        value = 0.5
+    else:
+        value = float(amount)
+    for name, seconds in UNIT_SECONDS.items():
+        if unit.startswith(name[:3]) or (name == "hour" and unit.startswith("hr")):
+            return value * seconds
+    raise DateParseError(f"Unknown unit '{unit}'")
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+def next_weekday(reference_day: date, weekday: int, qualifier: str) -> date:
+    """The weekday on or after ``reference_day``; "next" skips today."""
+    days_ahead = (weekday - reference_day.weekday()) % 7
+    if qualifier == "next" and days_ahead == 0:
+        days_ahead = 7
+    return reference_day + timedelta(days=days_ahead)
+
+def calendar_date(reference_day: date, year, month: int, day: int) -> date:
+    """A date without a year is taken as the next one on or after ``reference_day``."""
+    if year:
+        year = int(year)
+        return date(year + 2000 if year < 100 else year, month, day)
+    candidate = date(reference_day.year, month, day)
+    if candidate < reference_day:
+        candidate = date(reference_day.year + 1, month, day)
+    return candidate
+
+def to_hour(hour: int, meridiem: str) -> int:
+    if not 1 <= hour <= 12:
+        raise DateParseError(f"Invalid hour '{hour}{meridiem}m'")
+    return hour % 12 + (12 if meridiem == "p" else 0)
+
+class ExpressionScanner:
+    """Pulls date components out of a normalized expression, one pattern at a time."""
+
+    def __init__(self, expression: str):
+        self.text = f" {expression} "
+        self.matched = False
+
+    def take(self, pattern):
+        match = pattern.search(self.text)
+        if match:
+            self.matched = True
+            self.text = self.text[:match.start()] + " " + self.text[match.end():]
+        return match
+
+def scan_day(scanner: ExpressionScanner, reference_day: date):
+    match = scanner.take(RELATIVE_DAY)
+    if match:
+        word = match.group(1)
+        if word.startswith("day"):
+            return reference_day + timedelta(days=2), None
+        if word in ("tomorrow", "tmrw", "tmr"):
+            return reference_day + timedelta(days=1), None
+        return reference_day, NAMED_TIMES["tonight"] if word == "tonight" else None
+
+    match = scanner.take(RELATIVE_PERIOD)
+    if match:
+        if match.group(1) == "week":
+            return reference_day + timedelta(weeks=1), None
+        return add_months(reference_day, 1), None
+
+    match = scanner.take(WEEKDAY)
+    if match:
+        return next_weekday(reference_day, WEEKDAYS[match.group(2)], match.group(1)), None
+
+    match = scanner.take(ISO_DATE)
+    if match:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3))), None
+
+    match = scanner.take(MONTH_DAY)
+    if match:
+        return calendar_date(reference_day, match.group(3), MONTHS[match.group(1)], int(match.group(2))), None
+
+    match = scanner.take(DAY_MONTH)
+    if match:
+        return calendar_date(reference_day, match.group(3), MONTHS[match.group(2)], int(match.group(1))), None
+
+    match = scanner.take(NUMERIC_DATE)
+    if match:
+        # Month first, as dateutil reads it
+        return calendar_date(reference_day, match.group(3), int(match.group(1)), int(match.group(2))), None
+
+    return None, None
+
+def scan_time(scanner: ExpressionScanner):
+    match = scanner.take(CLOCK_12H)
+    if match:
+        return time(to_hour(int(match.group(1)), match.group(3)), int(match.group(2) or 0))
+
+    match = scanner.take(CLOCK_24H)
+    if match:
+        return time(int(match.group(1)), int(match.group(2)))
+
+    match = scanner.take(BARE_HOUR)
+    if match:
+        hour = int(match.group(1))
+        if hour > 23:
+            raise DateParseError(f"Invalid hour '{hour}'")
+        # "at 3" means the afternoon; nobody books meetings at 3am
+        return time(hour + 12 if 1 <= hour <= 7 else hour)
+
+    match = scanner.take(NAMED_TIME)
+    if match:
+        return NAMED_TIMES[match.group(1)]
+
+    return None
+
+def fallback_plan(expression: str, reference_day: date, duration) -> DatePlan:
+    from dateutil import parser
+
+    try:
+        parsed = parser.parse(expression, fuzzy=True, default=datetime.combine(reference_day, time()))
+    except (ValueError, OverflowError):
+        raise DateParseError(f"Couldn't understand the date '{expression}'")
+    parsed_time = parsed.time() if (parsed.hour, parsed.minute) != (0, 0) else None
+    return DatePlan(parsed.date(), parsed_time, None, duration)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def plan_expression(expression: str, reference_day: date, tz_name: str) -> DatePlan:
+    """Resolves a normalized expression against ``reference_day``.
+
+    Memoized: the same words on the same day in the same zone always mean
+    the same thing. ``tz_name`` is part of the key because the reference
+    day depends on it.
+    """
+    scanner = ExpressionScanner(expression)
+
+    duration = None
+    match = scanner.take(DURATION)
+    if match:
+        duration = timedelta(seconds=amount_seconds(match.group(1), match.group(2)))
+
+    offset = None
+    day = None
+    match = scanner.take(OFFSET)
+    if match:
+        delta = timedelta(seconds=amount_seconds(match.group(1), match.group(2)))
+        if match.group(2).startswith(("day", "week")):
+            day = reference_day + delta
+        else:
+            offset = delta
+
+    day_time = None
+    if day is None and offset is None:
+        day, day_time = scan_day(scanner, reference_day)
+    clock = scan_time(scanner)
+    if day_time and clock and clock.hour < 12:
+        # "tonight at 9"
+        clock = clock.replace(hour=clock.hour + 12)
+    clock = clock or day_time
+
+    if not scanner.matched:
+        return fallback_plan(expression, reference_day, duration)
+    return DatePlan(day, clock, offset, duration)
+
+class DateParser:
+    """Turns meeting date expressions ("next friday at 3pm for 30 minutes")
+    into timezone-aware start times.
+
+    Expressions without a time keep the current time of day, as before.
+    Raises ``DateParseError`` for anything it can't read.
+    """
+
+    def __init__(self, tz_name: str = "UTC"):
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+
+    def parse(self, expression: str, now: datetime = None) -> ParsedDate:
+        now = (now or datetime.now(self.tz)).astimezone(self.tz).replace(second=0, microsecond=0)
+        plan = plan_expression(normalize_expression(expression), now.date(), self.tz_name)
+
+        if plan.offset is not None:
+            return ParsedDate(now + plan.offset, plan.duration, True)
+
+        start = datetime.combine(plan.day or now.date(), plan.time or now.time(), tzinfo=self.tz)
+        return ParsedDate(start, plan.duration, plan.time is not None)
+
+    @staticmethod
+    def cache_info():
+        return plan_expression.cache_info()
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class Subscriber:
+    def __init__(self, queue_size: int, user_id: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.user_id = user_id
+
+    async def get(self):
+        """Next event, or ``None`` once the hub has dropped this subscriber."""
+        return await self.queue.get()
+
+class EventHub:
+    """In-process pub/sub for task and meeting updates, delivered to the
+    owning user's subscribers only.
+
+    Each subscriber has a bounded queue; one that falls a full queue behind
+    is dropped rather than letting it hold events in memory. Dropped clients
+    are expected to reconnect and catch up through ``/api/changes``.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.loop = None
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.queue_size, user_id)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event: dict, user_id: int):
+        """Safe to call from any thread; delivery happens on the event loop."""
+        if not self.subscribers or self.loop is None or self.loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self.loop:
+            self._deliver(event, user_id)
+        else:
+            self.loop.call_soon_threadsafe(self._deliver, event, user_id)
+
+    def _deliver(self, event: dict, user_id: int):
+        for subscriber in list(self.subscribers):
+            if subscriber.user_id != user_id:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self.dropped += 1
+        logger.warning("Dropping slow event subscriber")
+
+        # Discard the backlog and leave the sentinel that tells the consumer to stop
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscribers), "dropped": self.dropped}
+
+event_hub = EventHub(settings.EVENT_QUEUE_SIZE)
@@ -0,0 +1,129 @@
+import re
+from collections import Counter
+
+WEEKDAYS = r"(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+DATE_START = rf"(?:(?:today|tonight|tomorrow|day after tomorrow|next\s+\w+|this\s+\w+|{WEEKDAYS})(?:\s+.*)?|(?:on|at)\s+.+)"
+
+# Each pattern must match the whole message, so anything unusual falls through to the model
+PATTERNS = [
+    ("get_tasks", r"(?:(?:show|list|view|display|get)(?:\s+me)?(?:\s+all)?\s+(?:of\s+)?my\s+tasks|what\s+are\s+my\s+tasks|what\s+tasks\s+do\s+i\s+have|my\s+tasks)"),
+    ("get_meetings", r"(?:(?:show|list|view|display|get)(?:\s+me)?(?:\s+all)?\s+(?:of\s+)?my\s+meetings|what\s+are\s+my\s+meetings|what\s+meetings\s+do\s+i\s+have|my\s+meetings)"),
+    ("add_task", r"(?:add|create|new)\s+(?:a\s+)?(?:new\s+)?task(?:\s*:\s*|\s+to\s+|\s+)(?P<task>.+)"),
+    ("complete_task", r"(?:complete|finish|mark)\s+(?:the\s+)?task(?:\s*:\s*|\s+)(?P<task>.+?)(?:\s+as\s+(?:done|complete|completed))?"),
+    ("complete_task", r"mark\s+(?P<task>.+?)\s+as\s+(?:done|complete|completed)"),
+    ("delete_task", r"(?:delete|remove)\s+(?:the\s+)?task(?:\s*:\s*|\s+)(?P<task>.+)"),
+    ("delete_meeting", r"(?:delete|remove|cancel)\s+(?:the\s+)?meeting(?:\s*:\s*|\s+)(?P<meeting>.+)"),
+    ("schedule_meeting", rf"(?:schedule|book|set\s+up)\s+(?:a\s+)?meeting\s+with\s+(?P<name>.+?)\s+(?P<date_info>{DATE_START})"),
+    ("find_free_slot", r"(?:(?:find|show|get|give)(?:\s+me)?\s+|when(?:'s|\s+is)\s+|what(?:'s|\s+is)\s+)?(?:my\s+|the\s+|a\s+)?(?:next\s+)?(?:free|open)\s+(?:(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>h|hrs?|hours?|m|mins?|minutes?)\s+)?(?:slot|time)(?:\s+(?P<date_info>.+?))?"),
+    ("check_availability", r"(?:am\s+i|are\s+we)\s+(?:free|available)\s+(?P<date_info>.+?)"),
+    ("check_availability", r"is\s+(?P<date_info>.+?)\s+(?:free|available)"),
+    ("find_conflicts", r"(?:(?:show|list|find|get)(?:\s+me)?\s+|any\s+|what\s+are\s+(?:the\s+)?)?conflicts\s+(?:for|with)\s+(?:the\s+|my\s+)?(?:meeting\s+)?(?P<meeting>.+)"),
+    ("find_conflicts", r"what\s+(?:conflicts|overlaps)\s+with\s+(?:the\s+|my\s+)?(?:meeting\s+)?(?P<meeting>.+)"),
+]
+
+# Task and meeting commands act on the first title containing their target,
+# so short or vague targets ("delete task .", "complete task it") go to the
+# model, which sees the conversation, instead
+MIN_TARGET_CHARS = 3
+VAGUE_TARGETS = {"it", "this", "that", "this one", "that one", "them", "these", "those", "all", "everything",
+                 "last one", "the last one", "the one", "one"}
+TARGETS = {"complete_task": "task", "delete_task": "task", "delete_meeting": "meeting", "find_conflicts": "meeting"}
+
+def is_specific(target: str) -> bool:
+    words = re.findall(r"[a-z0-9]+", target.lower())
+    return sum(map(len, words)) >= MIN_TARGET_CHARS and " ".join(words) not in VAGUE_TARGETS
+
+class IntentRouter:
+    """Maps unambiguous commands straight to actions without calling the model.
+
+    ``match`` returns the same envelope the model would have produced, or
+    ``None`` when the message isn't a confident match.
+    """
+
+    def __init__(self):
+        self.patterns = [
+            (action, re.compile(rf"\s*{pattern}\s*[.!?]*\s*", re.IGNORECASE))
+            for action, pattern in PATTERNS
+        ]
+        # Commands found anywhere in the message, for when the model is unavailable
+        self.loose_patterns = [
+            (action, re.compile(rf"\b{pattern}", re.IGNORECASE))
+            for action, pattern in PATTERNS
+        ]
+        self.hits = Counter()
+        self.misses = 0
+        self.vague = 0
+        self.fallback_hits = 0
+
+    def match(self, message: str):
+        for action, pattern in self.patterns:
+            match = pattern.fullmatch(message)
+            if match:
+                content = self.build_content(action, match)
+                if not self.is_confident(content):
+                    self.vague += 1
+                    continue
+                self.hits[action] += 1
+                return {"type": "action", "content": content}
+
+        self.misses += 1
+        return None
+
+    def match_loose(self, message: str):
+        """Like ``match``, but takes the earliest command anywhere in the message.
+
+        Only used as a degraded mode; it guesses where ``match`` would defer.
+        """
+        best = None
+        for action, pattern in self.loose_patterns:
+            match = pattern.search(message)
+            if match and (best is None or match.start() < best[1].start()) \
+                    and self.is_confident(self.build_content(action, match)):
+                best = (action, match)
+
+        if best is None:
+            return None
+        self.fallback_hits += 1
+        action, match = best
+        return {"type": "action", "content": self.build_content(action, match)}
+
+    @staticmethod
+    def is_confident(content: dict) -> bool:
+        field = TARGETS.get(content["action"])
+        return field is None or is_specific(content[field])
+
+    def build_content(self, action: str, match) -> dict:
+        if action in ("add_task", "complete_task", "delete_task"):
+            return {"action": action, "task": match.group("task").strip()}
+        if action == "delete_meeting":
+            return {"action": action, "meeting": match.group("meeting").strip()}
+        if action == "schedule_meeting":
+            return {
+                "action": action,
+                "meeting": {
+                    "title": f"Meeting with {match.group('name').strip()}",
+                    "date_info": match.group("date_info").strip()
+                }
+            }
+        if action == "check_availability":
+            return {"action": action, "date_info": match.group("date_info").strip()}
+        if action == "find_free_slot":
+            amount, unit = match.group("amount"), match.group("unit")
+            minutes = float(amount) * (60 if unit.startswith("h") else 1) if amount else 60
+            date_info = match.group("date_info")
+            return {"action": action, "duration_minutes": int(minutes), "date_info": date_info.strip() if date_info else None}
+        if action == "find_conflicts":
+            return {"action": action, "meeting": match.group("meeting").strip()}
+        return {"action": action}
+
+    def stats(self) -> dict:
+        total_hits = sum(self.hits.values())
+        total = total_hits + self.misses
+        return {
+            "hits": total_hits,
+            "misses": self.misses,
+            "hit_rate": total_hits / total if total else 0.0,
+            "hits_by_action": dict(self.hits),
+            "vague_targets": self.vague,
+            "fallback_hits": self.fallback_hits
+        }
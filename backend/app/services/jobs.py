@@ -0,0 +1,327 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple
+from prometheus_client import Histogram
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import SessionLocal
+from ..models.models import Job
+from .tracing import STAGE_BUCKETS
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 100
+PRIORITY_LOW = 1000
+
+# Recent jobs kept for the latency percentiles in stats()
+LATENCY_WINDOW = 500
+
+JOB_WAIT_SECONDS = Histogram(
+    "job_wait_seconds",
+    "Time from queueing a job to its first run",
+    ["kind"],
+    buckets=STAGE_BUCKETS
+)
+JOB_RUN_SECONDS = Histogram(
+    "job_run_seconds",
+    "Time spent running a job, by outcome",
+    ["kind", "outcome"],
+    buckets=STAGE_BUCKETS
+)
+
+class JobHandler(NamedTuple):
+    fn: Callable
+    priority: int
+    max_attempts: int
+    timeout: float
+
+HANDLERS = {}
+
+def job_handler(kind: str, priority: int = PRIORITY_NORMAL, max_attempts: int = None, timeout: float = None):
+    """Registers ``fn(payload: dict)`` to run jobs of ``kind``; async functions
+    run on the worker's loop, plain ones in a thread. A handler must be
+    registered wherever jobs of its kind are queued or run."""
+    def register(fn):
+        HANDLERS[kind] = JobHandler(fn, priority, max_attempts or settings.JOB_MAX_ATTEMPTS, timeout or settings.JOB_TIMEOUT)
+        return fn
+    return register
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def enqueue(db: Session, kind: str, payload: dict = None, priority: int = None, delay: float = 0,
+            dedupe_key: str = None):
+    """Queues a job in ``db``'s transaction, so it exists exactly when the
+    write that caused it commits. Safe to call from flush events.
+
+    With ``dedupe_key``, a job with that key that no worker has picked up
+    yet takes the new payload instead of a second job being queued.
+    """
+    handler = HANDLERS[kind]
+    connection = db.connection()
+    body = json.dumps(payload or {}, separators=(",", ":"), default=str)
+    db.info["jobs_queued"] = True
+
+    if dedupe_key:
+        replaced = connection.execute(update(Job).where(
+            Job.dedupe_key == dedupe_key,
+            Job.status == "queued",
+            Job.claim_token.is_(None)
+        ).values(payload=body))
+        if replaced.rowcount:
+            return
+
+    now = utcnow()
+    connection.execute(insert(Job).values(
+        kind=kind,
+        payload=body,
+        priority=handler.priority if priority is None else priority,
+        status="queued",
+        attempts=0,
+        max_attempts=handler.max_attempts,
+        run_at=now + timedelta(seconds=delay),
+        dedupe_key=dedupe_key,
+        created_at=now
+    ))
+
+# Runners in this process, woken when a local transaction queues jobs
+RUNNERS = set()
+
+def wake_runners(session: Session):
+    if session.info.pop("jobs_queued", False):
+        for runner in list(RUNNERS):
+            runner.wake()
+
+def forget_queued(session: Session):
+    session.info.pop("jobs_queued", None)
+
+def track_jobs():
+    """Lets in-process runners start on jobs as soon as they commit instead
+    of at their next poll."""
+    for name, listener in (
+        ("after_commit", wake_runners),
+        ("after_rollback", forget_queued),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+class ClaimedJob(NamedTuple):
+    id: int
+    kind: str
+    payload: str
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    claim_token: str
+
+def percentile(samples, fraction: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4)
+
+class JobRunner:
+    """Runs queued jobs on up to ``concurrency`` asyncio tasks.
+
+    Jobs are claimed in priority order by one UPDATE that marks them
+    running and leases them for the handler's timeout plus a margin, so
+    several runners (in-process or ``python -m app.worker``) can share
+    the table. Failures retry with exponential backoff and jitter until
+    the job's ``max_attempts`` is used up, after which it stays ``failed``.
+    """
+
+    def __init__(self, concurrency: int = None, poll_interval: float = None, kinds: list = None,
+                 session_factory=SessionLocal, base_delay: float = None, max_delay: float = None):
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        # Only claim these kinds; None claims everything
+        self.kinds = kinds
+        self.session_factory = session_factory
+        self.base_delay = settings.JOB_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.JOB_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.wakeup = None
+        self.loop = None
+        self.counts = {"claimed": 0, "succeeded": 0, "retried": 0, "failed": 0}
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.runs = deque(maxlen=LATENCY_WINDOW)
+
+    def wake(self):
+        # Called from whichever thread committed
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def lease(self) -> timedelta:
+        longest = max((handler.timeout for handler in HANDLERS.values()), default=settings.JOB_TIMEOUT)
+        return timedelta(seconds=longest + 30)
+
+    def claim(self, limit: int) -> list:
+        token = uuid.uuid4().hex
+        now = utcnow()
+        # Running jobs past their lease belong to a runner that died
+        due = [Job.status.in_(("queued", "running")), Job.run_at <= now]
+        if self.kinds is not None:
+            due.append(Job.kind.in_(self.kinds))
+        with self.session_factory() as db:
+            next_jobs = select(Job.id).where(*due).order_by(Job.priority, Job.run_at, Job.id).limit(limit)
+            db.execute(update(Job).where(Job.id.in_(next_jobs), *due).values(
+                status="running", claim_token=token, run_at=now + self.lease(), attempts=Job.attempts + 1
+            ))
+            db.commit()
+            rows = db.execute(select(
+                Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts, Job.created_at, Job.claim_token
+            ).where(Job.claim_token == token).order_by(Job.priority, Job.id)).all()
+        self.counts["claimed"] += len(rows)
+        return [ClaimedJob(*row) for row in rows]
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0))
+
+    def renew(self, job: ClaimedJob):
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job.id, Job.claim_token == job.claim_token).values(
+                run_at=utcnow() + self.lease()
+            ))
+            db.commit()
+
+    def finish(self, job: ClaimedJob, error: str = None):
+        mine = (Job.id == job.id) & (Job.claim_token == job.claim_token)
+        with self.session_factory() as db:
+            if error is None:
+                db.execute(Job.__table__.delete().where(mine))
+            elif job.attempts >= job.max_attempts:
+                db.execute(update(Job).where(mine).values(status="failed", claim_token=None, last_error=error))
+            else:
+                db.execute(update(Job).where(mine).values(
+                    status="queued", claim_token=None, last_error=error, run_at=utcnow() + self.backoff(job.attempts)
+                ))
+            db.commit()
+
+    async def execute(self, job: ClaimedJob):
+        if job.attempts == 1:
+            created = job.created_at if job.created_at.tzinfo else job.created_at.replace(tzinfo=timezone.utc)
+            wait = max(0.0, (utcnow() - created).total_seconds())
+            self.waits.append(wait)
+            JOB_WAIT_SECONDS.labels(job.kind).observe(wait)
+
+        started = time.perf_counter()
+        error = None
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r} in this process")
+            payload = json.loads(job.payload)
+            if asyncio.iscoroutinefunction(handler.fn):
+                await asyncio.wait_for(handler.fn(payload), handler.timeout)
+            else:
+                await self.run_in_thread(job, handler, payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        elapsed = time.perf_counter() - started
+        self.runs.append(elapsed)
+        if error is None:
+            outcome = "succeeded"
+        else:
+            outcome = "failed" if job.attempts >= job.max_attempts else "retried"
+            log = logger.error if outcome == "failed" else logger.warning
+            log(f"Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} failed: {error}")
+        self.counts[outcome] += 1
+        JOB_RUN_SECONDS.labels(job.kind, outcome).observe(elapsed)
+        try:
+            await asyncio.to_thread(self.finish, job, error)
+        except Exception:
+            # The lease runs out and another claim retries the job
+            logger.exception(f"Could not record the outcome of job {job.id}")
+
+    async def run_in_thread(self, job: ClaimedJob, handler: JobHandler, payload: dict):
+        """Runs a plain handler in a thread. Threads can't be cancelled, so one
+        that overruns its timeout keeps the job's lease until it returns and
+        its own outcome is recorded; a retry would run alongside it."""
+        thread = asyncio.ensure_future(asyncio.to_thread(handler.fn, payload))
+        done, _ = await asyncio.wait({thread}, timeout=handler.timeout)
+        if not done:
+            logger.warning(f"Job {job.id} ({job.kind}) is past its {handler.timeout:g}s timeout; "
+                           "holding its lease until the handler returns")
+            while not done:
+                await asyncio.to_thread(self.renew, job)
+                done, _ = await asyncio.wait({thread}, timeout=self.lease().total_seconds() / 2)
+        return thread.result()
+
+    async def run(self, stop: asyncio.Event):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        RUNNERS.add(self)
+        running = set()
+        stopping = asyncio.ensure_future(stop.wait())
+        try:
+            while not stop.is_set():
+                self.wakeup.clear()
+                free = self.concurrency - len(running)
+                jobs = []
+                if free:
+                    try:
+                        jobs = await asyncio.to_thread(self.claim, free)
+                    except Exception:
+                        logger.exception("Claiming jobs failed")
+                for job in jobs:
+                    task = asyncio.create_task(self.execute(job))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+
+                if jobs and len(jobs) == free:
+                    # Full: wait for a slot; there may be more due
+                    waiters = set(running) | {stopping}
+                    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    # Drained: sleep until a local commit queues jobs, a slot frees up or the next poll
+                    woken = asyncio.ensure_future(self.wakeup.wait())
+                    await asyncio.wait(set(running) | {stopping, woken}, timeout=self.poll_interval,
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    woken.cancel()
+        finally:
+            stopping.cancel()
+            RUNNERS.discard(self)
+            self.loop = None
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return dict(
+            self.counts,
+            concurrency=self.concurrency,
+            wait_p50=percentile(self.waits, 0.5),
+            wait_p95=percentile(self.waits, 0.95),
+            run_p50=percentile(self.runs, 0.5),
+            run_p95=percentile(self.runs, 0.95)
+        )
+
+class JobQueue:
+    @staticmethod
+    def depth(db: Session) -> dict:
+        """Jobs per kind and status, and how long the oldest due job has waited."""
+        now = utcnow()
+        kinds = {}
+        for kind, status, count in db.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status):
+            kinds.setdefault(kind, {"queued": 0, "running": 0, "failed": 0})[status] = count
+        oldest = db.query(func.min(Job.run_at)).filter(Job.status == "queued", Job.run_at <= now).scalar()
+        if oldest is not None and oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        return {
+            "kinds": kinds,
+            "queued": sum(counts["queued"] for counts in kinds.values()),
+            "oldest_due_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0
+        }
+
+    @staticmethod
+    async def depth_async(db: AsyncSession) -> dict:
+        return await db.run_sync(JobQueue.depth)
@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from .intent_router import IntentRouter
+from .response_cache import normalize_message
+from .token_usage import estimate_tokens
+
+DEFAULT_STUB_REPLY = {
+    "type": "message",
+    "content": "You can ask me to add a task or schedule a meeting."
+}
+
+class LLMBackend:
+    """A pair of OpenAI-shaped clients exposing ``chat.completions.create``.
+
+    The gateway calls ``client`` from the blocking path and ``async_client``
+    from the async and streaming paths.
+    """
+
+    name = None
+
+    def __init__(self, client, async_client):
+        self.client = client
+        self.async_client = async_client
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, settings):
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        super().__init__(*self.build_clients(api_key, settings.OPENAI_BASE_URL, settings))
+
+    @staticmethod
+    def build_clients(api_key: str, base_url: str, settings):
+        # The gateway owns retries and deadlines, so the clients must not retry on their own
+        from openai import OpenAI, AsyncOpenAI
+
+        options = {"api_key": api_key, "base_url": base_url, "timeout": settings.LLM_TIMEOUT, "max_retries": 0}
+        return OpenAI(**options), AsyncOpenAI(**options)
+
+class OpenAICompatibleBackend(OpenAIBackend):
+    """Any server speaking the chat completions API, e.g. vLLM, llama.cpp or Ollama."""
+
+    name = "openai_compatible"
+
+    def __init__(self, settings):
+        if not settings.OPENAI_BASE_URL:
+            raise ValueError("OPENAI_BASE_URL must be set for the openai_compatible LLM backend")
+        # Local servers usually ignore the key, but the client insists on one
+        api_key = os.getenv('OPENAI_API_KEY') or "not-needed"
+        LLMBackend.__init__(self, *self.build_clients(api_key, settings.OPENAI_BASE_URL, settings))
+
+class StubScript:
+    """Deterministic replies for the stub backend.
+
+    A script file holds either a list of reply envelopes, served round-robin,
+    or an object mapping messages to envelopes. Without a script, or for an
+    unscripted message, commands found by the intent router become actions
+    and anything else gets a fixed message.
+    """
+
+    def __init__(self, path: str = None):
+        self.router = IntentRouter()
+        self.by_message = {}
+        self.rotation = None
+
+        if path:
+            with open(path) as f:
+                script = json.load(f)
+            if isinstance(script, list):
+                self.rotation = itertools.cycle(script)
+            else:
+                self.by_message = {normalize_message(message): reply for message, reply in script.items()}
+
+    def reply(self, message: str) -> dict:
+        if self.rotation:
+            return next(self.rotation)
+        scripted = self.by_message.get(normalize_message(message))
+        if scripted:
+            return scripted
+        return self.router.match_loose(message) or DEFAULT_STUB_REPLY
+
+class StubCompletions:
+    def __init__(self, script: StubScript, latency: float, asynchronous: bool):
+        self.script = script
+        self.latency = latency
+        self.asynchronous = asynchronous
+
+    def complete(self, kwargs: dict):
+        messages = kwargs["messages"]
+        content = json.dumps(self.script.reply(messages[-1]["content"]))
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content)
+        }
+        return content, usage
+
+    def completion(self, kwargs: dict):
+        from openai.types.chat import ChatCompletion
+
+        content, usage = self.complete(kwargs)
+        return ChatCompletion.model_validate({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": kwargs.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    async def stream(self, kwargs: dict):
+        from openai.types.chat import ChatCompletionChunk
+
+        content, usage = self.complete(kwargs)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        delay = self.latency / max(len(pieces), 1)
+
+        def chunk(choices, usage=None):
+            return ChatCompletionChunk.model_validate({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": kwargs.get("model", "stub"),
+                "choices": choices,
+                "usage": usage
+            })
+
+        for piece in pieces:
+            await asyncio.sleep(delay)
+            yield chunk([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (kwargs.get("stream_options") or {}).get("include_usage"):
+            yield chunk([], usage)
+
+    def create(self, stream: bool = False, timeout: float = None, **kwargs):
+        if self.asynchronous:
+            return self.create_async(stream, kwargs)
+        time.sleep(self.latency)
+        return self.completion(kwargs)
+
+    async def create_async(self, stream: bool, kwargs: dict):
+        if stream:
+            return self.stream(kwargs)
+        await asyncio.sleep(self.latency)
+        return self.completion(kwargs)
+
+class StubClient:
+    def __init__(self, completions: StubCompletions):
+        self.chat = type("StubChat", (), {"completions": completions})()
+
+class StubBackend(LLMBackend):
+    """In-process fake model with scripted replies and fixed latency; no network or key."""
+
+    name = "stub"
+
+    def __init__(self, settings):
+        script = StubScript(settings.LLM_STUB_SCRIPT)
+        latency = settings.LLM_STUB_LATENCY
+        super().__init__(
+            StubClient(StubCompletions(script, latency, asynchronous=False)),
+            StubClient(StubCompletions(script, latency, asynchronous=True))
+        )
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (OpenAIBackend, OpenAICompatibleBackend, StubBackend)
+}
+
+def create_llm_backend(settings) -> LLMBackend:
+    try:
+        backend = BACKENDS[settings.LLM_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown LLM_BACKEND '{settings.LLM_BACKEND}', expected one of {', '.join(BACKENDS)}")
+    return backend(settings)
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+def retryable_errors() -> tuple:
+    """Provider-side failures worth another attempt; anything else is a bad request."""
+    # openai takes a good part of a second to import, so only a live gateway pays for it
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError, asyncio.TimeoutError)
+
+# Successful latencies kept for the hedge threshold, and the fewest it is computed from
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+class LLMUnavailable(Exception):
+    """The model could not answer in time, or the circuit breaker is open."""
+
+class Deadline:
+    """Absolute time budget shared by every attempt of one request."""
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed, a single probe request is let
+    through; its outcome closes the breaker again or restarts the wait.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self):
+        """Ends a probe whose outcome says nothing about the provider's health."""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning("LLM circuit breaker opened")
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+class LLMGateway:
+    """Chat completions with a deadline, jittered retries, optional hedging and a circuit breaker.
+
+    Every attempt of a request shares one ``Deadline`` and gets at most what
+    is left of it as its timeout. Retryable errors are retried with full
+    jitter backoff. With hedging on, the async path sends a second copy of
+    a request that has been outstanding longer than the recent p95 latency
+    and takes whichever answers first. Raises ``LLMUnavailable`` when the
+    breaker is open or the budget runs out, so callers can degrade.
+    """
+
+    def __init__(self, client, async_client, settings):
+        self.client = client
+        self.async_client = async_client
+        self.deadline_seconds = settings.LLM_DEADLINE
+        self.attempt_timeout = settings.LLM_TIMEOUT
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.retry_base_delay = settings.LLM_RETRY_BASE_DELAY
+        self.retry_max_delay = settings.LLM_RETRY_MAX_DELAY
+        self.hedge = settings.LLM_HEDGE
+        self.hedge_min_delay = settings.LLM_HEDGE_MIN_DELAY
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_RESET)
+        self.retryable_errors = retryable_errors()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "short_circuits": 0}
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def hedge_delay(self):
+        """Recent p95 latency, or ``None`` until there are enough samples."""
+        if not self.hedge or len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return max(self.hedge_min_delay, ordered[int(len(ordered) * 0.95) - 1])
+
+    def admit(self, deadline: Deadline) -> Deadline:
+        self.counts["requests"] += 1
+        if not self.breaker.allow():
+            self.counts["short_circuits"] += 1
+            raise LLMUnavailable("circuit breaker is open")
+        return deadline or Deadline(self.deadline_seconds)
+
+    def fail(self, error: Exception):
+        self.counts["failures"] += 1
+        self.breaker.record_failure()
+        raise LLMUnavailable(str(error)) from error
+
+    def succeed(self, started: float = None):
+        if started is not None:
+            self.latencies.append(time.perf_counter() - started)
+        self.breaker.record_success()
+
+    def create(self, deadline: Deadline = None, **kwargs):
+        """Blocking completion. Retries, but never hedges."""
+        deadline = self.admit(deadline)
+        for attempt in range(self.max_retries + 1):
+            timeout = min(self.attempt_timeout, deadline.remaining())
+            try:
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(**kwargs, timeout=timeout)
+                self.succeed(started)
+                return response
+            except self.retryable_errors as e:
+                delay = self.backoff(attempt)
+                if attempt == self.max_retries or delay >= deadline.remaining():
+                    self.fail(e)
+                logger.warning(f"LLM attempt {attempt + 1} failed, retrying: {str(e)}")
+                self.counts["retries"] += 1
+                time.sleep(delay)
+            except Exception:
+                # Bad requests: the provider answered, but not with a completion
+                self.breaker.release()
+                raise
+
+    async def create_async(self, deadline: Deadline = None, stream: bool = False, **kwargs):
+        """Completion, or the opened stream when ``stream`` is set.
+
+        Streams are retried only until the response starts; they are not hedged.
+        """
+        deadline = self.admit(deadline)
+        if stream:
+            kwargs["stream"] = True
+        for attempt in range(self.max_retries + 1):
+            try:
+                started = time.perf_counter()
+                if stream:
+                    # Time to the first byte isn't comparable with full completions
+                    response = await self._attempt(kwargs, deadline)
+                    self.succeed()
+                else:
+                    response = await self._hedged_attempt(kwargs, deadline)
+                    self.succeed(started)
+                return response
+            except self.retryable_errors as e:
+                delay = self.backoff(attempt)
+                if attempt == self.max_retries or delay >= deadline.remaining():
+                    self.fail(e)
+                logger.warning(f"LLM attempt {attempt + 1} failed, retrying: {str(e)}")
+                self.counts["retries"] += 1
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Bad requests and cancellations
+                self.breaker.release()
+                raise
+
+    async def _attempt(self, kwargs: dict, deadline: Deadline):
+        timeout = min(self.attempt_timeout, deadline.remaining())
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+        # wait_for enforces the budget even if the client's own timeout doesn't fire
+        return await asyncio.wait_for(self.async_client.chat.completions.create(**kwargs, timeout=timeout), timeout)
+
+    async def _hedged_attempt(self, kwargs: dict, deadline: Deadline):
+        delay = self.hedge_delay()
+        if delay is None or delay >= deadline.remaining():
+            return await self._attempt(kwargs, deadline)
+
+        primary = asyncio.ensure_future(self._attempt(kwargs, deadline))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.counts["hedges"] += 1
+        hedge = asyncio.ensure_future(self._attempt(kwargs, deadline))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counts["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        return dict(
+            self.counts,
+            breaker=self.breaker.state,
+            hedge_delay=round(delay, 4) if delay is not None else None
+        )
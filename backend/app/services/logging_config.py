@@ -0,0 +1,47 @@
+import atexit
+import logging
+import random
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Pass as ``extra=SAMPLED`` for per-request records that may be sampled away
+SAMPLED = {"sampled": True}
+
+class SamplingFilter(logging.Filter):
+    """Keeps ``rate`` of the records logged with ``extra={"sampled": True}``.
+
+    Per-request chatter is marked as sampled; everything else, and anything
+    at WARNING or above, always passes.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sampled", False):
+            return True
+        return random.random() < self.rate
+
+def configure_logging(level: str = "INFO", sample_rate: float = 1.0) -> QueueListener:
+    """Routes all logging through a queue drained by a background thread.
+
+    Request handlers only pay for building the record; formatting the
+    output and writing it happen off the event loop.
+    """
+    queue = SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    handler = QueueHandler(queue)
+    handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    return listener
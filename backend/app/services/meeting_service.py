@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.models import Meeting
 from datetime import datetime
+from .pagination import paginate, DEFAULT_PAGE_SIZE
+from .projections import Projection, MEETING_ROW
 
 class MeetingService:
     @staticmethod
-    def create_meeting(db: Session, title: str, start_time: datetime, end_time: datetime, user_id: int = 1):
+    def create_meeting(db: Session, title: str, start_time: datetime, end_time: datetime, user_id: int):
         meeting = Meeting(
             title=title,
             start_time=start_time,
@@ -17,5 +20,72 @@ class MeetingService:
         return meeting
 
     @staticmethod
-    def get_meetings(db: Session, user_id: int = 1):
-        return db.query(Meeting).filter(Meeting.user_id == user_id).all() 
\ No newline at end of file
+    def get_meetings(db: Session, user_id: int, projection: Projection = None):
+        query = projection.query(db) if projection else db.query(Meeting)
+        return query.filter(Meeting.user_id == user_id).all()
+
+    @staticmethod
+    async def create_meeting_async(db: AsyncSession, title: str, start_time: datetime, end_time: datetime, user_id: int):
+        # The query helpers are shared; run_sync executes them over the async connection
+        return await db.run_sync(MeetingService.create_meeting, title, start_time, end_time, user_id)
+
+    @staticmethod
+    async def get_meetings_async(db: AsyncSession, user_id: int, projection: Projection = None):
+        return await db.run_sync(MeetingService.get_meetings, user_id, projection)
+
+    @staticmethod
+    def filter_meetings(db: Session, user_id: int, since: datetime = None, until: datetime = None,
+                        projection: Projection = None):
+        # Every listing starts from the user's slice of the (user_id, start_time, id) index
+        query = (projection.query(db) if projection else db.query(Meeting)).filter(Meeting.user_id == user_id)
+        if since:
+            query = query.filter(Meeting.start_time >= since)
+        if until:
+            query = query.filter(Meeting.start_time < until)
+        return query
+
+    @staticmethod
+    def list_meetings(db: Session, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                      since: datetime = None, until: datetime = None):
+        """A page of ``MEETING_ROW`` rows by start time, and the next page's cursor."""
+        query = MeetingService.filter_meetings(db, user_id, since, until, MEETING_ROW)
+        return paginate(query, Meeting, Meeting.start_time, cursor, limit)
+
+    @staticmethod
+    async def list_meetings_async(db: AsyncSession, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                                  since: datetime = None, until: datetime = None):
+        return await db.run_sync(MeetingService.list_meetings, user_id, limit, cursor, since, until)
+
+    @staticmethod
+    def get_meeting(db: Session, user_id: int, meeting_id: int):
+        return db.query(Meeting).filter(Meeting.user_id == user_id, Meeting.id == meeting_id).first()
+
+    @staticmethod
+    async def get_meeting_async(db: AsyncSession, user_id: int, meeting_id: int):
+        return await db.run_sync(MeetingService.get_meeting, user_id, meeting_id)
+
+    @staticmethod
+    def set_reminder(db: Session, user_id: int, meeting_id: int, reminder_minutes: int = None):
+        """Sets how many minutes before the start to remind, or clears it;
+        ``None`` if the user has no such meeting."""
+        meeting = MeetingService.get_meeting(db, user_id, meeting_id)
+        if meeting is None:
+            return None
+        meeting.reminder_minutes = reminder_minutes
+        db.commit()
+        db.refresh(meeting)
+        return meeting
+
+    @staticmethod
+    async def set_reminder_async(db: AsyncSession, user_id: int, meeting_id: int, reminder_minutes: int = None):
+        return await db.run_sync(MeetingService.set_reminder, user_id, meeting_id, reminder_minutes)
+
+    @staticmethod
+    def to_dict(meeting: Meeting) -> dict:
+        return {
+            "id": meeting.id,
+            "title": meeting.title,
+            "start_time": meeting.start_time,
+            "end_time": meeting.end_time,
+            "reminder_minutes": meeting.reminder_minutes
+        }
@@ -0,0 +1,50 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import func, select, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(row_id: int, sort_value: datetime) -> str:
+    payload = json.dumps([row_id, sort_value.isoformat() if sort_value else None])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row_id, sort_value = json.loads(base64.urlsafe_b64decode(padded))
+        return int(row_id), datetime.fromisoformat(sort_value) if sort_value else None
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def paginate(query, model, sort_column, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, descending: bool = False):
+    """Keyset pagination over ``(sort_column, id)``.
+
+    The cursor names the last row of the previous page. Its sort value is
+    re-read from the database so the comparison uses the stored format,
+    falling back to the value in the cursor if that row has since been deleted.
+    Returns ``(rows, next_cursor)``.
+    """
+    if cursor:
+        cursor_id, sort_value = decode_cursor(cursor)
+        anchor = func.coalesce(
+            select(sort_column).where(model.id == cursor_id).scalar_subquery(),
+            sort_value
+        )
+        key = tuple_(sort_column, model.id)
+        bound = tuple_(anchor, cursor_id)
+        query = query.filter(key < bound if descending else key > bound)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), model.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), model.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.id, getattr(last, sort_column.key))
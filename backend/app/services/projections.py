@@ -0,0 +1,91 @@
+"""Read-side projections shared by the list, export and change-feed endpoints.
+
+Each ``Projection`` selects only the columns its response model declares,
+as plain row tuples, so reads skip ORM hydration and the identity map.
+``json_response`` serializes the resulting dicts with orjson instead of
+FastAPI's ``jsonable_encoder``; the models still document the responses
+through ``response_model``.
+"""
+from datetime import datetime
+from typing import List, Optional
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from ..models.models import Task, Meeting
+
+class Projection:
+    """Columns selected as rows for ``model``'s fields, in declaration order."""
+
+    def __init__(self, model: type, *columns):
+        self.model = model
+        self.columns = columns
+        self.fields = tuple(model.model_fields)
+        if self.fields != tuple(column.key for column in columns):
+            raise ValueError(f"{model.__name__} fields {self.fields} don't match the selected columns")
+
+    def query(self, db):
+        return db.query(*self.columns)
+
+    def dict(self, row) -> dict:
+        return dict(zip(self.fields, row))
+
+    def dicts(self, rows) -> list:
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+class TaskOut(BaseModel):
+    id: int
+    title: str
+    completed: bool
+    due_at: Optional[datetime] = None
+    created_at: datetime
+
+class MeetingOut(BaseModel):
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    reminder_minutes: Optional[int] = None
+
+class TaskPage(BaseModel):
+    tasks: List[TaskOut]
+    next_cursor: Optional[str] = None
+    version: int
+
+class MeetingPage(BaseModel):
+    meetings: List[MeetingOut]
+    next_cursor: Optional[str] = None
+    version: int
+
+class TaskChanges(BaseModel):
+    upserted: List[TaskOut]
+    deleted: List[int]
+
+class MeetingChanges(BaseModel):
+    upserted: List[MeetingOut]
+    deleted: List[int]
+
+class ChangeFeed(BaseModel):
+    version: int
+    more: bool
+    tasks: TaskChanges
+    meetings: MeetingChanges
+
+TASK_ROW = Projection(TaskOut, Task.id, Task.title, Task.completed, Task.due_at, Task.created_at)
+MEETING_ROW = Projection(MeetingOut, Meeting.id, Meeting.title, Meeting.start_time, Meeting.end_time,
+                         Meeting.reminder_minutes)
+
+def dumps(content) -> bytes:
+    # Naive datetimes come out as isoformat(), like jsonable_encoder wrote them
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def json_response(content, headers: dict = None, status_code: int = 200) -> Response:
+    """Returned as-is by FastAPI, so neither validation nor ``jsonable_encoder``
+    runs; headers set on an injected ``Response`` must be passed here."""
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,443 @@
+"""Task due times and meeting reminders, fired from an in-memory timer heap.
+
+The scheduler never polls ``tasks`` or ``meetings``. It loads the reminders
+due in the next ``window`` seconds with one indexed range query per window,
+keeps them in a min-heap and sleeps until the earliest one. Commits in this
+process update the heap as they happen (see ``track_reminders``); writes
+from other processes are replayed from the ``changes`` log. Reminders go out
+at most once, to a pluggable sink: any object with an async
+``deliver(reminders)``. Ones that came due while no scheduler ran are not
+sent late.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+from prometheus_client import Histogram
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from ..models.base import SessionLocal
+from ..models.models import Task, Meeting, Change
+from .event_hub import event_hub
+from .jobs import percentile
+from .projections import dumps
+from .tracing import STAGE_BUCKETS
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Recent firings kept for the lateness percentiles in stats()
+LATENCY_WINDOW = 500
+# Change log entries replayed per query
+CATCH_UP_BATCH = 5000
+
+REMINDER_LATENESS_SECONDS = Histogram(
+    "reminder_lateness_seconds",
+    "Time from a reminder's due time to handing it to the sink",
+    buckets=STAGE_BUCKETS
+)
+
+class Reminder(NamedTuple):
+    kind: str
+    id: int
+    user_id: int
+    title: str
+    # When to remind, and the due or start time it is about
+    at: datetime
+    time: datetime
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.id)
+
+    def to_event(self, tz: ZoneInfo) -> dict:
+        def aware(value: datetime) -> datetime:
+            return value.astimezone(tz) if value.tzinfo else value.replace(tzinfo=tz)
+
+        if self.kind == "task":
+            return {"event": "task.due", "data": {"id": self.id, "title": self.title, "due_at": aware(self.time)}}
+        return {"event": "meeting.reminder", "data": {
+            "id": self.id, "title": self.title, "remind_at": aware(self.at), "start_time": aware(self.time)
+        }}
+
+TASK_COLUMNS = (Task.id, Task.user_id, Task.title, Task.due_at, Task.completed)
+MEETING_COLUMNS = (Meeting.id, Meeting.user_id, Meeting.title, Meeting.remind_at, Meeting.start_time)
+
+def task_reminder(task_id: int, user_id: int, title: str, due_at: datetime, completed: bool):
+    if due_at is None or completed:
+        return None
+    return Reminder("task", task_id, user_id, title, due_at, due_at)
+
+def meeting_reminder(meeting_id: int, user_id: int, title: str, remind_at: datetime, start_time: datetime):
+    if remind_at is None:
+        return None
+    return Reminder("meeting", meeting_id, user_id, title, remind_at, start_time)
+
+def wall_clock(value: datetime, tz: ZoneInfo) -> datetime:
+    return value.astimezone(tz).replace(tzinfo=None) if value.tzinfo else value
+
+class TimerHeap:
+    """Min-heap of reminders by due timestamp, addressable by ``(kind, id)``.
+
+    Rescheduling pushes a fresh entry (O(log n)) and cancelling only forgets
+    the key (O(1)); the entries they leave behind are skipped when they
+    reach the top, and dropped by one heapify once they outnumber live ones.
+    """
+
+    def __init__(self):
+        self.heap = []
+        # key -> (due, sequence, reminder); an entry is live while its sequence matches
+        self.live = {}
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.live)
+
+    def push(self, due: float, reminder: Reminder):
+        sequence = next(self.sequence)
+        self.live[reminder.key] = (due, sequence, reminder)
+        heapq.heappush(self.heap, (due, sequence, reminder.key))
+        self.compact()
+
+    def discard(self, key: tuple):
+        if self.live.pop(key, None) is not None:
+            self.compact()
+
+    def compact(self):
+        if len(self.heap) > 2 * len(self.live) + 64:
+            self.heap = [(due, sequence, key) for key, (due, sequence, _) in self.live.items()]
+            heapq.heapify(self.heap)
+
+    def next_due(self):
+        """Earliest live due timestamp, or ``None``."""
+        heap, live = self.heap, self.live
+        while heap:
+            due, sequence, key = heap[0]
+            entry = live.get(key)
+            if entry is not None and entry[1] == sequence:
+                return due
+            heapq.heappop(heap)
+        return None
+
+    def pop_due(self, now: float) -> list:
+        """Removes and returns ``(due, sequence, reminder)`` for everything due by ``now``."""
+        entries = []
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return entries
+            _, _, key = heapq.heappop(self.heap)
+            entries.append(self.live.pop(key))
+
+class ReminderScheduler:
+    """Fires reminders from a ``TimerHeap`` holding the next ``window`` seconds.
+
+    Everything due before ``horizon`` is in the heap and everything due
+    before ``fired_through`` has been handed to the sink, so writes only
+    touch the heap when they fall between the two. Times are compared as
+    wall-clock times in ``tz_name``, which is how SQLite hands them back.
+    """
+
+    def __init__(self, sink, window: float = None, catch_up_interval: float = None,
+                 session_factory=SessionLocal, tz_name: str = None, clock=time.time):
+        self.sink = sink
+        self.window = window or settings.REMINDER_WINDOW
+        # 0 when every write goes through this process
+        self.catch_up_interval = settings.REMINDER_CATCH_UP_INTERVAL if catch_up_interval is None else catch_up_interval
+        self.session_factory = session_factory
+        self.tz = ZoneInfo(tz_name or settings.TIMEZONE)
+        self.clock = clock
+        self.timers = TimerHeap()
+        # Held briefly by committing threads as well as the scheduler
+        self.lock = threading.Lock()
+        self.horizon = None
+        self.fired_through = None
+        # Last change log entry replayed
+        self.version = 0
+        self.loop = None
+        self.wakeup = None
+        self.counts = {"loaded": 0, "updated": 0, "fired": 0, "failed": 0, "windows": 0, "catch_ups": 0}
+        self.lateness = deque(maxlen=LATENCY_WINDOW)
+
+    def timestamp(self, value: datetime) -> float:
+        return wall_clock(value, self.tz).replace(tzinfo=self.tz).timestamp()
+
+    def db_time(self, timestamp: float) -> datetime:
+        return datetime.fromtimestamp(timestamp, self.tz).replace(tzinfo=None)
+
+    def wake(self):
+        # Called from whichever thread committed
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def apply(self, updates: list):
+        """Brings the heap in line with ``(key, reminder or None)`` pairs
+        describing the current state of written rows; O(log n) each."""
+        with self.lock:
+            if self.horizon is None:
+                # Not started; the first window load reads the rows as they are
+                return
+            head = self.timers.next_due()
+            for key, reminder in updates:
+                due = self.timestamp(reminder.at) if reminder else None
+                if due is None or due < self.fired_through or due >= self.horizon:
+                    self.timers.discard(key)
+                else:
+                    self.timers.push(due, reminder)
+            self.counts["updated"] += len(updates)
+            moved = self.timers.next_due() != head
+        if moved:
+            self.wake()
+
+    def load(self, until: float):
+        """Adds the reminders due in ``[horizon, until)`` and moves the horizon to ``until``."""
+        start, end = self.db_time(self.horizon), self.db_time(until)
+        with self.session_factory() as db:
+            tasks = db.query(*TASK_COLUMNS).filter(
+                Task.due_at >= start, Task.due_at < end, Task.completed.is_not(True)
+            ).all()
+            meetings = db.query(*MEETING_COLUMNS).filter(Meeting.remind_at >= start, Meeting.remind_at < end).all()
+
+        reminders = [task_reminder(*row) for row in tasks] + [meeting_reminder(*row) for row in meetings]
+        with self.lock:
+            for reminder in reminders:
+                due = self.timestamp(reminder.at)
+                if due >= self.fired_through:
+                    self.timers.push(due, reminder)
+            self.horizon = until
+            self.counts["loaded"] += len(reminders)
+            self.counts["windows"] += 1
+        # Writes that raced the query were logged; replaying them is idempotent
+        self.catch_up()
+
+    def catch_up(self):
+        """Replays task and meeting writes logged since the last replay, from any process."""
+        with self.session_factory() as db:
+            while True:
+                changes = db.query(Change.id, Change.table_name, Change.row_id).filter(
+                    Change.id > self.version
+                ).order_by(Change.id).limit(CATCH_UP_BATCH).all()
+                if not changes:
+                    break
+
+                touched = {"tasks": set(), "meetings": set()}
+                for _, table_name, row_id in changes:
+                    touched.setdefault(table_name, set()).add(row_id)
+                updates = []
+                for kind, model, columns, build, row_ids in (
+                    ("task", Task, TASK_COLUMNS, task_reminder, touched["tasks"]),
+                    ("meeting", Meeting, MEETING_COLUMNS, meeting_reminder, touched["meetings"]),
+                ):
+                    if not row_ids:
+                        continue
+                    found = {row.id: build(*row) for row in db.query(*columns).filter(model.id.in_(row_ids))}
+                    updates.extend(((kind, row_id), found.get(row_id)) for row_id in row_ids)
+                self.apply(updates)
+                self.version = changes[-1].id
+                if len(changes) < CATCH_UP_BATCH:
+                    break
+        self.counts["catch_ups"] += 1
+
+    def start(self):
+        now = self.clock()
+        # Version first: writes racing the first load get replayed
+        with self.session_factory() as db:
+            self.version = db.query(func.max(Change.id)).scalar() or 0
+        with self.lock:
+            self.horizon = self.fired_through = now
+        self.load(now + self.window)
+
+    def take_due(self, now: float) -> list:
+        with self.lock:
+            entries = self.timers.pop_due(now)
+            self.fired_through = max(self.fired_through, now)
+        return entries
+
+    async def deliver(self, entries: list):
+        now = self.clock()
+        for due, _, _ in entries:
+            self.lateness.append(now - due)
+            REMINDER_LATENESS_SECONDS.observe(max(0.0, now - due))
+        reminders = [reminder for _, _, reminder in entries]
+        try:
+            await self.sink.deliver(reminders)
+            self.counts["fired"] += len(reminders)
+        except Exception:
+            # At most once: a failed delivery is not retried
+            self.counts["failed"] += len(reminders)
+            logger.exception(f"Delivering {len(reminders)} reminders failed")
+
+    def next_wakeup(self, next_catch_up: float) -> float:
+        with self.lock:
+            due = self.timers.next_due()
+        # Load the next window while half of this one is still ahead
+        times = [self.horizon - self.window / 2]
+        if due is not None:
+            times.append(due)
+        if self.catch_up_interval:
+            times.append(next_catch_up)
+        return min(times)
+
+    async def run(self, stop: asyncio.Event):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        SCHEDULERS.add(self)
+        stopping = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.to_thread(self.start)
+            next_catch_up = self.clock() + self.catch_up_interval
+            while not stop.is_set():
+                self.wakeup.clear()
+                failed = False
+                try:
+                    now = self.clock()
+                    if self.horizon - now <= self.window / 2:
+                        await asyncio.to_thread(self.load, max(self.horizon, now) + self.window)
+                    due = self.timers.next_due()
+                    if self.catch_up_interval and (now >= next_catch_up or (due is not None and due <= now)):
+                        # Other processes' writes can move or cancel what is about to fire
+                        await asyncio.to_thread(self.catch_up)
+                        next_catch_up = now + self.catch_up_interval
+                    entries = self.take_due(self.clock())
+                    if entries:
+                        await self.deliver(entries)
+                except Exception:
+                    logger.exception("Reminder scheduler pass failed")
+                    failed = True
+
+                delay = max(0.0, self.next_wakeup(next_catch_up) - self.clock())
+                if failed:
+                    # Most likely the database; retry without spinning
+                    delay = max(delay, 1.0)
+                woken = asyncio.ensure_future(self.wakeup.wait())
+                await asyncio.wait({stopping, woken}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+        finally:
+            stopping.cancel()
+            SCHEDULERS.discard(self)
+            self.loop = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            pending, entries, due = len(self.timers), len(self.timers.heap), self.timers.next_due()
+        return dict(
+            self.counts,
+            pending=pending,
+            heap_entries=entries,
+            next_due_in=round(due - self.clock(), 3) if due is not None else None,
+            horizon=datetime.fromtimestamp(self.horizon, self.tz).isoformat() if self.horizon else None,
+            lateness_p50=percentile(self.lateness, 0.5),
+            lateness_p95=percentile(self.lateness, 0.95),
+            lateness_max=round(max(self.lateness), 4) if self.lateness else None
+        )
+
+class EventHubSink:
+    """Sends each reminder to its owner's WebSocket clients in this process."""
+
+    def __init__(self, hub=event_hub, tz_name: str = None):
+        self.hub = hub
+        self.tz = ZoneInfo(tz_name or settings.TIMEZONE)
+
+    async def deliver(self, reminders: list):
+        for reminder in reminders:
+            self.hub.publish(reminder.to_event(self.tz), reminder.user_id)
+
+class LogSink:
+    def __init__(self, tz_name: str = None):
+        self.tz = ZoneInfo(tz_name or settings.TIMEZONE)
+
+    async def deliver(self, reminders: list):
+        for reminder in reminders:
+            logger.info(f"Reminder for user {reminder.user_id}: {dumps(reminder.to_event(self.tz)).decode()}")
+
+class WebhookSink:
+    """POSTs each batch as ``{"reminders": [event, ...]}``; a non-2xx reply fails the batch."""
+
+    def __init__(self, url: str, timeout: float = 10, tz_name: str = None):
+        import httpx
+
+        self.url = url
+        self.http = httpx.AsyncClient(timeout=timeout)
+        self.tz = ZoneInfo(tz_name or settings.TIMEZONE)
+
+    async def deliver(self, reminders: list):
+        body = dumps({"reminders": [reminder.to_event(self.tz) for reminder in reminders]})
+        response = await self.http.post(self.url, content=body, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    async def close(self):
+        await self.http.aclose()
+
+def create_reminder_sink(settings):
+    if settings.REMINDER_SINK == "log":
+        return LogSink(settings.TIMEZONE)
+    if settings.REMINDER_SINK == "webhook":
+        if not settings.REMINDER_WEBHOOK_URL:
+            raise ValueError("REMINDER_SINK=webhook needs REMINDER_WEBHOOK_URL")
+        return WebhookSink(settings.REMINDER_WEBHOOK_URL, tz_name=settings.TIMEZONE)
+    if settings.REMINDER_SINK == "event_hub":
+        return EventHubSink(event_hub, settings.TIMEZONE)
+    raise ValueError(f"Unknown REMINDER_SINK {settings.REMINDER_SINK!r}")
+
+# Schedulers in this process, updated when a local transaction writes reminders
+SCHEDULERS = set()
+
+def derive_remind_at(session: Session, flush_context, instances):
+    tz = ZoneInfo(settings.TIMEZONE)
+    for instance in itertools.chain(session.new, session.dirty):
+        if not isinstance(instance, Meeting):
+            continue
+        if instance in session.new and instance.reminder_minutes is None and settings.MEETING_REMINDER_MINUTES >= 0:
+            instance.reminder_minutes = settings.MEETING_REMINDER_MINUTES
+        remind_at = None
+        if instance.reminder_minutes is not None and instance.start_time is not None:
+            remind_at = wall_clock(instance.start_time, tz) - timedelta(minutes=instance.reminder_minutes)
+        if instance.remind_at != remind_at:
+            instance.remind_at = remind_at
+
+def collect_reminder_writes(session: Session, flush_context):
+    updates = []
+    for instance in itertools.chain(session.new, session.dirty):
+        if session.is_modified(instance, include_collections=False) or instance in session.new:
+            if isinstance(instance, Task):
+                updates.append((("task", instance.id), task_reminder(
+                    instance.id, instance.user_id, instance.title, instance.due_at, instance.completed
+                )))
+            elif isinstance(instance, Meeting):
+                updates.append((("meeting", instance.id), meeting_reminder(
+                    instance.id, instance.user_id, instance.title, instance.remind_at, instance.start_time
+                )))
+    for instance in session.deleted:
+        if isinstance(instance, Task):
+            updates.append((("task", instance.id), None))
+        elif isinstance(instance, Meeting):
+            updates.append((("meeting", instance.id), None))
+    if updates:
+        session.info.setdefault("reminder_updates", []).extend(updates)
+
+def apply_reminder_writes(session: Session):
+    updates = session.info.pop("reminder_updates", None)
+    if updates:
+        for scheduler in list(SCHEDULERS):
+            scheduler.apply(updates)
+
+def discard_reminder_writes(session: Session):
+    session.info.pop("reminder_updates", None)
+
+def track_reminders():
+    """Keeps ``Meeting.remind_at`` derived from the start time and offset, and
+    hands committed task and meeting writes to this process's schedulers."""
+    for name, listener in (
+        ("before_flush", derive_remind_at),
+        ("after_flush", collect_reminder_writes),
+        ("after_commit", apply_reminder_writes),
+        ("after_rollback", discard_reminder_writes),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
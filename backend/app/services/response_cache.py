@@ -0,0 +1,226 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter
+
+WHITESPACE = re.compile(r"\s+")
+TRAILING_PUNCTUATION = re.compile(r"[\s.!?]+$")
+WORD = re.compile(r"[a-z0-9]+")
+# Words the model puts around what the user typed, as in "Meeting with Sam"
+FRAMING_WORDS = {"a", "an", "the", "meeting", "with"}
+
+CACHE_LOOKUPS = Counter(
+    "response_cache_lookups",
+    "Response cache lookups, by result",
+    ["result"]
+)
+CACHE_SAVED_SECONDS = Counter(
+    "response_cache_saved_seconds",
+    "Model latency avoided by serving cached replies"
+)
+CACHE_EVICTIONS = Counter(
+    "response_cache_evictions",
+    "Entries dropped from the response cache, by reason",
+    ["reason"]
+)
+
+def normalize_message(message: str) -> str:
+    message = WHITESPACE.sub(" ", message.strip().lower())
+    return TRAILING_PUNCTUATION.sub("", message)
+
+def action_texts(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key != "action":
+                yield from action_texts(item)
+
+def self_contained(message: str, parsed_response: dict) -> bool:
+    """Whether an action envelope reads off ``message`` alone: every word of
+    its text arguments appears in the message. Actions for follow-ups such
+    as "delete it" or "move it to 4pm" take them from earlier turns."""
+    if parsed_response.get("type") != "action" or not isinstance(parsed_response.get("content"), dict):
+        return False
+    words = set(WORD.findall(message.lower())) | FRAMING_WORDS
+    return all(set(WORD.findall(text.lower())) <= words for text in action_texts(parsed_response["content"]))
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry expiry, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, latency, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self._evicted("expired")
+                return None
+            self.entries.move_to_end(key)
+            return value, latency
+
+    def set(self, key: str, value: str, latency: float, ttl: float):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, latency, time.time() + ttl)
+            self.size += len(value)
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self._evicted("capacity")
+
+    def _remove(self, key: str):
+        value, _, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+    def _evicted(self, reason: str, count: int = 1):
+        self.evictions += count
+        CACHE_EVICTIONS.labels(reason).inc(count)
+
+    def __len__(self):
+        return len(self.entries)
+
+class SQLiteCacheBackend:
+    """File-backed cache that survives restarts, evicting least recently used
+    rows, bounded like ``MemoryCacheBackend`` by entry count and bytes."""
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, latency REAL NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, latency, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[2] <= now:
+                self.conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                self._evicted("expired")
+                return None
+            self.conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            return row[0], row[1]
+
+    def set(self, key: str, value: str, latency: float, ttl: float):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                (key, value, latency, now + ttl, now)
+            )
+            expired = self.conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,)).rowcount
+            # Keeps the most recently used rows that fit both bounds
+            over = self.conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, ROW_NUMBER() OVER recent AS n, SUM(LENGTH(value)) OVER recent AS size "
+                "FROM response_cache WINDOW recent AS (ORDER BY accessed_at DESC, key)) "
+                "WHERE n > ? OR size > ?)",
+                (self.max_entries, self.max_bytes)
+            ).rowcount
+            self.conn.commit()
+            self._evicted("expired", expired)
+            self._evicted("capacity", over)
+
+    def _evicted(self, reason: str, count: int = 1):
+        if count:
+            self.evictions += count
+            CACHE_EVICTIONS.labels(reason).inc(count)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+class ResponseCache:
+    """Caches parsed model replies keyed on the normalized message and model parameters.
+
+    Only the parsed envelope is stored; anything rendered from the database
+    is rebuilt on every hit.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+
+    def key(self, message: str, params: dict) -> str:
+        material = json.dumps([normalize_message(message), params], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, message: str, params: dict, self_contained_only: bool = False):
+        """The cached reply for ``message``. With ``self_contained_only``, for
+        messages with conversation history behind them, a reply whose action
+        doesn't read off the message alone counts as a miss."""
+        entry = self.backend.get(self.key(message, params))
+        if entry is None:
+            return self._miss()
+
+        value, latency = entry
+        parsed_response = json.loads(value)
+        if self_contained_only and not self_contained(message, parsed_response):
+            return self._miss()
+        self.hits += 1
+        self.saved_latency += latency
+        CACHE_LOOKUPS.labels("hit").inc()
+        CACHE_SAVED_SECONDS.inc(latency)
+        return parsed_response
+
+    def _miss(self):
+        self.misses += 1
+        CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def set(self, message: str, params: dict, parsed_response: dict, latency: float):
+        self.backend.set(self.key(message, params), json.dumps(parsed_response), latency, self.ttl)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_latency_seconds": round(self.saved_latency, 3),
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend)
+        }
+
+def create_response_cache(settings):
+    if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(
+            settings.RESPONSE_CACHE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES
+        )
+    else:
+        backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES)
+    return ResponseCache(backend, settings.RESPONSE_CACHE_TTL)
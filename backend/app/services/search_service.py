@@ -0,0 +1,98 @@
+import logging
+from sqlalchemy import text, func
+from sqlalchemy.orm import Session
+from ..models.models import Task, Meeting
+
+logger = logging.getLogger(__name__)
+
+# Trigram tokens give the same substring semantics as ILIKE '%...%'
+MIN_QUERY_LENGTH = 3
+
+SEARCH_TABLES = {
+    "tasks": "tasks_fts",
+    "meetings": "meetings_fts",
+}
+
+def create_search_indexes(engine):
+    """Creates FTS5 indexes over task and meeting titles, kept in sync by triggers.
+
+    On Postgres the ILIKE fallback is backed by pg_trgm GIN indexes instead.
+    """
+    if engine.dialect.name == "postgresql":
+        create_trigram_indexes(engine)
+        return
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        for table, fts in SEARCH_TABLES.items():
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts}
+            ).first()
+
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"title, content='{table}', content_rowid='id', tokenize='trigram')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, title) VALUES ('delete', old.id, old.title); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF title ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, title) VALUES ('delete', old.id, old.title); "
+                f"INSERT INTO {fts}(rowid, title) VALUES (new.id, new.title); END"
+            ))
+
+            # Index rows that predate the search table
+            if not exists:
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def create_trigram_indexes(engine):
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for table in SEARCH_TABLES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_title_trgm ON {table} USING gin (title gin_trgm_ops)"
+                ))
+    except Exception as e:
+        # Searching still works, just without the index
+        logger.warning(f"Could not create trigram indexes: {str(e)}")
+
+def fts_phrase(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+class SearchService:
+    @staticmethod
+    def find_task(db: Session, query: str, user_id: int):
+        return SearchService._find(db, Task, "tasks", query, user_id)
+
+    @staticmethod
+    def find_meeting(db: Session, query: str, user_id: int):
+        return SearchService._find(db, Meeting, "meetings", query, user_id)
+
+    @staticmethod
+    def _find(db: Session, model, table: str, query: str, user_id: int):
+        """Returns the best title match for ``query`` among ``user_id``'s rows, or ``None``."""
+        query = query.strip()
+
+        if db.get_bind().dialect.name == "sqlite" and len(query) >= MIN_QUERY_LENGTH:
+            fts = SEARCH_TABLES[table]
+            statement = text(
+                f"SELECT {table}.* FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid "
+                f"WHERE {fts} MATCH :query AND {table}.user_id = :user_id "
+                f"ORDER BY bm25({fts}), length({table}.title), {table}.id DESC LIMIT 1"
+            )
+            return db.query(model).from_statement(statement).params(query=fts_phrase(query), user_id=user_id).first()
+
+        # Closest match first: the shortest title containing the query
+        return db.query(model).filter(
+            model.user_id == user_id,
+            model.title.ilike(f"%{query}%")
+        ).order_by(func.length(model.title), model.id.desc()).first()
@@ -0,0 +1,97 @@
+import json
+import re
+
+TYPE_PATTERN = re.compile(r'"type"\s*:\s*"(action|message)"')
+CONTENT_PATTERN = re.compile(r'"content"\s*:\s*"')
+
+ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+class ReplyStreamParser:
+    """Incrementally inspects a streamed JSON reply from the model.
+
+    As soon as the envelope ``type`` is visible the parser knows whether the
+    reply is an action (buffer until complete) or a plain message, in which
+    case the decoded characters of ``content`` are returned by ``feed`` as
+    they arrive.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.reply_type = None
+        self.content_start = None
+        self.position = 0
+        self.content_done = False
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+
+        if self.reply_type is None:
+            match = TYPE_PATTERN.search(self.buffer)
+            if not match:
+                return ""
+            self.reply_type = match.group(1)
+
+        if self.reply_type != "message" or self.content_done:
+            return ""
+
+        if self.content_start is None:
+            match = CONTENT_PATTERN.search(self.buffer)
+            if not match:
+                return ""
+            self.content_start = match.end()
+            self.position = self.content_start
+
+        return self._decode_available()
+
+    def _decode_available(self) -> str:
+        out = []
+        buffer = self.buffer
+        i = self.position
+
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.content_done = True
+                i += 1
+                break
+            if char != '\\':
+                out.append(char)
+                i += 1
+                continue
+
+            # Wait for the rest of an escape sequence before decoding it
+            if i + 1 >= len(buffer):
+                break
+            escape = buffer[i + 1]
+            if escape == 'u':
+                if i + 6 > len(buffer):
+                    break
+                code = int(buffer[i + 2:i + 6], 16)
+                if 0xD800 <= code < 0xDC00:
+                    # Surrogate pair, wait for the low half
+                    if i + 12 > len(buffer):
+                        break
+                    low = int(buffer[i + 8:i + 12], 16)
+                    code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                    i += 6
+                out.append(chr(code))
+                i += 6
+            else:
+                out.append(ESCAPES.get(escape, escape))
+                i += 2
+
+        self.position = i
+        return "".join(out)
+
+    def result(self):
+        """Parses the complete buffered reply, raising ``json.JSONDecodeError``."""
+        return json.loads(self.buffer)
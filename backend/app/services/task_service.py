@@ -1,10 +1,15 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.models import Task
 from datetime import datetime
+from zoneinfo import ZoneInfo
+from config.settings import settings
+from .pagination import paginate, DEFAULT_PAGE_SIZE
+from .projections import Projection, TASK_ROW
 
 class TaskService:
     @staticmethod
-    def create_task(db: Session, title: str, user_id: int = 1):
+    def create_task(db: Session, title: str, user_id: int):
         task = Task(
             title=title,
             user_id=user_id
@@ -15,5 +20,76 @@ class TaskService:
         return task
 
     @staticmethod
-    def get_tasks(db: Session, user_id: int = 1):
-        return db.query(Task).filter(Task.user_id == user_id).all() 
\ No newline at end of file
+    def get_tasks(db: Session, user_id: int, projection: Projection = None):
+        query = projection.query(db) if projection else db.query(Task)
+        return query.filter(Task.user_id == user_id).all()
+
+    @staticmethod
+    async def create_task_async(db: AsyncSession, title: str, user_id: int):
+        # The query helpers are shared; run_sync executes them over the async connection
+        return await db.run_sync(TaskService.create_task, title, user_id)
+
+    @staticmethod
+    async def get_tasks_async(db: AsyncSession, user_id: int, projection: Projection = None):
+        return await db.run_sync(TaskService.get_tasks, user_id, projection)
+
+    @staticmethod
+    def filter_tasks(db: Session, user_id: int, completed: bool = None, since: datetime = None, until: datetime = None,
+                     projection: Projection = None):
+        # Every listing starts from the user's slice of the (user_id, ...) indexes
+        query = (projection.query(db) if projection else db.query(Task)).filter(Task.user_id == user_id)
+        if completed is not None:
+            query = query.filter(Task.completed == completed)
+        if since:
+            query = query.filter(Task.created_at >= since)
+        if until:
+            query = query.filter(Task.created_at < until)
+        return query
+
+    @staticmethod
+    def list_tasks(db: Session, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, completed: bool = None,
+                   since: datetime = None, until: datetime = None):
+        """A page of ``TASK_ROW`` rows, newest first, and the next page's cursor."""
+        query = TaskService.filter_tasks(db, user_id, completed, since, until, TASK_ROW)
+        return paginate(query, Task, Task.created_at, cursor, limit, descending=True)
+
+    @staticmethod
+    async def list_tasks_async(db: AsyncSession, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+                               completed: bool = None, since: datetime = None, until: datetime = None):
+        return await db.run_sync(TaskService.list_tasks, user_id, limit, cursor, completed, since, until)
+
+    @staticmethod
+    def get_task(db: Session, user_id: int, task_id: int):
+        return db.query(Task).filter(Task.user_id == user_id, Task.id == task_id).first()
+
+    @staticmethod
+    async def get_task_async(db: AsyncSession, user_id: int, task_id: int):
+        return await db.run_sync(TaskService.get_task, user_id, task_id)
+
+    @staticmethod
+    def set_due(db: Session, user_id: int, task_id: int, due_at: datetime = None):
+        """Sets or clears the task's due time; ``None`` if the user has no such task."""
+        task = TaskService.get_task(db, user_id, task_id)
+        if task is None:
+            return None
+        # Stored as wall-clock time in TIMEZONE, like meeting times
+        if due_at is not None and due_at.tzinfo:
+            due_at = due_at.astimezone(ZoneInfo(settings.TIMEZONE)).replace(tzinfo=None)
+        task.due_at = due_at
+        db.commit()
+        db.refresh(task)
+        return task
+
+    @staticmethod
+    async def set_due_async(db: AsyncSession, user_id: int, task_id: int, due_at: datetime = None):
+        return await db.run_sync(TaskService.set_due, user_id, task_id, due_at)
+
+    @staticmethod
+    def to_dict(task: Task) -> dict:
+        return {
+            "id": task.id,
+            "title": task.title,
+            "completed": task.completed,
+            "due_at": task.due_at,
+            "created_at": task.created_at
+        }
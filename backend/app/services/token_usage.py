@@ -0,0 +1,57 @@
+import math
+import threading
+from collections import deque
+
+RECENT_REQUESTS = 100
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for offline comparisons."""
+    return math.ceil(len(text) / 4)
+
+def usage_counts(usage) -> dict:
+    """Token counts from an OpenAI ``usage`` object, or ``None`` when absent."""
+    if usage is None:
+        return None
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        # Prompt tokens served from the provider's prefix cache, where reported
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0
+    }
+
+class TokenUsage:
+    """Prompt and completion tokens per LLM request, totalled by prompt version."""
+
+    def __init__(self, recent: int = RECENT_REQUESTS):
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=recent)
+        self.totals = {}
+
+    def record(self, prompt_version: str, usage, latency: float = 0.0):
+        counts = usage_counts(usage)
+        if counts is None:
+            return
+
+        with self.lock:
+            self.recent.append(dict(counts, prompt_version=prompt_version, latency=round(latency, 4)))
+            totals = self.totals.setdefault(
+                prompt_version,
+                {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+            )
+            totals["requests"] += 1
+            for name, value in counts.items():
+                totals[name] += value
+
+    def stats(self) -> dict:
+        with self.lock:
+            by_version = {}
+            for version, totals in self.totals.items():
+                requests = totals["requests"]
+                by_version[version] = dict(
+                    totals,
+                    avg_prompt_tokens=round(totals["prompt_tokens"] / requests, 1),
+                    avg_completion_tokens=round(totals["completion_tokens"] / requests, 1)
+                )
+            return {"by_prompt_version": by_version, "recent": list(self.recent)}
@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from .logging_config import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+# Stages are fast compared with HTTP requests, so their buckets start lower
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "assistant_stage_seconds",
+    "Time spent in each stage of handling a request",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS
+)
+
+class Trace:
+    """Spans recorded while handling one request."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, name: str, started: float, duration: float):
+        self.spans.append((name, started - self.started, duration))
+
+    def totals(self) -> dict:
+        """Milliseconds per stage; repeated stages (e.g. queries) are summed."""
+        totals = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration * 1000
+        return totals
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.totals().items())
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def record_span(name: str, started: float, duration: float):
+    STAGE_SECONDS.labels(name).observe(duration)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, started, duration)
+
+@contextmanager
+def span(name: str):
+    """Times the block as stage ``name``, in the histogram and the current trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, started, time.perf_counter() - started)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    record_span("db_query", started, time.perf_counter() - started)
+
+def handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+
+def before_commit(session: Session):
+    session.info["commit_started"] = time.perf_counter()
+
+def after_commit(session: Session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        # Includes the flush that commit() performs
+        record_span("db_commit", started, time.perf_counter() - started)
+
+def trace_database():
+    """Times every SQL statement and session commit, sync or async."""
+    for target, name, listener in (
+        (Engine, "before_cursor_execute", before_cursor_execute),
+        (Engine, "after_cursor_execute", after_cursor_execute),
+        (Engine, "handle_error", handle_error),
+        (Session, "before_commit", before_commit),
+        (Session, "after_commit", after_commit),
+    ):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+class Profiler:
+    """Per-request profile dumps, requested with an ``X-Profile`` header.
+
+    ``cprofile`` writes a ``.prof`` file for pstats/snakeviz; ``pyinstrument``
+    (if installed) writes an HTML call tree. Only one request is profiled at
+    a time. cProfile sees every coroutine the event loop runs meanwhile, so
+    profile under light load.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def start(self, kind: str):
+        if not self.lock.acquire(blocking=False):
+            logger.info("Skipping profile; another request is being profiled")
+            return None
+
+        try:
+            if kind == "pyinstrument":
+                from pyinstrument import Profiler as Instrument
+                profiler = Instrument(async_mode="enabled")
+                profiler.start()
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return kind, profiler
+        except Exception as e:
+            self.lock.release()
+            logger.warning(f"Could not start {kind} profiler: {str(e)}")
+            return None
+
+    def stop(self, running, trace: Trace, route: str) -> str:
+        kind, profiler = running
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{route.strip('/').replace('/', '_') or 'root'}-{trace.id}"
+            if kind == "pyinstrument":
+                profiler.stop()
+                path = os.path.join(self.directory, f"{name}.html")
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.disable()
+                path = os.path.join(self.directory, f"{name}.prof")
+                profiler.dump_stats(path)
+            return path
+        finally:
+            self.lock.release()
+
+class TracingMiddleware:
+    """ASGI middleware that opens a trace per HTTP request.
+
+    Records request latency by route, adds ``X-Trace-Id`` and a
+    ``Server-Timing`` breakdown to the response, logs a sampled summary
+    line, and profiles the request when asked to and profiling is enabled.
+    """
+
+    def __init__(self, app, profile_dir: str = None):
+        self.app = app
+        self.profiler = Profiler(profile_dir) if profile_dir else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = current_trace.set(trace)
+        status = 500
+
+        profile_kind = None
+        if self.profiler:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    profile_kind = value.decode().lower()
+        running = self.profiler.start(profile_kind) if profile_kind else None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", trace.id.encode()))
+                # Streaming responses only report the stages done before the first byte
+                timing = trace.server_timing()
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - trace.started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.labels(scope["method"], route, status).observe(duration)
+            current_trace.reset(token)
+
+            if running:
+                path = self.profiler.stop(running, trace, route)
+                logger.info(f"Profile for trace {trace.id} written to {path}")
+
+            stages = " ".join(f"{name}={ms:.1f}ms" for name, ms in trace.totals().items())
+            logger.info(
+                f"{scope['method']} {route} {status} {duration * 1000:.1f}ms trace={trace.id} {stages}",
+                extra=SAMPLED
+            )
@@ -0,0 +1,99 @@
+"""Runs background jobs, and calendar sync and reminders when enabled, outside the API.
+
+Set JOBS_IN_PROCESS=false (and CALENDAR_SYNC_ENABLED=false) for the API
+workers and start as many of these as needed:
+
+    python -m app.worker --concurrency 8
+    python -m app.worker --kinds calendar.push --no-reminders
+
+Reminders with a sink other than "event_hub" should run in one process only.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from .models.base import engine, async_engine
+from .services.availability import track_availability
+from .services.change_tracker import track_changes
+from .services.calendar_sync import get_calendar_sync, track_calendar_writes
+from .services.jobs import JobRunner, track_jobs
+from .services.reminders import ReminderScheduler, create_reminder_sink, track_reminders
+from .services.logging_config import configure_logging
+from .services.tracing import trace_database
+from .services import conversation_store
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class BackgroundServices:
+    """The job runner, the calendar sync loop and the reminder scheduler, as
+    tasks on the running loop."""
+
+    def __init__(self, jobs: bool = True, calendar: bool = False, reminders: bool = False,
+                 concurrency: int = None, kinds: list = None):
+        self.job_runner = JobRunner(concurrency, kinds=kinds) if jobs else None
+        self.calendar_sync = get_calendar_sync() if calendar else None
+        self.reminder_scheduler = ReminderScheduler(create_reminder_sink(settings)) if reminders else None
+        self.stop_event = None
+        self.tasks = []
+
+    def start(self):
+        # Session listeners that let worker-side writes log changes and queue follow-up work
+        track_changes()
+        track_availability()
+        track_calendar_writes()
+        track_jobs()
+        track_reminders()
+        # Jobs of kinds with no handler here fail after their attempts
+        conversation_store.register_jobs()
+        self.stop_event = asyncio.Event()
+        if self.job_runner:
+            self.tasks.append(asyncio.create_task(self.job_runner.run(self.stop_event)))
+        if self.calendar_sync:
+            self.tasks.append(asyncio.create_task(self.calendar_sync.run(self.stop_event)))
+        if self.reminder_scheduler:
+            self.tasks.append(asyncio.create_task(self.reminder_scheduler.run(self.stop_event)))
+
+    async def stop(self):
+        self.stop_event.set()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.calendar_sync:
+            await self.calendar_sync.client.close()
+        if self.reminder_scheduler and hasattr(self.reminder_scheduler.sink, "close"):
+            await self.reminder_scheduler.sink.close()
+
+async def serve(background: BackgroundServices):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    background.start()
+    logger.info("Worker started")
+    await stop.wait()
+    logger.info("Worker stopping; waiting for running jobs")
+    await background.stop()
+    await async_engine.dispose()
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_CONCURRENCY)
+    parser.add_argument("--kinds", help="comma-separated job kinds to run (default: all)")
+    parser.add_argument("--no-calendar", action="store_true", help="don't run the calendar sync loop")
+    parser.add_argument("--no-reminders", action="store_true", help="don't run the reminder scheduler")
+    args = parser.parse_args()
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_SAMPLE_RATE)
+    trace_database()
+    kinds = args.kinds.split(",") if args.kinds else None
+    asyncio.run(serve(BackgroundServices(
+        jobs=True,
+        calendar=settings.CALENDAR_SYNC_ENABLED and not args.no_calendar,
+        reminders=settings.REMINDERS_ENABLED and not args.no_reminders,
+        concurrency=args.concurrency,
+        kinds=kinds
+    )))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Free/busy lookups over one user's calendar: SQL overlap query and a
+linear scan vs. the interval index.
+
+Seeds ``--meetings`` meetings (30-90 minutes, several per working day,
+some overlapping) into a throwaway SQLite database, then times "is this
+slot free", "conflicts for X" and "next free 1h slot", plus the index's
+build and per-write update cost. "index + sync" is what the app does: one
+indexed query for unseen changes, then the lookup. Run from the backend
+directory:
+
+    python -m benchmarks.bench_availability --meetings 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base, create_db_engine
+from app.models.models import Meeting, User
+from app.services.auth_service import ANONYMOUS_USER_ID, ANONYMOUS_EMAIL
+from app.services.availability import Availability, Busy, IntervalIndex
+
+START = datetime(2020, 1, 6, 9)
+BATCH_SIZE = 5000
+
+def generate(meetings: int, rng: random.Random) -> list:
+    rows = []
+    day = START
+    while len(rows) < meetings:
+        if day.weekday() < 5:
+            for _ in range(rng.randint(3, 8)):
+                start = day + timedelta(minutes=15 * rng.randint(0, 31))
+                rows.append({
+                    "user_id": ANONYMOUS_USER_ID,
+                    "title": f"meeting {len(rows)}",
+                    "start_time": start,
+                    "end_time": start + timedelta(minutes=rng.choice((30, 45, 60, 90)))
+                })
+        day += timedelta(days=1)
+    return rows[:meetings]
+
+def seed(engine, rows: list):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": ANONYMOUS_USER_ID, "email": ANONYMOUS_EMAIL}])
+        for offset in range(0, len(rows), BATCH_SIZE):
+            conn.execute(insert(Meeting), rows[offset:offset + BATCH_SIZE])
+
+def time_us(fn, probes) -> float:
+    timings = []
+    for probe in probes:
+        started = time.perf_counter()
+        fn(*probe)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+def sql_conflicts(db, start, end):
+    return db.query(Meeting).filter(
+        Meeting.user_id == ANONYMOUS_USER_ID,
+        Meeting.start_time < end,
+        Meeting.end_time > start
+    ).all()
+
+def linear_next_free(busy_sorted, after, until, duration):
+    cursor = after
+    for busy in busy_sorted:
+        if busy.end <= cursor:
+            continue
+        if busy.start >= cursor + duration or cursor + duration > until:
+            break
+        cursor = max(cursor, busy.end)
+    return cursor if cursor + duration <= until else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meetings", type=int, default=100000)
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(args.meetings)
+    rows = generate(args.meetings, rng)
+    last = max(row["end_time"] for row in rows)
+    hour = timedelta(hours=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, rows)
+        db = sessionmaker(bind=engine)()
+
+        availability = Availability("UTC")
+        started = time.perf_counter()
+        availability.conflicts(db, ANONYMOUS_USER_ID, START, START + hour)
+        build_ms = (time.perf_counter() - started) * 1000
+        index = availability.indexes[ANONYMOUS_USER_ID]
+
+        busy_sorted = list(index.meetings)
+        span_minutes = int((last - START).total_seconds() // 60)
+        slots = [(START + timedelta(minutes=rng.randrange(span_minutes)),) for _ in range(args.probes)]
+        slots = [(start, start + hour) for (start,) in slots]
+        meeting_ids = [(rng.randint(1, args.meetings),) for _ in range(args.probes)]
+
+        results = [
+            ("is slot free", [
+                ("sql", time_us(lambda s, e: sql_conflicts(db, s, e), slots)),
+                ("linear scan", time_us(lambda s, e: [b for b in busy_sorted if b.start < e and b.end > s], slots)),
+                ("index", time_us(lambda s, e: index.overlapping(s, e), slots)),
+                ("index + sync", time_us(lambda s, e: availability.conflicts(db, ANONYMOUS_USER_ID, s, e), slots)),
+            ]),
+            ("conflicts for X", [
+                ("index + sync", time_us(lambda i: availability.meeting_conflicts(db, ANONYMOUS_USER_ID, i), meeting_ids)),
+            ]),
+            ("next free 1h", [
+                ("linear scan", time_us(lambda s, e: linear_next_free(busy_sorted, s, s + timedelta(days=7), hour), slots)),
+                ("index", time_us(lambda s, e: index.next_free(s, s + timedelta(days=7), hour), slots)),
+                ("index + sync", time_us(
+                    lambda s, e: availability.next_free_slot(db, ANONYMOUS_USER_ID, hour, s, s + timedelta(days=7)), slots
+                )),
+            ]),
+        ]
+
+        # Incremental upkeep, without the database
+        scratch = IntervalIndex(busy_sorted)
+        writes = [(Busy(10**9 + n, "new", start, end),) for n, (start, end) in enumerate(slots)]
+        add_us = time_us(scratch.add, writes)
+        remove_us = time_us(lambda busy: scratch.remove(busy.id), writes)
+
+        db.close()
+        engine.dispose()
+
+    print(f"{args.meetings} meetings, index built in {build_ms:.0f} ms; add {add_us:.1f} us, remove {remove_us:.1f} us\n")
+    print(f"{'query':>16} {'method':>13} {'p50 us':>10}")
+    for query, timings in results:
+        for method, us in timings:
+            print(f"{query:>16} {method:>13} {us:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""N sequential POST /api/chat calls vs. one POST /api/chat/batch.
+
+Uses the stub LLM server (every message classifies as add_task) and a
+throwaway SQLite database. Run from the backend directory:
+
+    python -m benchmarks.bench_batch --items 50 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.load_chat import PORT, start_stub_server
+
+REPLY = {"type": "action", "content": {"action": "add_task", "task": "imported task"}}
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    # Distinct wording per run so neither path is served from the response cache
+    def messages(prefix: str):
+        return [f"please remember {prefix} item number {i}" for i in range(args.items)]
+
+    # ASGITransport doesn't send lifespan events, so migrate the database here
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        for message in messages("sequential"):
+            response = await client.post("/api/chat", json={"message": message})
+            response.raise_for_status()
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = await client.post("/api/chat/batch", json={"messages": messages("batched")})
+        response.raise_for_status()
+        batched = time.perf_counter() - started
+        failed = response.json()["failed"]
+
+    print(f"items={args.items} llm_latency={args.latency}s")
+    print(f"sequential /api/chat: {sequential:.2f}s ({args.items / sequential:.1f} items/s)")
+    print(f"/api/chat/batch:      {batched:.2f}s ({args.items / batched:.1f} items/s, {failed} failed)")
+    print(f"speedup: {sequential / batched:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    start_stub_server(args.latency, REPLY)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
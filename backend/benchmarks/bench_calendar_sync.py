@@ -0,0 +1,149 @@
+"""Calendar sync against the fake Calendar server: one API call per meeting
+(what ``CalendarService.create_event`` did) vs. draining the outbox in
+batches, then lost acknowledgements, injected failures and pulls.
+
+Seeds ``--meetings`` meetings for a linked user in a throwaway SQLite
+database, with the fake server adding ``--latency`` seconds per HTTP
+request. Run from the backend directory:
+
+    python -m benchmarks.bench_calendar_sync --meetings 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+PORT = 8104
+# The user's primary calendar, the only one they may link
+CALENDAR_ID = "bench@example.com"
+
+def start_fake_calendar(latency: float):
+    import uvicorn
+    from devtools.fake_calendar_server import create_app
+
+    config = uvicorn.Config(create_app(latency), host="127.0.0.1", port=PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def run(args):
+    import httpx
+    from sqlalchemy import update
+    from app.migrate import migrate
+    from app.models.base import engine, SessionLocal
+    from app.models.models import Meeting, CalendarLink, CalendarOutbox, User
+    from app.services.calendar_service import CalendarClient, event_body
+    from app.services.calendar_sync import CalendarSync, CalendarLinks, track_calendar_writes, utcnow
+
+    base_url = f"http://127.0.0.1:{PORT}"
+    fake = httpx.AsyncClient(base_url=base_url)
+
+    async def fake_stats() -> dict:
+        return (await fake.get("/stats")).json()
+
+    migrate(engine)
+    track_calendar_writes()
+    start = datetime(2030, 1, 7, 9)
+    with SessionLocal() as db:
+        user = User(email=CALENDAR_ID, hashed_password="")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        CalendarLinks.link(db, user_id)
+        db.add_all([
+            Meeting(user_id=user_id, title=f"meeting {i}",
+                    start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=30))
+            for i in range(args.meetings)
+        ])
+        db.commit()
+        meetings = [(m.title, m.start_time, m.end_time) for m in db.query(Meeting).order_by(Meeting.id)]
+
+    client = CalendarClient(base_url, timeout=60)
+    sync = CalendarSync(client, base_delay=0, max_delay=0, pull_interval=0)
+
+    # One HTTP call per meeting, into a separate calendar
+    started = time.perf_counter()
+    for title, start_time, end_time in meetings:
+        await client.send("POST", base_url + CalendarClient.events_path("per-call"),
+                          json=event_body(title, start_time, end_time))
+    per_call = time.perf_counter() - started
+
+    before = await fake_stats()
+    started = time.perf_counter()
+    await sync.drain()
+    batched = time.perf_counter() - started
+    after = await fake_stats()
+    requests = after["http_requests"] - before["http_requests"]
+
+    print(f"{args.meetings} meetings, {args.latency * 1000:.0f} ms per HTTP request\n")
+    print(f"{'method':>16} {'seconds':>8} {'HTTP requests':>14} {'meetings/s':>11}")
+    print(f"{'one per meeting':>16} {per_call:>8.2f} {args.meetings:>14} {args.meetings / per_call:>11.0f}")
+    print(f"{'outbox, batched':>16} {batched:>8.2f} {requests:>14} {args.meetings / batched:>11.0f}")
+
+    # Lost acknowledgements: forget every event id and queue all inserts again
+    with SessionLocal() as db:
+        ids = [meeting_id for (meeting_id,) in db.query(Meeting.id)]
+        db.execute(update(Meeting).values(calendar_event_id=None))
+        db.add_all([CalendarOutbox(user_id=user_id, meeting_id=meeting_id, operation="create",
+                                   event_id=f"pau{user_id}m{meeting_id}", next_attempt_at=utcnow())
+                    for meeting_id in ids])
+        db.commit()
+    await sync.drain()
+    events = (await fake_stats())["events"] - args.meetings
+    print(f"\nreplayed inserts: {events} events in the synced calendar for {args.meetings} meetings"
+          f"{'' if events == args.meetings else ' (DUPLICATES)'}")
+
+    # Injected failures: every write retried until it lands
+    await fake.post("/faults", json={"error_rate": args.error_rate})
+    with SessionLocal() as db:
+        for meeting in db.query(Meeting):
+            meeting.title += " (moved)"
+        db.commit()
+    retried = sync.retried
+    await sync.drain()
+    await fake.post("/faults", json={"error_rate": 0})
+    with SessionLocal() as db:
+        left = db.query(CalendarOutbox).count()
+    print(f"updates at {args.error_rate:.0%} call failures: {sync.retried - retried} retries, {left} rows left")
+
+    # Pulls: a full one, then only what changed remotely
+    started = time.perf_counter()
+    applied = await sync.pull(user_id, CALENDAR_ID)
+    full = time.perf_counter() - started
+    with SessionLocal() as db:
+        edited = [meeting.calendar_event_id for meeting in db.query(Meeting).limit(args.remote_edits)]
+    for event_id in edited:
+        await fake.patch(CalendarClient.events_path(CALENDAR_ID, event_id), json={"summary": "renamed remotely"})
+    with SessionLocal() as db:
+        sync_token = db.get(CalendarLink, user_id).sync_token
+    calls = client.calls
+    started = time.perf_counter()
+    applied = await sync.pull(user_id, CALENDAR_ID, sync_token)
+    incremental = time.perf_counter() - started
+    print(f"full pull: {full * 1000:.0f} ms; incremental pull after {len(edited)} remote edits: "
+          f"{incremental * 1000:.0f} ms, {client.calls - calls} page(s), {applied} meetings updated")
+
+    await client.close()
+    await fake.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meetings", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server seconds per HTTP request")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--remote-edits", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault("GOOGLE_CALENDAR_ACCESS_TOKEN", "fake")
+    start_fake_calendar(args.latency)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
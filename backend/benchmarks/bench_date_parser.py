@@ -0,0 +1,147 @@
+"""Correctness corpus and micro-benchmark for the meeting date parser.
+
+Checks ``DateParser`` and the ``parse_date_info`` it replaced against the
+expected start time of each corpus expression, then times both. All
+expectations are relative to Friday 2024-12-13 10:30 UTC. Run from the
+backend directory:
+
+    python -m benchmarks.bench_date_parser --iterations 20000
+"""
+import argparse
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from app.services.date_parser import DateParser, DateParseError, plan_expression
+
+NOW = datetime(2024, 12, 13, 10, 30, tzinfo=timezone.utc)
+
+# expression, expected start (naive UTC), expected duration in minutes; None means "should be rejected"
+CORPUS = [
+    ("tomorrow", "2024-12-14 10:30", None),
+    ("tomorrow at 3pm", "2024-12-14 15:00", None),
+    ("tomorrow at 2:30 pm", "2024-12-14 14:30", None),
+    ("tomorrow 09:15", "2024-12-14 09:15", None),
+    ("tomorrow morning", "2024-12-14 09:00", None),
+    ("tmrw at noon", "2024-12-14 12:00", None),
+    ("day after tomorrow", "2024-12-15 10:30", None),
+    ("day after tomorrow at 4pm", "2024-12-15 16:00", None),
+    ("today at 5pm", "2024-12-13 17:00", None),
+    ("tonight", "2024-12-13 20:00", None),
+    ("tonight at 9", "2024-12-13 21:00", None),
+    ("this afternoon", "2024-12-13 14:00", None),
+    ("at 3", "2024-12-13 15:00", None),
+    ("3pm", "2024-12-13 15:00", None),
+    ("at midnight", "2024-12-13 00:00", None),
+    ("monday", "2024-12-16 10:30", None),
+    ("on monday at 10am", "2024-12-16 10:00", None),
+    ("friday at 4pm", "2024-12-13 16:00", None),
+    ("next friday at 4pm", "2024-12-20 16:00", None),
+    ("next tuesday", "2024-12-17 10:30", None),
+    ("this wednesday evening", "2024-12-18 18:00", None),
+    ("next week", "2024-12-20 10:30", None),
+    ("next month", "2025-01-13 10:30", None),
+    ("in 2 hours", "2024-12-13 12:30", None),
+    ("in 30 minutes", "2024-12-13 11:00", None),
+    ("in 3 days", "2024-12-16 10:30", None),
+    ("December 15 at 14:00", "2024-12-15 14:00", None),
+    ("Dec 20th at 9:30am", "2024-12-20 09:30", None),
+    ("15th of january", "2025-01-15 10:30", None),
+    ("January 7, 2025 at 11am", "2025-01-07 11:00", None),
+    ("2025-01-07 9am", "2025-01-07 09:00", None),
+    ("12/20 at noon", "2024-12-20 12:00", None),
+    ("tomorrow at 2pm for 30 minutes", "2024-12-14 14:00", 30),
+    ("monday at 10am for an hour", "2024-12-16 10:00", 60),
+    ("next friday at 1pm for 1.5 hours", "2024-12-20 13:00", 90),
+    ("whenever works", None, None),
+]
+
+def legacy_parse_date_info(date_info: str, now: datetime) -> datetime:
+    """``AIAssistant.parse_date_info`` before the date parser, with ``now`` injectable."""
+    from dateutil import parser
+
+    default = now.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    try:
+        lower_date = date_info.lower()
+        if "tomorrow" in lower_date:
+            base_date = now + timedelta(days=1)
+        elif "day after tomorrow" in lower_date:
+            base_date = now + timedelta(days=2)
+        elif "next" in lower_date:
+            try:
+                base_date = parser.parse(date_info, fuzzy=True, default=default)
+            except Exception:
+                base_date = now + timedelta(weeks=1)
+        else:
+            base_date = parser.parse(date_info, fuzzy=True, default=default)
+
+        if base_date.hour == 0 and base_date.minute == 0:
+            base_date = base_date.replace(hour=now.hour, minute=now.minute)
+        return base_date
+    except Exception:
+        return now + timedelta(days=1)
+
+def wall_clock(value: datetime) -> str:
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M")
+
+def check_corpus(parser: DateParser):
+    new_ok = legacy_ok = 0
+    for expression, expected, duration in CORPUS:
+        try:
+            parsed = parser.parse(expression, NOW)
+            got = wall_clock(parsed.start)
+            got_duration = int(parsed.duration.total_seconds() // 60) if parsed.duration else None
+        except DateParseError:
+            got, got_duration = None, None
+
+        # The old function had no notion of duration or rejection
+        legacy = wall_clock(legacy_parse_date_info(expression, NOW))
+
+        new_pass = got == expected and got_duration == duration
+        legacy_pass = expected is not None and legacy == expected
+        new_ok += new_pass
+        legacy_ok += legacy_pass
+        print(f"{'ok ' if new_pass else 'BAD'} {expression!r:40} expected={expected} new={got}"
+              f"{f' ({got_duration}m)' if got_duration else ''} legacy={legacy}{'' if legacy_pass else ' (wrong)'}")
+
+    print(f"\nnew parser: {new_ok}/{len(CORPUS)} correct, legacy: {legacy_ok}/{len(CORPUS)} correct")
+    return new_ok == len(CORPUS)
+
+def benchmark(parser: DateParser, iterations: int):
+    expressions = [expression for expression, expected, _ in CORPUS if expected is not None]
+
+    def run_legacy():
+        for expression in expressions:
+            legacy_parse_date_info(expression, NOW)
+
+    def run_cold():
+        for expression in expressions:
+            plan_expression.cache_clear()
+            parser.parse(expression, NOW)
+
+    def run_cached():
+        for expression in expressions:
+            parser.parse(expression, NOW)
+
+    calls = iterations // len(expressions) or 1
+    print(f"\n{'variant':>14} {'us/call':>9}")
+    for name, fn in (("legacy", run_legacy), ("new (cold)", run_cold), ("new (cached)", run_cached)):
+        fn()
+        elapsed = timeit.timeit(fn, number=calls, timer=time.perf_counter)
+        print(f"{name:>14} {elapsed / (calls * len(expressions)) * 1e6:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000, help="parses per variant")
+    args = parser.parse_args()
+
+    date_parser = DateParser("UTC")
+    passed = check_corpus(date_parser)
+    benchmark(date_parser, args.iterations)
+    if not passed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
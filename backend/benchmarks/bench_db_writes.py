@@ -0,0 +1,80 @@
+"""Write throughput under concurrent chat actions: default SQLite engine vs. the tuned one.
+
+Each worker thread repeats what an add_task followed by a complete_task chat
+does: insert a task and commit, then look it up, mark it done and commit.
+Run from the backend directory:
+
+    python -m benchmarks.bench_db_writes --threads 1 4 16 --actions 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base, create_db_engine
+from app.models.models import Task
+from app.services.auth_service import AuthService, ANONYMOUS_USER_ID
+
+def legacy_engine(url: str):
+    # What models/base.py used to build
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+def run_actions(Session, actions: int, errors: list):
+    db = Session()
+    try:
+        for i in range(actions):
+            try:
+                task = Task(user_id=ANONYMOUS_USER_ID, title=f"bench task {threading.get_ident()} {i}")
+                db.add(task)
+                db.commit()
+
+                task = db.get(Task, task.id)
+                task.completed = True
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                errors.append(e)
+    finally:
+        db.close()
+
+def measure(build_engine, threads: int, actions: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with Session() as db:
+            AuthService.ensure_anonymous_user(db)
+
+        errors = []
+        workers = [
+            threading.Thread(target=run_actions, args=(Session, actions, errors))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return threads * actions / elapsed, len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--actions", type=int, default=200, help="chat actions per thread")
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'default actions/s':>18} {'errors':>6} {'tuned actions/s':>16} {'errors':>6}")
+    for threads in args.threads:
+        default_rate, default_errors = measure(legacy_engine, threads, args.actions)
+        tuned_rate, tuned_errors = measure(create_db_engine, threads, args.actions)
+        print(f"{threads:>7} {default_rate:>18.1f} {default_errors:>6} {tuned_rate:>16.1f} {tuned_errors:>6}")
+
+if __name__ == "__main__":
+    main()
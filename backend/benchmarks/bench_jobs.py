@@ -0,0 +1,129 @@
+"""Job queue: what the chat request still writes, and what the runner sustains.
+
+First times saving a conversation turn on the request path, written
+through to ``conversations`` as chat used to vs. queued as a job, over
+``--sessions`` sessions that already have history. Then queues ``--jobs``
+jobs of two priorities, each sleeping ``--job-ms`` (an I/O-bound side
+effect), and drains them with ``--concurrency`` runner tasks, reporting
+throughput, queue wait by priority and retries of a flaky handler. Uses a
+throwaway SQLite database. Run from the backend directory:
+
+    python -m benchmarks.bench_jobs --jobs 2000 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+async def run(args):
+    from sqlalchemy import insert
+    from app.migrate import migrate
+    from app.models.base import engine, SessionLocal
+    from app.models.models import Conversation, Job
+    from app.services.conversation_store import ConversationStore
+    from app.services.jobs import JobRunner, job_handler, enqueue, PRIORITY_HIGH, PRIORITY_LOW
+
+    migrate(engine)
+    reply = {"type": "message", "content": "Sure, I can help with that."}
+    with engine.begin() as conn:
+        conn.execute(insert(Conversation), [
+            {"session_id": f"s{i}", "summary": "", "turns": json.dumps([{"user": "hello", "assistant": json.dumps(reply)}] * 4),
+             "version": 4}
+            for i in range(args.sessions)
+        ])
+
+    # Request path: one turn per session, committed like chat does
+    store = ConversationStore()
+    def write_through(db, session_id):
+        state = store.get(db, session_id)
+        state.turns.append({"user": "next", "assistant": json.dumps(reply)})
+        store.compact(state)
+        db.merge(Conversation(session_id=session_id, summary=state.summary, turns=json.dumps(state.turns)))
+
+    timings = {}
+    for name, write in (("write-through", write_through), ("queued job", lambda db, sid: store.append(db, sid, "next", reply))):
+        store.sessions.clear()
+        with SessionLocal() as db:
+            for i in range(args.sessions):
+                store.get(db, f"s{i}")
+            samples = []
+            for i in range(args.sessions):
+                started = time.perf_counter()
+                write(db, f"s{i}")
+                db.commit()
+                samples.append(time.perf_counter() - started)
+        timings[name] = samples
+    with SessionLocal() as db:
+        db.query(Job).delete()
+        db.commit()
+
+    print(f"saving a turn on the request path ({args.sessions} sessions)")
+    for name, samples in timings.items():
+        ordered = sorted(samples)
+        print(f"  {name:>14}: p50 {statistics.median(samples) * 1e6:7.0f} us  p95 {ordered[int(len(ordered) * 0.95)] * 1e6:7.0f} us")
+
+    started_at = {}
+
+    @job_handler("bench.sleep")
+    async def sleep_job(payload: dict):
+        started_at[payload["n"]] = time.perf_counter()
+        await asyncio.sleep(args.job_ms / 1000)
+
+    failures = {}
+
+    @job_handler("bench.flaky", max_attempts=5)
+    def flaky_job(payload: dict):
+        failures[payload["n"]] = failures.get(payload["n"], 0) + 1
+        if failures[payload["n"]] < 3:
+            raise RuntimeError("transient")
+
+    with SessionLocal() as db:
+        for n in range(args.jobs):
+            # Every tenth job is urgent; it is queued last but should start first
+            priority = PRIORITY_HIGH if n % 10 == 0 else PRIORITY_LOW
+            enqueue(db, "bench.sleep", {"n": n}, priority=priority)
+        for n in range(args.flaky):
+            enqueue(db, "bench.flaky", {"n": n})
+        db.commit()
+
+    runner = JobRunner(args.concurrency, poll_interval=0.05, base_delay=0.01, max_delay=0.05)
+    stop = asyncio.Event()
+    queued_at = time.perf_counter()
+    task = asyncio.create_task(runner.run(stop))
+    while len(started_at) < args.jobs or sum(1 for count in failures.values() if count >= 3) < args.flaky:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - queued_at
+    stop.set()
+    await task
+
+    urgent = [started_at[n] - queued_at for n in started_at if n % 10 == 0]
+    normal = [started_at[n] - queued_at for n in started_at if n % 10]
+    ideal = args.jobs * args.job_ms / 1000 / args.concurrency
+    print(f"\n{args.jobs} jobs of {args.job_ms} ms on {args.concurrency} tasks: {elapsed:.2f}s "
+          f"({args.jobs / elapsed:.0f} jobs/s, ideal {ideal:.2f}s)")
+    print(f"  start after queueing: urgent p50 {statistics.median(urgent):.2f}s, normal p50 {statistics.median(normal):.2f}s")
+    stats = runner.stats()
+    print(f"  flaky jobs: {args.flaky} succeeded on their 3rd attempt, {stats['retried']} retries, {stats['failed']} failed")
+    print(f"  runner: {stats}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--job-ms", type=float, default=5)
+    parser.add_argument("--flaky", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    # The flaky handler's expected retries would drown the results
+    logging.getLogger("app.services.jobs").setLevel(logging.ERROR)
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
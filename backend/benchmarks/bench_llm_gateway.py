@@ -0,0 +1,107 @@
+"""LLM gateway behaviour against a stub LLM server with injected faults.
+
+Each scenario sends the same requests through ``classify_async`` twice: once
+with a single-attempt gateway (no retries, hedging or breaker, as the chat
+path used to call the client) and once with the configured gateway. Run from
+the backend directory:
+
+    python -m benchmarks.bench_llm_gateway --requests 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from benchmarks.load_chat import PORT, start_stub_server
+
+MESSAGE = "what can you do for my task list"
+
+SCENARIOS = [
+    # name, stub faults
+    ("healthy", {"latency": 0.05, "error_rate": 0.0, "slow_rate": 0.0}),
+    ("30% errors", {"latency": 0.05, "error_rate": 0.3, "slow_rate": 0.0}),
+    ("5% slow (1s)", {"latency": 0.05, "error_rate": 0.0, "slow_rate": 0.05, "slow_latency": 1.0}),
+    ("outage", {"latency": 0.05, "error_rate": 1.0, "slow_rate": 0.0}),
+]
+
+def gateway_settings(resilient: bool):
+    from config.settings import settings
+
+    overrides = {} if resilient else {
+        "LLM_MAX_RETRIES": 0,
+        "LLM_HEDGE": False,
+        "LLM_BREAKER_THRESHOLD": 10 ** 9,
+    }
+    names = [name for name in dir(settings) if name.startswith("LLM_")]
+    return SimpleNamespace(**dict({name: getattr(settings, name) for name in names}, **overrides))
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_scenario(assistant, client, faults: dict, resilient: bool, total: int, concurrency: int) -> dict:
+    from app.services.llm_gateway import LLMGateway, MIN_LATENCY_SAMPLES
+
+    # Fill the latency window while healthy so hedging is armed from the start
+    assistant.llm_gateway = gateway = LLMGateway(assistant.client, assistant.async_client, gateway_settings(resilient))
+    await client.post(f"http://127.0.0.1:{PORT}/faults", json=SCENARIOS[0][1])
+    for _ in range(MIN_LATENCY_SAMPLES):
+        await assistant.classify_async(MESSAGE)
+    gateway.counts = dict.fromkeys(gateway.counts, 0)
+    await client.post(f"http://127.0.0.1:{PORT}/faults", json=faults)
+
+    fallback = assistant.fallback_reply(MESSAGE)["content"]
+    limiter = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {"ok": 0, "degraded": 0, "error": 0}
+
+    async def one():
+        async with limiter:
+            started = time.perf_counter()
+            reply = await assistant.classify_async(MESSAGE)
+            latencies.append(time.perf_counter() - started)
+            if reply["content"] == fallback:
+                outcomes["degraded"] += 1
+            elif reply["content"].startswith("Sorry"):
+                outcomes["error"] += 1
+            else:
+                outcomes["ok"] += 1
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return dict(outcomes, p50=percentile(latencies, 0.5), p99=percentile(latencies, 0.99),
+                stats=assistant.llm_gateway.stats())
+
+async def run(args):
+    from app.services.ai_service import AIAssistant
+
+    assistant = AIAssistant()
+    # Replies must come from the model, not the cache
+    assistant.response_cache = SimpleNamespace(get=lambda *a: None, set=lambda *a: None)
+
+    print(f"{'scenario':>14} {'gateway':>10} {'ok':>5} {'degraded':>8} {'error':>5} {'p50 ms':>8} {'p99 ms':>8}  gateway stats")
+    async with httpx.AsyncClient() as client:
+        for name, faults in SCENARIOS:
+            for resilient in (False, True):
+                result = await run_scenario(assistant, client, faults, resilient, args.requests, args.concurrency)
+                stats = {key: value for key, value in result["stats"].items() if key != "requests"}
+                print(f"{name:>14} {'resilient' if resilient else 'single':>10} {result['ok']:>5} {result['degraded']:>8} "
+                      f"{result['error']:>5} {result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f}  {stats}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Hedging is opt-in for the app; the benchmark shows what it buys
+    os.environ.setdefault("LLM_HEDGE", "true")
+    os.environ.setdefault("LLM_HEDGE_MIN_DELAY", "0.2")
+    start_stub_server(0.05)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Per-row cost of the list read path: loading rows and turning them into
+response bytes.
+
+Seeds ``--rows`` tasks and meetings for one user in a throwaway SQLite
+database and reads them all back three ways:
+
+- orm: Task/Meeting entities, ``to_dict``, then ``jsonable_encoder`` and
+  ``json.dumps``, as the endpoints used to (FastAPI with no response model)
+- pydantic: projected rows validated and dumped by the page model, as
+  FastAPI does when an endpoint declares ``response_model``
+- orjson: projected rows as dicts serialized by orjson (``json_response``)
+
+CPU is the best of ``--repeat`` runs; allocations are tracemalloc's peak
+over one run. Run from the backend directory:
+
+    python -m benchmarks.bench_read_path --rows 20000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.process_time()
+        body = fn()
+        best = min(best, time.process_time() - started)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, body
+
+def run(args):
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+    from app.migrate import migrate
+    from app.models.base import engine, SessionLocal
+    from app.models.models import Task, Meeting
+    from app.services.auth_service import ANONYMOUS_USER_ID
+    from app.services.task_service import TaskService
+    from app.services.meeting_service import MeetingService
+    from app.services.projections import TASK_ROW, MEETING_ROW, TaskPage, MeetingPage, dumps
+
+    migrate(engine)
+    start = datetime(2030, 1, 7, 9, 0, 0, 123456)
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [
+            {"user_id": ANONYMOUS_USER_ID, "title": f"task number {i}", "completed": i % 3 == 0,
+             "created_at": start + timedelta(minutes=i)}
+            for i in range(args.rows)
+        ])
+        conn.execute(insert(Meeting), [
+            {"user_id": ANONYMOUS_USER_ID, "title": f"meeting number {i}",
+             "start_time": start + timedelta(hours=i), "end_time": start + timedelta(hours=i, minutes=30)}
+            for i in range(args.rows)
+        ])
+
+    def legacy_json(content) -> bytes:
+        # Starlette's JSONResponse.render after FastAPI's serialize_response
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode()
+
+    cases = []
+    for name, model, to_dict, projection, page in (
+        ("tasks", Task, TaskService.to_dict, TASK_ROW, TypeAdapter(TaskPage)),
+        ("meetings", Meeting, MeetingService.to_dict, MEETING_ROW, TypeAdapter(MeetingPage)),
+    ):
+        def entities(model=model):
+            with SessionLocal() as db:
+                return db.query(model).filter(model.user_id == ANONYMOUS_USER_ID).order_by(model.id).all()
+
+        def rows(model=model, projection=projection):
+            with SessionLocal() as db:
+                return projection.query(db).filter(model.user_id == ANONYMOUS_USER_ID).order_by(model.id).all()
+
+        cases.append((name, {
+            "orm": lambda entities=entities, to_dict=to_dict, name=name: legacy_json(
+                {name: [to_dict(entity) for entity in entities()], "next_cursor": None, "version": 1}),
+            "pydantic": lambda rows=rows, projection=projection, page=page, name=name: page.dump_json(
+                page.validate_python({name: projection.dicts(rows()), "next_cursor": None, "version": 1})),
+            "orjson": lambda rows=rows, projection=projection, name=name: dumps(
+                {name: projection.dicts(rows()), "next_cursor": None, "version": 1}),
+        }))
+
+    print(f"{args.rows} rows per list, CPU best of {args.repeat}\n")
+    print(f"{'list':>9} {'path':>9} {'total ms':>9} {'us/row':>7} {'peak MB':>8} {'bytes/row':>10} {'vs orm':>7}")
+    for name, paths in cases:
+        bodies = {}
+        baseline = None
+        for path, fn in paths.items():
+            cpu, peak, body = measure(fn, args.repeat)
+            bodies[path] = json.loads(body)
+            baseline = baseline or cpu
+            print(f"{name:>9} {path:>9} {cpu * 1000:>9.1f} {cpu / args.rows * 1e6:>7.2f} "
+                  f"{peak / 2 ** 20:>8.1f} {peak / args.rows:>10.0f} {baseline / cpu:>6.1f}x")
+        same = all(body == bodies["orm"] for body in bodies.values())
+        print(f"{'':>9} identical JSON: {same}")
+
+    # Serialization alone, on rows already in memory
+    with SessionLocal() as db:
+        rows = TASK_ROW.query(db).order_by(Task.id).all()
+        entities = db.query(Task).order_by(Task.id).all()
+        content = {"tasks": TASK_ROW.dicts(rows), "next_cursor": None, "version": 1}
+        page = TypeAdapter(TaskPage)
+        encoders = (
+            ("jsonable_encoder", lambda: legacy_json({"tasks": [TaskService.to_dict(task) for task in entities]})),
+            ("pydantic", lambda: page.dump_json(page.validate_python(content))),
+            ("orjson", lambda: dumps(content)),
+        )
+        print("\nserializing tasks already loaded:")
+        for name, fn in encoders:
+            cpu, _, _ = measure(fn, args.repeat)
+            print(f"  {name:>16}: {cpu / args.rows * 1e6:.2f} us/row")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    run(args)
+
+if __name__ == "__main__":
+    main()
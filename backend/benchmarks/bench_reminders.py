@@ -0,0 +1,215 @@
+"""Reminder scheduler: heap operation cost by size, window loads, timer
+accuracy and CPU use while idle.
+
+Seeds ``--reminders`` pending task and meeting reminders over the next 30
+days in a throwaway SQLite database, then
+
+- times reschedules and cancellations on ``TimerHeap`` at growing sizes
+- times the scheduler's start-up window load
+- sets ``--fire`` task due times over the next ``--span`` seconds through
+  the ORM, so they reach the heap by the after-commit hook, and reports
+  how late they reach the sink, with and without the change log replay
+  that precedes each firing
+- measures process CPU over ``--idle`` seconds with the scheduler armed
+  vs. polling the tables once a second
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_reminders --reminders 300000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+def heap_costs(sizes, operations: int):
+    from app.services.reminders import Reminder, TimerHeap
+
+    now = datetime(2030, 1, 1)
+    print(f"{'heap size':>10} {'reschedule us':>14} {'cancel+add us':>14} {'pop us':>8} {'entries/live':>13}")
+    for size in sizes:
+        heap = TimerHeap()
+        for i in range(size):
+            heap.push(random.random() * 1e6, Reminder("task", i, 1, "t", now, now))
+        ids = [random.randrange(size) for _ in range(operations)]
+
+        started = time.perf_counter()
+        for i in ids:
+            heap.push(random.random() * 1e6, Reminder("task", i, 1, "t", now, now))
+        reschedule = (time.perf_counter() - started) / operations
+
+        started = time.perf_counter()
+        for i in ids:
+            heap.discard(("task", i))
+            heap.push(random.random() * 1e6, Reminder("task", i, 1, "t", now, now))
+        replace = (time.perf_counter() - started) / operations
+
+        cutoff = sorted(due for due, _, _ in heap.live.values())[min(operations, size // 2)]
+        started = time.perf_counter()
+        popped = heap.pop_due(cutoff)
+        pop = (time.perf_counter() - started) / len(popped)
+        print(f"{size:>10} {reschedule * 1e6:>14.2f} {replace * 1e6:>14.2f} {pop * 1e6:>8.2f} "
+              f"{len(heap.heap) / len(heap):>13.2f}")
+
+class RecordingSink:
+    def __init__(self):
+        self.delivered = []
+
+    async def deliver(self, reminders: list):
+        now = time.time()
+        self.delivered.extend((now, reminder) for reminder in reminders)
+
+async def accuracy(args, catch_up_interval: float):
+    from sqlalchemy import update
+    from app.models.base import SessionLocal
+    from app.models.models import Task
+    from app.services.reminders import ReminderScheduler
+
+    sink = RecordingSink()
+    scheduler = ReminderScheduler(sink, window=3600, catch_up_interval=catch_up_interval)
+    stop = asyncio.Event()
+    task = asyncio.create_task(scheduler.run(stop))
+    while scheduler.horizon is None:
+        await asyncio.sleep(0.01)
+
+    # Fresh tasks, so earlier rounds' firings don't count
+    base = time.time() + 0.5
+    due = {}
+    with SessionLocal() as db:
+        rows = db.query(Task).filter(Task.due_at.is_(None)).limit(args.fire).all()
+        for task_row in rows:
+            at = base + random.random() * args.span
+            task_row.due_at = scheduler.db_time(at)
+            due[task_row.id] = at
+        db.commit()
+    await asyncio.sleep(args.span + 1)
+    stop.set()
+    await task
+
+    with SessionLocal() as db:
+        db.execute(update(Task).where(Task.id.in_(list(due))).values(due_at=None))
+        db.commit()
+    late = sorted(delivered - due[reminder.id] for delivered, reminder in sink.delivered if reminder.id in due)
+    missed = len(due) - len(late)
+    print(f"  catch-up {'every ' + str(catch_up_interval) + ' s' if catch_up_interval else 'off'}: "
+          f"{len(late)} fired, {missed} missed; lateness p50 {statistics.median(late) * 1000:.1f} ms, "
+          f"p95 {late[int(len(late) * 0.95)] * 1000:.1f} ms, p99 {late[int(len(late) * 0.99)] * 1000:.1f} ms, "
+          f"max {late[-1] * 1000:.1f} ms")
+
+async def idle_cpu(args):
+    from app.models.base import SessionLocal
+    from app.models.models import Task, Meeting
+    from app.services.reminders import ReminderScheduler
+
+    scheduler = ReminderScheduler(RecordingSink(), window=3600, catch_up_interval=60)
+    passes = 0
+    take_due = scheduler.take_due
+
+    def counted(now):
+        nonlocal passes
+        passes += 1
+        return take_due(now)
+
+    scheduler.take_due = counted
+    stop = asyncio.Event()
+    task = asyncio.create_task(scheduler.run(stop))
+    while scheduler.horizon is None:
+        await asyncio.sleep(0.01)
+    passes = 0
+    started = time.process_time()
+    await asyncio.sleep(args.idle)
+    armed = time.process_time() - started
+    stats = scheduler.stats()
+    stop.set()
+    await task
+
+    def poll():
+        # What a naive implementation does: look for due rows every second
+        now = scheduler.db_time(time.time())
+        with SessionLocal() as db:
+            db.query(Task.id).filter(Task.due_at <= now, Task.completed.is_not(True)).all()
+            db.query(Meeting.id).filter(Meeting.remind_at <= now).all()
+
+    started = time.process_time()
+    deadline = time.time() + args.idle
+    polls = 0
+    while time.time() < deadline:
+        await asyncio.to_thread(poll)
+        polls += 1
+        await asyncio.sleep(1)
+    polling = time.process_time() - started
+
+    print(f"\nidle for {args.idle:.0f} s with {stats['pending']} reminders in the heap "
+          f"(next in {stats['next_due_in']:.0f} s):")
+    print(f"  heap scheduler: {armed * 1000:.1f} ms CPU, {passes} wakeups")
+    print(f"  polling every second: {polling * 1000:.1f} ms CPU, {polls} queries")
+
+async def run(args):
+    from sqlalchemy import insert
+    from app.migrate import migrate
+    from app.models.base import engine
+    from app.models.models import Task, Meeting
+    from app.services.auth_service import ANONYMOUS_USER_ID
+    from app.services.change_tracker import track_changes
+    from config.settings import settings
+    from app.services.reminders import ReminderScheduler, track_reminders
+
+    migrate(engine)
+    track_changes()
+    track_reminders()
+
+    # Naive times are wall-clock in settings.TIMEZONE, as the scheduler reads them
+    now = datetime.now(ZoneInfo(settings.TIMEZONE)).replace(tzinfo=None, microsecond=0)
+    month = 30 * 24 * 3600
+    # Nothing due in the first 10 minutes, so the accuracy runs only see their own
+    offsets = [600 + random.random() * month for _ in range(args.reminders)]
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        half = args.reminders // 2
+        conn.execute(insert(Task), [
+            {"user_id": ANONYMOUS_USER_ID, "title": f"task {i}", "completed": False,
+             "due_at": now + timedelta(seconds=offsets[i])}
+            for i in range(half)
+        ] + [{"user_id": ANONYMOUS_USER_ID, "title": f"spare {i}", "completed": False, "due_at": None} for i in range(args.fire)])
+        conn.execute(insert(Meeting), [
+            {"user_id": ANONYMOUS_USER_ID, "title": f"meeting {i}", "reminder_minutes": 10,
+             "start_time": now + timedelta(seconds=offsets[i] + 600),
+             "end_time": now + timedelta(seconds=offsets[i] + 2400),
+             "remind_at": now + timedelta(seconds=offsets[i])}
+            for i in range(half, args.reminders)
+        ])
+    print(f"seeded {args.reminders} reminders over 30 days in {time.perf_counter() - started:.1f}s\n")
+
+    heap_costs((10_000, 100_000, 1_000_000), args.operations)
+
+    for window in (3600, 24 * 3600):
+        scheduler = ReminderScheduler(RecordingSink(), window=window)
+        started = time.perf_counter()
+        scheduler.start()
+        print(f"\n{window // 3600:>3} h window: loaded {len(scheduler.timers)} reminders in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms", end="")
+    print(f"\n\n{args.fire} due times set over {args.span:.0f} s through the ORM:")
+    await accuracy(args, catch_up_interval=0)
+    await accuracy(args, catch_up_interval=60)
+    await idle_cpu(args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=300_000)
+    parser.add_argument("--operations", type=int, default=20_000)
+    parser.add_argument("--fire", type=int, default=1000)
+    parser.add_argument("--span", type=float, default=5)
+    parser.add_argument("--idle", type=float, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Task title lookup latency: ILIKE '%...%' scan vs. the FTS5 trigram index.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_search --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base
+from app.models.models import Task, User
+from app.services.auth_service import ANONYMOUS_USER_ID, ANONYMOUS_EMAIL
+from app.services.search_service import SearchService, create_search_indexes
+
+WORDS = (
+    "review draft send call email update report budget plan design deploy fix "
+    "invoice client meeting notes slides roadmap hiring onboarding backlog test "
+    "release audit contract proposal research summary feedback migration"
+).split()
+
+def random_title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 6))) + f" #{rng.randint(0, 10**9)}"
+
+def seed(engine, rows: int, rng: random.Random) -> list:
+    titles = [random_title(rng) for _ in range(rows)]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": ANONYMOUS_USER_ID, "email": ANONYMOUS_EMAIL}])
+        for start in range(0, rows, 10000):
+            conn.execute(insert(Task), [
+                {"user_id": ANONYMOUS_USER_ID, "title": title} for title in titles[start:start + 10000]
+            ])
+    return titles
+
+def time_lookups(lookup, needles) -> float:
+    timings = []
+    for needle in needles:
+        started = time.perf_counter()
+        lookup(needle)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def run(rows: int, lookups: int):
+    rng = random.Random(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        create_search_indexes(engine)
+        titles = seed(engine, rows, rng)
+        db = sessionmaker(bind=engine)()
+
+        # Needles are the unique suffix of an existing title, like a user typing part of it
+        needles = [rng.choice(titles).split("#")[1] for _ in range(lookups)]
+
+        ilike_ms = time_lookups(
+            lambda needle: db.query(Task).filter(Task.title.ilike(f"%{needle}%")).first(), needles
+        )
+        fts_ms = time_lookups(lambda needle: SearchService.find_task(db, needle, ANONYMOUS_USER_ID), needles)
+
+        db.close()
+        engine.dispose()
+
+    print(f"{rows:>9} {ilike_ms:>12.3f} {fts_ms:>12.3f} {ilike_ms / fts_ms:>8.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'ilike p50 ms':>12} {'fts p50 ms':>12} {'speedup':>9}")
+    for rows in args.rows:
+        run(rows, args.lookups)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Cold-start time and memory of the API process.
+
+``import`` times ``import app.main`` in fresh interpreters, as-is and with
+the assistant built straight away (what every import paid before it was
+lazy), and reports each one's RSS. ``serve`` runs the migration once, then
+boots ``--workers`` uvicorn workers (and gunicorn with uvicorn workers,
+when installed) with ``AUTO_MIGRATE=false`` and reports time until
+``/api/health`` answers and the RSS summed over the process tree. Both use
+the stub LLM backend and a throwaway SQLite database. Run from the backend
+directory:
+
+    python -m benchmarks.bench_startup import --runs 5
+    python -m benchmarks.bench_startup serve --workers 4
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PORT = 8103
+
+IMPORT_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app.main
+if sys.argv[1] == "eager":
+    from app.services.ai_service import get_ai_assistant
+    get_ai_assistant()
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "openai": "openai" in sys.modules,
+    "google": "googleapiclient" in sys.modules,
+}))
+"""
+
+def bench_env(database_url: str, **extra) -> dict:
+    return dict(os.environ, DATABASE_URL=database_url, LLM_BACKEND="stub", **extra)
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def process_tree(root: int) -> list:
+    """``root`` and its descendants (Linux only)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after its ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, ()))
+    return tree
+
+def run_import(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = bench_env(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        print(f"{'variant':>8} {'p50 s':>7} {'min s':>7} {'rss MB':>7}  heavy modules loaded")
+        for variant in ("lazy", "eager"):
+            samples = []
+            for _ in range(args.runs):
+                output = subprocess.run(
+                    [sys.executable, "-c", IMPORT_PROBE, variant],
+                    env=env, capture_output=True, text=True, check=True
+                ).stdout
+                samples.append(json.loads(output.strip().splitlines()[-1]))
+            loaded = [name for name in ("openai", "google") if samples[-1][name]] or ["none"]
+            print(f"{variant:>8} {statistics.median(s['seconds'] for s in samples):>7.3f} "
+                  f"{min(s['seconds'] for s in samples):>7.3f} "
+                  f"{statistics.median(s['rss_mb'] for s in samples):>7.1f}  {', '.join(loaded)}")
+
+def serve(name: str, command: list, env: dict, workers: int, settle: float) -> dict:
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = None
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and ready is None:
+            if server.poll() is not None:
+                raise RuntimeError(f"{name} exited with code {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{PORT}/api/health").status_code == 200:
+                    ready = time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.05)
+        if ready is None:
+            raise RuntimeError(f"{name} did not start within 60s")
+
+        # Let the remaining workers finish booting before measuring
+        time.sleep(settle)
+        tree = process_tree(server.pid)
+        return {
+            "server": name,
+            "workers": workers,
+            "ready_s": ready,
+            "processes": len(tree),
+            "rss_mb": sum(rss_mb(pid) for pid in tree),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def run_serve(args):
+    from app.migrate import migrate
+    from app.models.base import create_db_engine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(database_url)
+        migrate(engine)
+        engine.dispose()
+        env = bench_env(database_url, AUTO_MIGRATE="false")
+
+        results = []
+        for workers in sorted({1, args.workers}):
+            results.append(serve("uvicorn", [
+                sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT),
+                "--workers", str(workers), "--log-level", "warning"
+            ], env, workers, args.settle))
+            if importlib.util.find_spec("gunicorn"):
+                results.append(serve("gunicorn", [
+                    sys.executable, "-m", "gunicorn", "app.main:app", "-k", "uvicorn.workers.UvicornWorker",
+                    "-w", str(workers), "-b", f"127.0.0.1:{PORT}", "--log-level", "warning"
+                ], env, workers, args.settle))
+
+    print(f"{'server':>9} {'workers':>7} {'ready s':>8} {'procs':>6} {'rss MB':>8} {'MB/worker':>10}")
+    for r in results:
+        print(f"{r['server']:>9} {r['workers']:>7} {r['ready_s']:>8.2f} {r['processes']:>6} "
+              f"{r['rss_mb']:>8.1f} {r['rss_mb'] / r['workers']:>10.1f}")
+    if not importlib.util.find_spec("gunicorn"):
+        print("\ngunicorn is not installed; skipped")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    imports = commands.add_parser("import")
+    imports.add_argument("--runs", type=int, default=5)
+    servers = commands.add_parser("serve")
+    servers.add_argument("--workers", type=int, default=4)
+    servers.add_argument("--settle", type=float, default=2.0, help="seconds to wait for all workers before measuring")
+    args = parser.parse_args()
+    run_import(args) if args.command == "import" else run_serve(args)
+
+if __name__ == "__main__":
+    main()
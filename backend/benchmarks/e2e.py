@@ -0,0 +1,284 @@
+"""End-to-end benchmark of the chat and listing endpoints.
+
+``run`` seeds a throwaway SQLite database, boots ``app.main:app`` under
+uvicorn in a subprocess with the stub LLM backend, drives each endpoint at
+fixed concurrency levels and writes p50/p95/p99 latency, RPS and the
+server's peak RSS as JSON. ``compare`` reads two such reports and flags
+regressions beyond a threshold, exiting non-zero if there are any. The load
+generator shares the machine with the server, so compare runs from the same
+otherwise idle host. Run from the backend directory:
+
+    python -m benchmarks.e2e run --tasks 10000 --meetings 2000 --output base.json
+    python -m benchmarks.e2e run --tasks 10000 --meetings 2000 --output new.json
+    python -m benchmarks.e2e compare base.json new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+PORT = 8102
+BATCH_SIZE = 5000
+
+# Chat traffic mix: routed commands, model-classified writes and model replies.
+# ``{i}`` keeps every message distinct so the response cache doesn't answer them.
+CHAT_MESSAGES = [
+    "add task benchmark item {i}",
+    "could you please add task follow up on ticket {i}",
+    "what should I do about my task list today {i}",
+    "remove task benchmark item {i}",
+]
+
+ENDPOINTS = {
+    "chat": lambda i: ("POST", "/api/chat", {"json": {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)].format(i=i)}}),
+    "tasks": lambda i: ("GET", "/api/tasks", {"params": {"limit": 100}}),
+    "meetings": lambda i: ("GET", "/api/meetings", {"params": {"limit": 100}}),
+}
+
+# Metrics compared between runs, and whether bigger is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "rps": True,
+}
+
+def seed_database(url: str, tasks: int, meetings: int, users: int):
+    """Spreads the rows round-robin over ``users`` users; the benchmark's
+    anonymous requests act as user 1 and see only their share."""
+    from sqlalchemy import insert
+    from app.models.base import Base, create_db_engine
+    from app.models.models import Task, Meeting, User
+    from app.services.auth_service import ANONYMOUS_USER_ID, ANONYMOUS_EMAIL
+
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": ANONYMOUS_USER_ID, "email": ANONYMOUS_EMAIL}] + [
+            {"id": user_id, "email": f"user{user_id}@example.com"} for user_id in range(2, users + 1)
+        ])
+        for offset in range(0, tasks, BATCH_SIZE):
+            conn.execute(insert(Task), [
+                {
+                    "user_id": i % users + 1,
+                    "title": f"seeded task {i}",
+                    "completed": i % 3 == 0,
+                    "created_at": start + timedelta(minutes=i)
+                }
+                for i in range(offset, min(offset + BATCH_SIZE, tasks))
+            ])
+        for offset in range(0, meetings, BATCH_SIZE):
+            conn.execute(insert(Meeting), [
+                {
+                    "user_id": i % users + 1,
+                    "title": f"seeded meeting {i}",
+                    "start_time": start + timedelta(hours=i),
+                    "end_time": start + timedelta(hours=i, minutes=30)
+                }
+                for i in range(offset, min(offset + BATCH_SIZE, meetings))
+            ])
+    engine.dispose()
+
+def peak_rss_mb(pid: int):
+    """High-water resident set size of ``pid`` (Linux only, else ``None``)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def start_server(database_url: str, llm_latency: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        LLM_BACKEND="stub",
+        LLM_STUB_LATENCY=str(llm_latency),
+        RESPONSE_CACHE_BACKEND="memory",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/api/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Server did not start within 60s")
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def drive(client: httpx.AsyncClient, endpoint: str, concurrency: int, total: int, counter) -> dict:
+    build_request = ENDPOINTS[endpoint]
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, path, options = build_request(next(counter))
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **options)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rps": round(total / elapsed, 1),
+    }
+
+async def run_load(args, server: subprocess.Popen) -> dict:
+    results = {}
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        for endpoint in args.endpoints:
+            await drive(client, endpoint, 1, args.warmup, counter)
+            results[endpoint] = {}
+            for concurrency in args.concurrency:
+                rounds = [await drive(client, endpoint, concurrency, args.requests, counter) for _ in range(args.repeat)]
+                # Per-metric median across rounds damps one-off stalls on a busy machine
+                results[endpoint][str(concurrency)] = {
+                    metric: statistics.median(round_[metric] for round_ in rounds) for metric in rounds[0]
+                }
+                print(f"{endpoint} c={concurrency}: {results[endpoint][str(concurrency)]}", file=sys.stderr)
+            results[endpoint]["peak_rss_mb"] = peak_rss_mb(server.pid)
+    return results
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(database_url, args.tasks, args.meetings, args.users)
+
+        server = start_server(database_url, args.llm_latency)
+        try:
+            results = asyncio.run(run_load(args, server))
+            peak_rss = peak_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "config": {
+            "tasks": args.tasks,
+            "meetings": args.meetings,
+            "users": args.users,
+            "requests": args.requests,
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "python": platform.python_version(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+def relative_change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = []
+    print(f"{'endpoint':>9} {'conc':>5} {'metric':>7} {'base':>10} {'new':>10} {'change':>8}")
+    for endpoint, levels in new["results"].items():
+        for level, metrics in levels.items():
+            before_metrics = base["results"].get(endpoint, {}).get(level)
+            if not isinstance(metrics, dict) or not before_metrics:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                before, after = before_metrics[metric], metrics[metric]
+                change = relative_change(before, after)
+                regressed = -change > args.threshold if higher_is_better else change > args.threshold
+                flag = "  REGRESSION" if regressed else ""
+                print(f"{endpoint:>9} {level:>5} {metric:>7} {before:>10} {after:>10} {change:>+8.1%}{flag}")
+                if regressed:
+                    regressions.append(f"{endpoint} c={level} {metric}")
+
+    before, after = base.get("peak_rss_mb"), new.get("peak_rss_mb")
+    if before and after:
+        change = relative_change(before, after)
+        regressed = change > args.threshold
+        print(f"{'server':>9} {'':>5} {'rss_mb':>7} {before:>10} {after:>10} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append("peak_rss_mb")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        raise SystemExit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark the app and write a JSON report")
+    run_parser.add_argument("--tasks", type=int, default=10000, help="seeded tasks")
+    run_parser.add_argument("--meetings", type=int, default=2000, help="seeded meetings")
+    run_parser.add_argument("--users", type=int, default=1, help="users the seeded rows are spread over")
+    run_parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and concurrency level")
+    run_parser.add_argument("--repeat", type=int, default=3, help="rounds per level; the median of each metric is reported")
+    run_parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    run_parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    run_parser.add_argument("--llm-latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    run_parser.add_argument("--output", help="report path (default: stdout)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
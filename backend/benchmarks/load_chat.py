@@ -0,0 +1,79 @@
+"""Load test for the chat LLM path against a local stub LLM server.
+
+Compares the blocking ``process_message`` call (as the chat handler used to
+do it) with ``process_message_async`` at increasing concurrency levels.
+Run from the backend directory:
+
+    python -m benchmarks.load_chat --latency 0.1 --requests 64
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+PORT = 8101
+MESSAGE = "what can you do for my task list"
+
+def start_stub_server(latency: float, reply: dict = None, **faults):
+    import uvicorn
+    from devtools.stub_llm_server import create_app
+
+    config = uvicorn.Config(create_app(latency, reply, **faults), host="127.0.0.1", port=PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def run_level(assistant, concurrency: int, total: int, use_async: bool) -> float:
+    from app.models.base import SessionLocal, AsyncSessionLocal
+    from app.services.auth_service import ANONYMOUS_USER_ID
+
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(MESSAGE)
+
+    async def worker():
+        while not queue.empty():
+            message = queue.get_nowait()
+            if use_async:
+                async with AsyncSessionLocal() as db:
+                    await assistant.process_message_async(message, db, ANONYMOUS_USER_ID)
+            else:
+                with SessionLocal() as db:
+                    assistant.process_message(message, db, ANONYMOUS_USER_ID)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+async def run(args):
+    from app.services.ai_service import AIAssistant
+
+    assistant = AIAssistant()
+    # Warm up connection pools
+    await run_level(assistant, 1, 1, use_async=True)
+    await run_level(assistant, 1, 1, use_async=False)
+
+    print(f"{'concurrency':>11} {'sync rps':>10} {'async rps':>10}")
+    for concurrency in args.concurrency:
+        sync_rps = await run_level(assistant, concurrency, args.requests, use_async=False)
+        async_rps = await run_level(assistant, concurrency, args.requests, use_async=True)
+        print(f"{concurrency:>11} {sync_rps:>10.1f} {async_rps:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    start_stub_server(args.latency)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
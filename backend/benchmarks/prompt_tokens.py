@@ -0,0 +1,115 @@
+"""Offline prompt-token comparison between system prompt versions.
+
+Drives ``AIAssistant.process_message`` against a fake OpenAI client that
+returns scripted replies and reports usage estimated from the request it
+was sent. Prints the prompt tokens per request for each version and checks
+that every scripted reply still parses into the same action. Run from the
+backend directory:
+
+    python -m benchmarks.prompt_tokens
+"""
+import argparse
+import json
+import os
+from types import SimpleNamespace
+
+# Scripted model replies, keyed on a message the intent router does not catch
+SCRIPT = {
+    "i need to remember to buy milk later": {"type": "action", "content": {"action": "add_task", "task": "Buy milk"}},
+    "can you put a call with sarah on my calendar tomorrow at 3pm": {
+        "type": "action",
+        "content": {"action": "schedule_meeting", "meeting": {"title": "Meeting with Sarah", "date_info": "tomorrow at 3pm"}}
+    },
+    "whats a good way to plan my meeting agenda": {"type": "message", "content": "List the decisions you need first."},
+}
+
+class FakeCompletions:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **kwargs):
+        from app.services.token_usage import estimate_tokens
+
+        self.requests.append(kwargs)
+        user_message = kwargs["messages"][-1]["content"]
+        content = json.dumps(SCRIPT[user_message])
+        usage = SimpleNamespace(
+            prompt_tokens=sum(estimate_tokens(message["content"]) for message in kwargs["messages"]),
+            completion_tokens=estimate_tokens(content),
+            prompt_tokens_details=None
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage
+        )
+
+def build_assistant(version: str):
+    from app.services.ai_service import AIAssistant
+    from app.services.prompts import SYSTEM_PROMPTS
+
+    assistant = AIAssistant()
+    assistant.prompt_version = version
+    assistant.system_prompt = SYSTEM_PROMPTS[version]
+    completions = FakeCompletions()
+    assistant.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return assistant, completions
+
+def run_version(version: str, rounds: int):
+    from app.services.auth_service import ANONYMOUS_USER_ID
+
+    assistant, completions = build_assistant(version)
+    responses = {}
+    for _ in range(rounds):
+        for message in SCRIPT:
+            # The response cache would answer repeats without a completion
+            assistant.response_cache = SimpleNamespace(get=lambda *args: None, set=lambda *args: None)
+            responses[message] = assistant.process_message(message, None, ANONYMOUS_USER_ID)
+
+    stats = assistant.token_usage.stats()["by_prompt_version"][version]
+    return stats, responses, completions.requests
+
+def check_responses(responses: dict) -> list:
+    failures = []
+    for message, expected in SCRIPT.items():
+        response = responses[message]
+        if response["type"] != expected["type"]:
+            failures.append(f"{message!r}: expected {expected['type']}, got {response}")
+        elif expected["type"] == "action" and response["content"]["action"] != expected["content"]["action"]:
+            failures.append(f"{message!r}: expected {expected['content']['action']}, got {response}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--versions", nargs="+", default=["1", "2"])
+    parser.add_argument("--rounds", type=int, default=10, help="passes over the scripted messages")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    print(f"{'version':>7} {'prompt tok/req':>14} {'completion tok/req':>18} {'json mode':>9} {'parse':>6}")
+    baseline = None
+    failed = False
+    for version in args.versions:
+        stats, responses, requests = run_version(version, args.rounds)
+        failures = check_responses(responses)
+        failed = failed or bool(failures)
+
+        prompts = {request["messages"][0]["content"] for request in requests}
+        assert len(prompts) == 1, "system prompt prefix must not vary between requests"
+
+        json_mode = "response_format" in requests[0]
+        print(f"{version:>7} {stats['avg_prompt_tokens']:>14.1f} {stats['avg_completion_tokens']:>18.1f} "
+              f"{str(json_mode):>9} {'ok' if not failures else 'FAIL':>6}")
+        for failure in failures:
+            print(f"        {failure}")
+
+        if baseline is None:
+            baseline = stats["avg_prompt_tokens"]
+        else:
+            print(f"        {1 - stats['avg_prompt_tokens'] / baseline:.0%} fewer prompt tokens than version {args.versions[0]}")
+
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,134 @@ class Settings:
     PROJECT_VERSION: str = "1.0.0"
     
     # Security
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
+    SECRET_KEY: str = os.getenv("SECRET_KEY")
+    # Bearer tokens (HS256, signed with SECRET_KEY); requests without one act
+    # as the built-in anonymous user when ALLOW_ANONYMOUS is on. Without a
+    # SECRET_KEY no tokens are issued or accepted
+    JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(24 * 60)))
+    ALLOW_ANONYMOUS: bool = os.getenv("ALLOW_ANONYMOUS", "true").lower() == "true"
     
     # APIs
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
     GOOGLE_CALENDAR_CREDENTIALS: str = os.getenv("GOOGLE_CALENDAR_CREDENTIALS")
+    # Google Calendar sync: meeting writes of linked users queue outbox rows
+    # that a background worker pushes in batches, then pulls remote changes
+    # with sync tokens. The API URL can point at devtools.fake_calendar_server
+    GOOGLE_CALENDAR_API_URL: str = os.getenv("GOOGLE_CALENDAR_API_URL", "https://www.googleapis.com")
+    GOOGLE_CALENDAR_TOKEN_FILE: str = os.getenv("GOOGLE_CALENDAR_TOKEN_FILE", "token.pickle")
+    GOOGLE_CALENDAR_ACCESS_TOKEN: str = os.getenv("GOOGLE_CALENDAR_ACCESS_TOKEN")
+    CALENDAR_SYNC_ENABLED: bool = os.getenv("CALENDAR_SYNC_ENABLED", "false").lower() == "true"
+    CALENDAR_SYNC_INTERVAL: float = float(os.getenv("CALENDAR_SYNC_INTERVAL", "2"))
+    CALENDAR_PULL_INTERVAL: float = float(os.getenv("CALENDAR_PULL_INTERVAL", "60"))
+    CALENDAR_BATCH_SIZE: int = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+    CALENDAR_TIMEOUT: float = float(os.getenv("CALENDAR_TIMEOUT", "30"))
+    CALENDAR_MAX_ATTEMPTS: int = int(os.getenv("CALENDAR_MAX_ATTEMPTS", "8"))
+    CALENDAR_RETRY_BASE_DELAY: float = float(os.getenv("CALENDAR_RETRY_BASE_DELAY", "5"))
+    CALENDAR_RETRY_MAX_DELAY: float = float(os.getenv("CALENDAR_RETRY_MAX_DELAY", "600"))
+    
+    # LLM backend: "openai", "openai_compatible" (OPENAI_BASE_URL, key optional)
+    # or "stub" (in-process scripted replies, no network)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "openai")
+    LLM_STUB_LATENCY: float = float(os.getenv("LLM_STUB_LATENCY", "0.05"))
+    LLM_STUB_SCRIPT: str = os.getenv("LLM_STUB_SCRIPT")
+    
+    # LLM
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL")
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    # LLM gateway: total budget per request (LLM_TIMEOUT caps each attempt),
+    # jittered retries, hedging after the recent p95 latency, circuit breaker
+    LLM_DEADLINE: float = float(os.getenv("LLM_DEADLINE", "15"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "2"))
+    LLM_HEDGE: bool = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+    LLM_BREAKER_THRESHOLD: int = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_RESET: float = float(os.getenv("LLM_BREAKER_RESET", "30"))
+    # System prompt version (see app/services/prompts.py) and provider JSON mode
+    PROMPT_VERSION: str = os.getenv("PROMPT_VERSION", "3")
+    LLM_JSON_MODE: bool = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+    # Batch chat: items per request and classifications in flight per batch
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    
+    # Response cache ("memory" or "sqlite")
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+    
+    # Conversation memory: sessions kept in memory, recent turns sent with
+    # each message, and token caps for the turns and the rolling summary
+    CONVERSATION_MAX_SESSIONS: int = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+    CONVERSATION_WINDOW_TURNS: int = int(os.getenv("CONVERSATION_WINDOW_TURNS", "6"))
+    CONVERSATION_TOKEN_BUDGET: int = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "400"))
+    CONVERSATION_SUMMARY_TOKENS: int = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "120"))
+    
+    # Background jobs: run by JOB_CONCURRENCY tasks in each app process when
+    # JOBS_IN_PROCESS is on, else by `python -m app.worker`; failures retry with
+    # backoff up to JOB_MAX_ATTEMPTS times. Async handlers are cancelled after
+    # JOB_TIMEOUT; plain ones can't be, and keep their job until they return
+    JOBS_IN_PROCESS: bool = os.getenv("JOBS_IN_PROCESS", "true").lower() == "true"
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", "4"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_TIMEOUT: float = float(os.getenv("JOB_TIMEOUT", "60"))
+    JOB_RETRY_BASE_DELAY: float = float(os.getenv("JOB_RETRY_BASE_DELAY", "1"))
+    JOB_RETRY_MAX_DELAY: float = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+    
+    # Reminders: tasks at their due time, meetings reminder_minutes before
+    # they start (MEETING_REMINDER_MINUTES for new ones; empty or negative for
+    # none). The scheduler keeps REMINDER_WINDOW seconds of them in memory and
+    # replays writes made by other processes every REMINDER_CATCH_UP_INTERVAL
+    # seconds (0 when all writes go through this one). REMINDER_SINK is
+    # "event_hub" (this process's WebSocket clients, so run it in every API
+    # process), "log" or "webhook" (POSTs to REMINDER_WEBHOOK_URL; run it in one)
+    REMINDERS_ENABLED: bool = os.getenv("REMINDERS_ENABLED", "true").lower() == "true"
+    REMINDER_SINK: str = os.getenv("REMINDER_SINK", "event_hub")
+    REMINDER_WEBHOOK_URL: str = os.getenv("REMINDER_WEBHOOK_URL", "")
+    REMINDER_WINDOW: float = float(os.getenv("REMINDER_WINDOW", "3600"))
+    REMINDER_CATCH_UP_INTERVAL: float = float(os.getenv("REMINDER_CATCH_UP_INTERVAL", "60"))
+    MEETING_REMINDER_MINUTES: int = int(os.getenv("MEETING_REMINDER_MINUTES", "10") or "-1")
+    
+    # Live updates: events buffered per WebSocket client before it is dropped
+    EVENT_QUEUE_SIZE: int = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+    
+    # Zone that meeting times are read in, e.g. "Europe/Berlin"
+    TIMEZONE: str = os.getenv("TIMEZONE", "UTC")
+    # Availability: free slots are searched within weekday working hours,
+    # up to FREE_SLOT_HORIZON_DAYS ahead; interval indexes kept per user.
+    # Meeting writes made by other processes show up within
+    # AVAILABILITY_RECHECK_INTERVAL seconds (0 reads the change log every query)
+    WORKDAY_START_HOUR: int = int(os.getenv("WORKDAY_START_HOUR", "9"))
+    WORKDAY_END_HOUR: int = int(os.getenv("WORKDAY_END_HOUR", "17"))
+    FREE_SLOT_HORIZON_DAYS: int = int(os.getenv("FREE_SLOT_HORIZON_DAYS", "7"))
+    AVAILABILITY_MAX_USERS: int = int(os.getenv("AVAILABILITY_MAX_USERS", "256"))
+    AVAILABILITY_RECHECK_INTERVAL: float = float(os.getenv("AVAILABILITY_RECHECK_INTERVAL", "1"))
+    
+    # Observability: per-request logs kept (warnings and errors always are),
+    # and X-Profile request profiling, which writes dumps to PROFILE_DIR
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "./profiles")
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    # Run `python -m app.migrate` on app startup; turn off when several
+    # workers share a database and migrate once before starting them
+    AUTO_MIGRATE: bool = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+    # Connection pool (server databases such as Postgres)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # SQLite tuning
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""In-memory stand-in for the parts of the Google Calendar API the sync
+worker uses: event insert/patch/delete/list, the ``/batch/calendar/v3``
+multipart endpoint and incremental sync tokens. Run from the backend
+directory:
+
+    python -m devtools.fake_calendar_server --port 8104 --latency 0.05
+
+and point the app at it with GOOGLE_CALENDAR_API_URL=http://127.0.0.1:8104
+and any GOOGLE_CALENDAR_ACCESS_TOKEN.
+
+Every HTTP request waits ``--latency`` seconds, however many calls a batch
+carries. ``--error-rate`` answers that share of calls with a 503. Deleted
+events are kept as cancelled, so inserting their id again is a 409, as on
+Google. ``POST /faults`` with ``latency`` or ``error_rate`` changes the
+faults, and ``{"expire_tokens": true}`` makes every sync token handed out
+so far answer 410.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+EVENT_PATH = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+
+def create_app(latency: float = 0.05, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    faults = {"latency": latency, "error_rate": error_rate}
+    # calendar id -> event id -> event; "sequence" is the change counter sync tokens point into
+    calendars = {}
+    sequence = itertools.count(1)
+    state = {"last_sequence": 0, "oldest_token": 0, "http_requests": 0, "calls": 0}
+
+    def error(status: int, message: str):
+        return status, {"error": {"code": status, "message": message}}
+
+    def touch(event: dict):
+        event["sequence"] = state["last_sequence"] = next(sequence)
+
+    def public(event: dict) -> dict:
+        return {key: value for key, value in event.items() if key != "sequence"}
+
+    def insert_event(calendar_id: str, body: dict):
+        events = calendars.setdefault(calendar_id, {})
+        event_id = body.get("id") or f"fake{next(sequence)}"
+        if event_id in events:
+            return error(409, "The requested identifier already exists.")
+        event = dict(body, id=event_id, status="confirmed")
+        touch(event)
+        events[event_id] = event
+        return 200, public(event)
+
+    def patch_event(calendar_id: str, event_id: str, body: dict):
+        event = calendars.get(calendar_id, {}).get(event_id)
+        if event is None:
+            return error(404, "Not Found")
+        event.update({key: value for key, value in body.items() if key != "id"})
+        touch(event)
+        return 200, public(event)
+
+    def delete_event(calendar_id: str, event_id: str):
+        event = calendars.get(calendar_id, {}).get(event_id)
+        if event is None:
+            return error(404, "Not Found")
+        if event["status"] == "cancelled":
+            return error(410, "Resource has been deleted")
+        event["status"] = "cancelled"
+        touch(event)
+        return 204, None
+
+    def list_events(calendar_id: str, params: dict):
+        sync_token, page_token = params.get("syncToken"), params.get("pageToken")
+        since = None
+        if sync_token:
+            since = int(sync_token[1:])
+            if since < state["oldest_token"]:
+                return error(410, "Sync token is no longer valid, a full sync is required.")
+        events = sorted(calendars.get(calendar_id, {}).values(), key=lambda event: event["sequence"])
+        if since is not None:
+            events = [event for event in events if event["sequence"] > since]
+        elif params.get("showDeleted") != "true":
+            events = [event for event in events if event["status"] != "cancelled"]
+
+        # Page tokens carry the offset and the sequence the listing started at
+        offset, upto = map(int, page_token.split(":")) if page_token else (0, state["last_sequence"])
+        events = [event for event in events if event["sequence"] <= upto]
+        size = int(params.get("maxResults", 250))
+        page = {"kind": "calendar#events", "items": [public(event) for event in events[offset:offset + size]]}
+        if offset + size < len(events):
+            page["nextPageToken"] = f"{offset + size}:{upto}"
+        else:
+            page["nextSyncToken"] = f"s{upto}"
+        return 200, page
+
+    def dispatch(method: str, url: str, body: dict):
+        state["calls"] += 1
+        if random.random() < faults["error_rate"]:
+            return error(503, "Injected failure")
+        path, query = urlsplit(url)[2:4]
+        match = EVENT_PATH.match(path)
+        if not match:
+            return error(404, f"No such endpoint: {path}")
+        calendar_id, event_id = (unquote(part) if part else part for part in match.groups())
+        if method == "POST" and not event_id:
+            return insert_event(calendar_id, body or {})
+        if method == "PATCH" and event_id:
+            return patch_event(calendar_id, event_id, body or {})
+        if method == "DELETE" and event_id:
+            return delete_event(calendar_id, event_id)
+        if method == "GET" and not event_id:
+            return list_events(calendar_id, dict(parse_qsl(query)))
+        return error(405, f"{method} not supported on {path}")
+
+    def reply(status: int, body: dict) -> Response:
+        return Response(status_code=status) if body is None else JSONResponse(body, status_code=status)
+
+    @app.middleware("http")
+    async def count_and_delay(request: Request, call_next):
+        if request.url.path.startswith(("/calendar/", "/batch/")):
+            state["http_requests"] += 1
+            await asyncio.sleep(faults["latency"])
+        return await call_next(request)
+
+    @app.post("/faults")
+    async def set_faults(request: Request):
+        body = await request.json()
+        faults.update({name: float(value) for name, value in body.items() if name in faults})
+        if body.get("expire_tokens"):
+            state["oldest_token"] = state["last_sequence"] + 1
+        return faults
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "http_requests": state["http_requests"],
+            "calls": state["calls"],
+            "events": sum(1 for events in calendars.values() for event in events.values() if event["status"] != "cancelled")
+        }
+
+    @app.api_route("/calendar/v3/calendars/{calendar_id}/events", methods=["GET", "POST"])
+    @app.api_route("/calendar/v3/calendars/{calendar_id}/events/{event_id}", methods=["PATCH", "DELETE"])
+    async def events(request: Request):
+        raw = await request.body()
+        # The raw path, so encoded ids stay in one path segment
+        url = request.scope["raw_path"].decode().split("?")[0] + (f"?{request.url.query}" if request.url.query else "")
+        return reply(*dispatch(request.method, url, json.loads(raw) if raw else None))
+
+    @app.post("/batch/calendar/v3")
+    async def batch(request: Request):
+        boundary = re.search(r'boundary="?([^";]+)"?', request.headers.get("content-type", "")).group(1)
+        parts = []
+        for part in (await request.body()).decode().split(f"--{boundary}"):
+            content_id = re.search(r"Content-ID:\s*<([^>]+)>", part, re.IGNORECASE)
+            request_line = re.search(r"^(GET|POST|PATCH|PUT|DELETE) (\S+) HTTP/1\.1", part, re.MULTILINE)
+            if not content_id or not request_line:
+                continue
+            inner = part[request_line.start():].split("\r\n\r\n", 1)
+            body = inner[1].strip() if len(inner) == 2 else ""
+            status, payload = dispatch(request_line.group(1), request_line.group(2), json.loads(body) if body else None)
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id.group(1)}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload) if payload is not None else ''}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return Response("".join(parts), media_type=f"multipart/mixed; boundary={boundary}")
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8104)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per HTTP request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with a 503")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.error_rate), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
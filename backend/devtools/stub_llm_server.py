@@ -0,0 +1,140 @@
+"""Minimal OpenAI-compatible chat completions server for local load testing.
+
+Run from the backend directory:
+
+    python -m devtools.stub_llm_server --port 8100 --latency 0.2
+
+and point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+
+Faults can be injected for resilience testing: ``--error-rate`` answers that
+share of requests with a 500, and ``--slow-rate`` makes that share take
+``--slow-latency`` seconds instead. ``POST /faults`` with any of
+``latency``, ``error_rate``, ``slow_rate`` and ``slow_latency`` changes them
+while the server runs.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.token_usage import estimate_tokens
+
+DEFAULT_REPLY = {
+    "type": "message",
+    "content": "You can ask me to add a task or schedule a meeting."
+}
+
+def create_app(latency: float = 0.2, reply: dict = None, error_rate: float = 0.0,
+               slow_rate: float = 0.0, slow_latency: float = 5.0) -> FastAPI:
+    app = FastAPI()
+    content = json.dumps(reply or DEFAULT_REPLY)
+    faults = {"latency": latency, "error_rate": error_rate, "slow_rate": slow_rate, "slow_latency": slow_latency}
+
+    def request_latency() -> float:
+        if random.random() < faults["slow_rate"]:
+            return faults["slow_latency"]
+        return faults["latency"]
+
+    def stream_chunks(latency: float):
+        # Roughly token-sized pieces, spread evenly over the configured latency
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        delay = latency / max(len(pieces), 1)
+        for piece in pieces:
+            yield {"delta": {"content": piece}, "finish_reason": None}, delay
+        yield {"delta": {}, "finish_reason": "stop"}, 0
+
+    def usage(body: dict) -> dict:
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in body.get("messages", []))
+        completion_tokens = estimate_tokens(content)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    async def stream_response(completion_id: str, body: dict, latency: float):
+        model = body.get("model", "stub")
+        for choice, delay in stream_chunks(latency):
+            await asyncio.sleep(delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [dict(index=0, **choice)]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage(body)
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/faults")
+    async def set_faults(request: Request):
+        faults.update({name: float(value) for name, value in (await request.json()).items() if name in faults})
+        return faults
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if random.random() < faults["error_rate"]:
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "server_error"}},
+                status_code=500
+            )
+
+        latency = request_latency()
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_response(completion_id, body, latency),
+                media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }
+            ],
+            "usage": usage(body)
+        }
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, error_rate=args.error_rate, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# Settings are read on import, so point them at a throwaway database and
+# the offline LLM backend before anything imports the app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["LLM_BACKEND"] = "stub"
+os.environ["LLM_STUB_LATENCY"] = "0"
+os.environ["CALENDAR_SYNC_ENABLED"] = "false"
+os.environ["SECRET_KEY"] = "test-secret-key"
+
+import itertools
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.migrate import migrate
+from app.models.base import engine, SessionLocal, create_db_engine, async_database_url
+from app.models.models import User
+from app.services.availability import track_availability
+from app.services.change_tracker import track_changes
+from config.settings import settings
+
+emails = itertools.count()
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    migrate(engine)
+    track_changes()
+    track_availability()
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def user_id(db):
+    # A fresh user per test keeps tests apart without cleaning tables
+    user = User(email=f"user{next(emails)}@example.com", hashed_password="")
+    db.add(user)
+    db.commit()
+    return user.id
+
+@pytest.fixture
+def async_sessions():
+    """Session factory on an engine of its own, since each test runs its own event loop."""
+    async_engine = create_db_engine(async_database_url(settings.DATABASE_URL), create=create_async_engine)
+    yield async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async_engine.sync_engine.dispose()
@@ -0,0 +1,67 @@
+import asyncio
+import httpx
+import pytest
+from app.main import app
+from app.models.base import SessionLocal
+from app.models.models import User
+from app.services.auth_service import AuthService, AuthError, SigningKeyMissing, existing_user_id
+from config.settings import settings
+
+@pytest.mark.parametrize("key", [None, "", "your-secret-key"])
+def test_no_tokens_without_a_real_key(monkeypatch, key):
+    token = AuthService.create_access_token(1)
+    monkeypatch.setattr(settings, "SECRET_KEY", key)
+
+    with pytest.raises(SigningKeyMissing):
+        AuthService.create_access_token(1)
+    with pytest.raises(AuthError):
+        AuthService.decode_access_token(token)
+
+def test_tokens_of_missing_users_are_refused(db, user_id, async_sessions):
+    token = AuthService.create_access_token(user_id)
+    gone = AuthService.create_access_token(10 ** 9)
+
+    async def check(token):
+        async with async_sessions() as session:
+            return await existing_user_id(session, token)
+
+    assert asyncio.run(check(token)) == user_id
+    with pytest.raises(AuthError):
+        asyncio.run(check(gone))
+
+def test_concurrent_registration_is_a_conflict(db, monkeypatch):
+    hash_password = AuthService.hash_password
+
+    def racing_hash(password):
+        # The other sign-up commits between our email check and our insert
+        with SessionLocal() as other:
+            other.add(User(email="race@example.com", hashed_password=hash_password(password)))
+            other.commit()
+        return hash_password(password)
+
+    monkeypatch.setattr(AuthService, "hash_password", staticmethod(racing_hash))
+    with pytest.raises(AuthError, match="already registered"):
+        AuthService.register(db, "race@example.com", "correct horse")
+    assert db.query(User).filter(User.email == "race@example.com").count() == 1
+
+def test_list_etags_are_per_user(db, user_id):
+    other = User(email=f"other{user_id}@example.com", hashed_password="")
+    db.add(other)
+    db.commit()
+
+    async def get_tasks(owner, etag=None):
+        headers = {"Authorization": f"Bearer {AuthService.create_access_token(owner)}"}
+        if etag:
+            headers["If-None-Match"] = etag
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/api/tasks", headers=headers)
+
+    # Neither has tasks, so both lists are at the same version
+    mine, theirs = asyncio.run(get_tasks(user_id)), asyncio.run(get_tasks(other.id))
+    assert mine.json()["version"] == theirs.json()["version"]
+    assert mine.headers["etag"] != theirs.headers["etag"]
+    assert mine.headers["vary"].startswith("Authorization, Cookie")
+
+    cached = asyncio.run(get_tasks(user_id, mine.headers["etag"]))
+    assert cached.status_code == 304 and cached.headers["vary"].startswith("Authorization, Cookie")
+    assert asyncio.run(get_tasks(other.id, mine.headers["etag"])).status_code == 200
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert
+from app.models.models import Change, Meeting
+from app.services.availability import Availability, Busy, IntervalIndex
+
+START = datetime(2030, 1, 7, 9, 0)
+
+def add_meetings(db, user_id, count):
+    meetings = [
+        Meeting(user_id=user_id, title=f"meeting {i}", start_time=START + timedelta(hours=i),
+                end_time=START + timedelta(hours=i, minutes=30))
+        for i in range(count)
+    ]
+    db.add_all(meetings)
+    db.commit()
+    return meetings
+
+def run_with_timeout(coroutine_fn, timeout: float = 20):
+    # A blocked event loop can't time itself out, so watch it from outside
+    outcome = {}
+
+    def target():
+        outcome["result"] = asyncio.run(coroutine_fn())
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "concurrent availability queries deadlocked the event loop"
+    return outcome["result"]
+
+def test_conflicts(db, user_id):
+    add_meetings(db, user_id, 3)
+    availability = Availability()
+    conflicts = availability.conflicts(db, user_id, START + timedelta(minutes=15), START + timedelta(hours=1, minutes=5))
+    assert [busy.title for busy in conflicts] == ["meeting 0", "meeting 1"]
+    assert availability.is_free(db, user_id, START + timedelta(minutes=30), START + timedelta(hours=1))
+
+def test_index_replays_writes(db, user_id):
+    meetings = add_meetings(db, user_id, 2)
+    availability = Availability()
+    assert len(availability.conflicts(db, user_id, START, START + timedelta(hours=2))) == 2
+
+    meetings[0].start_time = START + timedelta(days=1)
+    meetings[0].end_time = START + timedelta(days=1, hours=1)
+    db.delete(meetings[1])
+    db.commit()
+    assert availability.conflicts(db, user_id, START, START + timedelta(hours=2)) == []
+    assert availability.stats()["refreshes"] == 1
+
+def test_concurrent_async_queries(db, user_id, async_sessions):
+    add_meetings(db, user_id, 50)
+    availability = Availability()
+
+    async def query(offset: int):
+        async with async_sessions() as session:
+            start = START + timedelta(hours=offset)
+            return await availability.conflicts_async(session, user_id, start, start + timedelta(minutes=10))
+
+    async def burst():
+        return await asyncio.gather(*(query(offset) for offset in range(20)))
+
+    async def scenario():
+        # Cold, so every call builds the index, then with a change for every call to replay
+        cold = await burst()
+        add_meetings(db, user_id, 1)
+        return cold, await burst()
+
+    cold, warm = run_with_timeout(scenario)
+    assert [[busy.title for busy in busy_list] for busy_list in cold] == [[f"meeting {i}"] for i in range(20)]
+    assert [len(busy_list) for busy_list in warm] == [2] + [1] * 19
+
+def test_longest_shrinks_on_removal():
+    index = IntervalIndex([Busy(1, "day", START, START + timedelta(hours=8)),
+                           Busy(2, "call", START, START + timedelta(minutes=30))])
+    assert index.longest == timedelta(hours=8)
+
+    index.remove(1)
+    assert index.longest == timedelta(minutes=30)
+    index.add(Busy(2, "call", START, START + timedelta(hours=1)))
+    assert index.longest == timedelta(hours=1)
+    index.remove(2)
+    assert index.longest == timedelta(0)
+
+def test_skips_change_log_until_a_write(db, user_id):
+    meetings = add_meetings(db, user_id, 2)
+    availability = Availability(recheck_interval=60)
+    window = (START, START + timedelta(hours=2))
+    assert len(availability.conflicts(db, user_id, *window)) == 2
+    assert len(availability.conflicts(db, user_id, *window)) == 2
+    assert availability.stats()["skipped"] == 1
+
+    # Committed in this process, so replayed right away
+    db.delete(meetings[1])
+    db.commit()
+    assert len(availability.conflicts(db, user_id, *window)) == 1
+    assert availability.stats()["refreshes"] == 1
+
+    # Another process's write waits for the recheck interval
+    db.execute(insert(Change).values(user_id=user_id, table_name="meetings", row_id=meetings[0].id,
+                                     operation="delete"))
+    db.execute(delete(Meeting).where(Meeting.id == meetings[0].id))
+    db.commit()
+    assert len(availability.conflicts(db, user_id, *window)) == 1
+    availability.recheck_interval = 0
+    assert availability.conflicts(db, user_id, *window) == []
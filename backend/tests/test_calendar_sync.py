@@ -0,0 +1,228 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.models.models import Meeting, CalendarLink, CalendarOutbox, Job, User
+from app.services.auth_service import ANONYMOUS_USER_ID
+from app.services.calendar_service import AccessTokens, CalendarCall, CalendarClient
+from app.services.calendar_sync import (
+    CalendarSync, CalendarLinks, CalendarLinkError, event_id_for, track_calendar_writes, utcnow
+)
+from devtools.fake_calendar_server import create_app
+
+START = datetime(2030, 1, 7, 9, 0)
+
+class BrokenClient:
+    """Fails the way a missing Google auth library does: not with a CalendarError."""
+    requests = calls = 0
+
+    async def batch(self, calls):
+        raise ModuleNotFoundError("No module named 'google'")
+
+def fake_client() -> CalendarClient:
+    """A client talking to a fresh fake calendar server in-process."""
+    client = CalendarClient(api_url="http://calendar", tokens=AccessTokens("test-token"))
+    client.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(latency=0)))
+    return client
+
+@pytest.fixture
+def linked(db, user_id):
+    """A user linked to their own calendar, with nobody else's pushes due."""
+    track_calendar_writes()
+    db.query(CalendarOutbox).delete()
+    db.commit()
+    return CalendarLinks.link(db, user_id).calendar_id
+
+def add_meetings(db, user_id, titles):
+    meetings = [Meeting(user_id=user_id, title=title, start_time=START + timedelta(hours=i),
+                        end_time=START + timedelta(hours=i, minutes=30)) for i, title in enumerate(titles)]
+    db.add_all(meetings)
+    db.commit()
+    return meetings
+
+def outbox(db, user_id):
+    db.expire_all()
+    return db.query(CalendarOutbox).filter(CalendarOutbox.user_id == user_id).all()
+
+def test_writes_queue_no_push_job_with_sync_off(db, user_id):
+    track_calendar_writes()
+    db.query(Job).filter(Job.kind == "calendar.push").delete()
+    db.commit()
+    CalendarLinks.link(db, user_id)
+    db.add(Meeting(user_id=user_id, title="standup", start_time=START, end_time=START + timedelta(minutes=15)))
+    db.commit()
+
+    assert [row.operation for row in outbox(db, user_id)] == ["create"]
+    assert db.query(Job).filter(Job.kind == "calendar.push").count() == 0
+
+def test_push_releases_claimed_rows_on_unexpected_error(db, user_id):
+    track_calendar_writes()
+    CalendarLinks.link(db, user_id)
+    db.add(Meeting(user_id=user_id, title="review", start_time=START, end_time=START + timedelta(hours=1)))
+    db.commit()
+    sync = CalendarSync(client=BrokenClient())
+
+    try:
+        asyncio.run(sync.push())
+    except ModuleNotFoundError:
+        pass
+    else:
+        raise AssertionError("push swallowed the error")
+
+    rows = outbox(db, user_id)
+    assert rows and all(row.claim_token is None for row in rows)
+    assert all(row.attempts == 0 for row in rows)
+    # Due again now, not when the lease runs out
+    assert all(row.next_attempt_at.replace(tzinfo=None) <= utcnow().replace(tzinfo=None) for row in rows)
+
+def test_push_sends_one_batch_request(db, user_id, linked):
+    meetings = add_meetings(db, user_id, [f"meeting {i}" for i in range(5)])
+    client = fake_client()
+    sync = CalendarSync(client=client, batch_size=50)
+
+    async def push():
+        handled = await sync.drain()
+        return handled, (await client.http.get("http://calendar/stats")).json()
+
+    handled, server = asyncio.run(push())
+    assert handled == 5
+    # The claim round and the empty one after it; only the first sends anything
+    assert (client.requests, client.calls) == (1, 5)
+    assert (server["http_requests"], server["events"]) == (1, 5)
+    assert outbox(db, user_id) == []
+    assert [meeting.calendar_event_id for meeting in meetings] == [event_id_for(user_id, meeting.id) for meeting in meetings]
+
+def test_insert_that_already_got_through_is_patched(db, user_id, linked):
+    meeting, = add_meetings(db, user_id, ["planning"])
+    event_id = event_id_for(user_id, meeting.id)
+    client = fake_client()
+    sync = CalendarSync(client=client)
+
+    async def push():
+        # An earlier attempt reached the calendar before the meeting was renamed
+        await client.batch([CalendarCall("POST", client.events_path(linked), {
+            "id": event_id, "summary": "old title",
+            "start": {"dateTime": START.isoformat()}, "end": {"dateTime": (START + timedelta(hours=1)).isoformat()}
+        })])
+        await sync.drain()
+        events, _ = await client.changes(linked)
+        return events
+
+    events = asyncio.run(push())
+    assert [(event["id"], event["summary"]) for event in events] == [(event_id, "planning")]
+    db.refresh(meeting)
+    assert meeting.calendar_event_id == event_id
+    assert outbox(db, user_id) == []
+    assert sync.stats()["dead"] == 0
+
+def test_pull_follows_sync_tokens_and_resyncs_when_they_expire(db, user_id, linked):
+    kept, renamed, deleted = add_meetings(db, user_id, ["kept", "renamed", "deleted"])
+    client = fake_client()
+    sync = CalendarSync(client=client)
+
+    def sync_token():
+        db.expire_all()
+        return db.get(CalendarLink, user_id).sync_token
+
+    async def remote(*calls):
+        # Changes made in another calendar client
+        await client.batch(list(calls))
+
+    async def rounds():
+        await sync.drain()
+        first = await sync.pull(user_id, linked)
+        token = sync_token()
+
+        await remote(
+            CalendarCall("PATCH", client.events_path(linked, renamed.calendar_event_id), {"summary": "renamed remotely"}),
+            CalendarCall("POST", client.events_path(linked), {
+                "summary": "added remotely",
+                "start": {"dateTime": (START + timedelta(days=1)).isoformat()},
+                "end": {"dateTime": (START + timedelta(days=1, hours=1)).isoformat()}
+            })
+        )
+        calls = client.calls
+        second = await sync.pull(user_id, linked, token)
+        incremental_calls = client.calls - calls
+
+        await client.http.post("http://calendar/faults", json={"expire_tokens": True})
+        await remote(CalendarCall("DELETE", client.events_path(linked, deleted.calendar_event_id)))
+        calls = client.calls
+        third = await sync.pull(user_id, linked, sync_token())
+        return first, token, second, incremental_calls, third, client.calls - calls
+
+    first, token, second, incremental_calls, third, resync_calls = asyncio.run(rounds())
+    # Our own pushes come back unchanged
+    assert first == 0 and token
+    assert second == 2 and incremental_calls == 1
+    assert sync_token() != token
+    # 410 on the expired token, then a full listing that includes the cancellation
+    assert third == 1 and resync_calls == 2
+
+    db.expire_all()
+    titles = sorted(meeting.title for meeting in db.query(Meeting).filter(Meeting.user_id == user_id))
+    assert titles == ["added remotely", "kept", "renamed remotely"]
+
+def test_calendar_ids_stay_in_their_path_segment(db, user_id):
+    holidays = "en.usa#holiday@group.v.calendar.google.com"
+    assert CalendarClient.events_path(holidays, "pau1m2") == \
+        "/calendar/v3/calendars/en.usa%23holiday%40group.v.calendar.google.com/events/pau1m2"
+    assert CalendarClient.events_path("x\r\nDELETE /calendar/v3/calendars/other/events/1?a") == \
+        "/calendar/v3/calendars/x%0D%0ADELETE%20%2Fcalendar%2Fv3%2Fcalendars%2Fother%2Fevents%2F1%3Fa/events"
+
+    from pydantic import ValidationError
+    from app.main import CalendarLinkRequest
+    assert CalendarLinkRequest(calendar_id=holidays).calendar_id == holidays
+    for bad in ("primary/../other", "a?b", "a\r\nb", "a b"):
+        with pytest.raises(ValidationError):
+            CalendarLinkRequest(calendar_id=bad)
+
+def test_calendar_ids_with_reserved_characters_round_trip(db, user_id):
+    track_calendar_writes()
+    db.query(CalendarOutbox).delete()
+    user = db.get(User, user_id)
+    user.email = f"first+last{user_id}@example.com"
+    db.commit()
+    calendar_id = CalendarLinks.link(db, user_id).calendar_id
+    meeting, = add_meetings(db, user_id, ["day off"])
+    client = fake_client()
+    sync = CalendarSync(client=client)
+
+    async def round_trip():
+        await sync.drain()
+        return await client.changes(calendar_id)
+
+    events, _ = asyncio.run(round_trip())
+    assert [event["id"] for event in events] == [event_id_for(user_id, meeting.id)]
+
+def test_only_own_unshared_calendars_are_linked_or_synced(db, user_id):
+    other = User(email=f"other{user_id}@example.com", hashed_password="")
+    db.add(other)
+    db.commit()
+    email = db.get(User, user_id).email
+
+    for linker, calendar_id, status in [
+        (user_id, "primary", 403),
+        (user_id, other.email, 403),
+        (ANONYMOUS_USER_ID, None, 403),
+    ]:
+        with pytest.raises(CalendarLinkError) as error:
+            CalendarLinks.link(db, linker, calendar_id)
+        assert error.value.status == status
+    assert CalendarLinks.link(db, user_id).calendar_id == email
+
+    # A link from before the rule, to someone else's calendar
+    db.add(CalendarLink(user_id=other.id, calendar_id=email))
+    db.commit()
+    with pytest.raises(CalendarLinkError) as error:
+        CalendarLinks.link(db, user_id, email)
+    assert error.value.status == 409
+
+    add_meetings(db, other.id, ["not yours"])
+    db.add(CalendarOutbox(user_id=other.id, meeting_id=db.query(Meeting.id).filter(Meeting.user_id == other.id).scalar(),
+                          operation="create", event_id="pau0m0", next_attempt_at=utcnow()))
+    db.commit()
+    sync = CalendarSync(client=fake_client())
+    # A calendar linked twice is pulled for neither user, and nothing is pushed to it
+    assert all(user not in (user_id, other.id) for user, _, _ in sync.claim_pull())
+    assert [push.call for push in sync.claim() if push.user_id == other.id] == [None]
@@ -0,0 +1,29 @@
+import asyncio
+import httpx
+from app.main import app
+from app.services.ai_service import get_ai_assistant
+
+def post_chat(headers=None):
+    async def post():
+        # No lifespan: the database is already migrated and no workers are needed
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/chat", json={"message": "show my tasks"}, headers=headers or {})
+    return asyncio.run(post())
+
+def test_chat_without_a_session_id_stays_stateless():
+    conversations = get_ai_assistant().conversations
+    before = len(conversations.sessions)
+
+    response = post_chat()
+    assert response.status_code == 200
+    assert "x-session-id" not in response.headers and "set-cookie" not in response.headers
+    assert len(conversations.sessions) == before
+
+def test_chat_with_a_session_id_keeps_the_conversation():
+    conversations = get_ai_assistant().conversations
+    before = len(conversations.sessions)
+
+    response = post_chat({"X-Session-Id": "tab0123456789"})
+    assert response.status_code == 200
+    assert response.headers["x-session-id"] == "tab0123456789"
+    assert len(conversations.sessions) == before + 1
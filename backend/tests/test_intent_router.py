@@ -0,0 +1,28 @@
+from app.services.intent_router import IntentRouter
+
+def action(message: str):
+    routed = IntentRouter().match(message)
+    return routed and routed["content"]
+
+def test_routes_unambiguous_commands():
+    assert action("add task buy milk") == {"action": "add_task", "task": "buy milk"}
+    assert action("delete task buy milk") == {"action": "delete_task", "task": "buy milk"}
+    assert action("mark report as done") == {"action": "complete_task", "task": "report"}
+    assert action("cancel meeting with Sam") == {"action": "delete_meeting", "meeting": "with Sam"}
+    assert action("show my tasks") == {"action": "get_tasks"}
+
+def test_short_or_vague_targets_fall_through():
+    router = IntentRouter()
+    for message in ("delete task .", "delete task ?!", "remove task a", "complete task it",
+                    "delete task that one", "cancel meeting it", "conflicts for it"):
+        assert router.match(message) is None, message
+    assert router.stats()["vague_targets"] == 7
+    assert router.stats()["hits"] == 0
+
+def test_loose_match_skips_vague_targets():
+    router = IntentRouter()
+    assert router.match_loose("ok, delete task .") is None
+    assert router.match_loose("so delete task it") is None
+    assert router.match_loose("so delete task buy milk") == {
+        "type": "action", "content": {"action": "delete_task", "task": "buy milk"}
+    }
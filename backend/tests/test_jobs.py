@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import time
+from app.models.models import Job
+from app.services.jobs import HANDLERS, JobRunner, enqueue, job_handler
+
+def test_overrunning_thread_keeps_its_job(db):
+    running, overlaps, runs = set(), [], []
+
+    @job_handler("test.slow", timeout=0.1)
+    def slow(payload):
+        overlaps.append(bool(running))
+        running.add(threading.get_ident())
+        time.sleep(0.5)
+        running.discard(threading.get_ident())
+        runs.append(payload)
+
+    try:
+        enqueue(db, "test.slow", {"n": 1})
+        db.commit()
+        runner = JobRunner(kinds=["test.slow"], base_delay=0, max_delay=0)
+
+        async def race():
+            job, = await asyncio.to_thread(runner.claim, 1)
+            first = asyncio.create_task(runner.execute(job))
+            await asyncio.sleep(0.3)
+            # Past the timeout, but the thread still runs: nothing to claim
+            again = await asyncio.to_thread(runner.claim, 1)
+            await first
+            return again
+
+        assert asyncio.run(race()) == []
+        assert runs == [{"n": 1}] and overlaps == [False]
+        # The handler finished, so the job is done rather than retried
+        assert runner.counts["succeeded"] == 1
+        db.expire_all()
+        assert db.query(Job).filter(Job.kind == "test.slow").count() == 0
+    finally:
+        del HANDLERS["test.slow"]
@@ -0,0 +1,86 @@
+import asyncio
+import copy
+import json
+import random
+import time
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from app.services.ai_service import AIAssistant
+from app.services.llm_gateway import LLMGateway, LLMUnavailable
+from config.settings import settings
+from devtools.stub_llm_server import DEFAULT_REPLY, create_app
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def gateway_for(server, **overrides) -> LLMGateway:
+    """A gateway whose async client talks to ``server`` in-process."""
+    gateway_settings = copy.copy(settings)
+    for name, value in dict(LLM_RETRY_BASE_DELAY=0.01, LLM_RETRY_MAX_DELAY=0.01, **overrides).items():
+        setattr(gateway_settings, name, value)
+    async_client = AsyncOpenAI(
+        api_key="test", base_url="http://stub/v1", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=server))
+    )
+    return LLMGateway(None, async_client, gateway_settings)
+
+@pytest.fixture(autouse=True)
+def seeded():
+    # Injected faults and retry backoff both draw from the global generator
+    random.seed(7)
+
+def test_retries_ride_out_injected_errors():
+    gateway = gateway_for(create_app(latency=0, error_rate=0.5), LLM_MAX_RETRIES=6)
+
+    async def burst():
+        return [await gateway.create_async(model="stub", messages=MESSAGES) for _ in range(20)]
+
+    responses = asyncio.run(burst())
+    assert all(response.choices[0].message.content == json.dumps(DEFAULT_REPLY) for response in responses)
+    assert gateway.counts["retries"] > 0
+    assert gateway.counts["failures"] == 0
+    assert gateway.breaker.state == "closed"
+
+def test_breaker_opens_and_assistant_falls_back_to_rules():
+    gateway = gateway_for(create_app(latency=0, error_rate=1.0), LLM_MAX_RETRIES=1,
+                          LLM_BREAKER_THRESHOLD=2, LLM_BREAKER_RESET=60)
+
+    async def requests():
+        for _ in range(2):
+            with pytest.raises(LLMUnavailable, match="Injected failure"):
+                await gateway.create_async(model="stub", messages=MESSAGES)
+        assert gateway.breaker.state == "open"
+        with pytest.raises(LLMUnavailable, match="circuit breaker is open"):
+            await gateway.create_async(model="stub", messages=MESSAGES)
+
+        assistant = AIAssistant()
+        assistant.llm_gateway = gateway
+        # Not a whole-message command, so it reaches the gateway before the loose rules
+        return await assistant.classify_async("could you add task water plants for me")
+
+    reply = asyncio.run(requests())
+    assert reply == {"type": "action", "content": {"action": "add_task", "task": "water plants for me"}}
+    assert gateway.counts["failures"] == 2
+    assert gateway.counts["short_circuits"] == 2
+
+def test_deadline_caps_slow_attempts():
+    gateway = gateway_for(create_app(latency=5), LLM_TIMEOUT=0.1, LLM_DEADLINE=0.3, LLM_MAX_RETRIES=10)
+
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(gateway.create_async(model="stub", messages=MESSAGES))
+    assert time.monotonic() - started < 1
+    assert gateway.counts["retries"] >= 1
+
+def test_stream_carries_reply_and_usage():
+    gateway = gateway_for(create_app(latency=0))
+
+    async def collect():
+        stream = await gateway.create_async(model="stub", messages=MESSAGES, stream=True,
+                                            stream_options={"include_usage": True})
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(collect())
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert text == json.dumps(DEFAULT_REPLY)
+    assert chunks[-1].choices == [] and chunks[-1].usage.prompt_tokens == 2
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import httpx
+import orjson
+from app.main import app
+from app.models.models import Task, Meeting
+from app.services.auth_service import AuthService
+from app.services.change_tracker import EVENT_NAMES, build_event
+from app.services.projections import TaskOut, MeetingOut, dumps
+from app.services.reminders import Reminder, ReminderScheduler, EventHubSink, track_reminders
+
+UTC = ZoneInfo("UTC")
+AT = datetime(2030, 1, 7, 8, 50)
+START = datetime(2030, 1, 7, 9, 0)
+
+# The dashboard upserts events with these actions as whole rows
+ROW_ACTIONS = {"created", "updated", "completed"}
+
+class RecordingHub:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, event: dict, user_id: int):
+        self.published.append((user_id, event))
+
+class RecordingSink:
+    def __init__(self):
+        self.delivered = []
+
+    async def deliver(self, reminders: list):
+        self.delivered.extend(reminders)
+
+def wire(event: dict) -> dict:
+    return orjson.loads(dumps(event))
+
+def test_reminder_event_shapes():
+    task = wire(Reminder("task", 1, 7, "file taxes", START, START).to_event(UTC))
+    assert task == {"event": "task.due", "data": {"id": 1, "title": "file taxes", "due_at": "2030-01-07T09:00:00+00:00"}}
+
+    meeting = wire(Reminder("meeting", 2, 7, "standup", AT, START).to_event(UTC))
+    assert meeting == {"event": "meeting.reminder", "data": {
+        "id": 2, "title": "standup", "remind_at": "2030-01-07T08:50:00+00:00", "start_time": "2030-01-07T09:00:00+00:00"
+    }}
+
+def test_reminder_events_are_not_row_events():
+    # Reminders carry partial rows, so they must never look like a row change
+    row_events = set(EVENT_NAMES.values()) | {"task.completed"}
+    for reminder in (Reminder("task", 1, 7, "t", START, START), Reminder("meeting", 2, 7, "m", AT, START)):
+        name = reminder.to_event(UTC)["event"]
+        assert name not in row_events
+        assert name.split(".")[1] not in ROW_ACTIONS | {"deleted"}
+
+def test_row_events_carry_whole_rows(db, user_id):
+    task = Task(user_id=user_id, title="write report", completed=False, due_at=START)
+    meeting = Meeting(user_id=user_id, title="review", start_time=START, end_time=START + timedelta(hours=1))
+    db.add_all([task, meeting])
+    db.commit()
+
+    for operation in ("create", "update"):
+        assert set(TaskOut.model_fields) <= set(build_event("tasks", operation, task)["data"])
+        assert set(MeetingOut.model_fields) <= set(build_event("meetings", operation, meeting)["data"])
+
+def test_event_hub_sink_publishes_to_owner():
+    hub = RecordingHub()
+    asyncio.run(EventHubSink(hub=hub, tz_name="UTC").deliver([Reminder("task", 1, 7, "t", START, START)]))
+    assert [(user_id, event["event"]) for user_id, event in hub.published] == [(7, "task.due")]
+
+def test_due_task_fires_from_commit(db, user_id):
+    track_reminders()
+    sink = RecordingSink()
+    scheduler = ReminderScheduler(sink, window=3600, catch_up_interval=0)
+
+    async def scenario():
+        stop = asyncio.Event()
+        running = asyncio.create_task(scheduler.run(stop))
+        while scheduler.horizon is None:
+            await asyncio.sleep(0.01)
+        task = Task(user_id=user_id, title="call back", completed=False,
+                    due_at=scheduler.db_time(scheduler.clock() + 0.2))
+        db.add(task)
+        db.commit()
+        for _ in range(100):
+            if sink.delivered:
+                break
+            await asyncio.sleep(0.05)
+        stop.set()
+        await running
+        return task.id
+
+    task_id = asyncio.run(scenario())
+    assert [(reminder.kind, reminder.id) for reminder in sink.delivered] == [("task", task_id)]
+
+def test_patch_changes_only_sent_fields(db, user_id):
+    task = Task(user_id=user_id, title="file taxes", due_at=START)
+    meeting = Meeting(user_id=user_id, title="standup", start_time=START, end_time=START + timedelta(minutes=15),
+                      reminder_minutes=10)
+    db.add_all([task, meeting])
+    db.commit()
+
+    async def patch(path, body):
+        headers = {"Authorization": f"Bearer {AuthService.create_access_token(user_id)}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return (await client.patch(path, json=body, headers=headers)).json()
+
+    assert asyncio.run(patch(f"/api/tasks/{task.id}", {}))["due_at"] == "2030-01-07T09:00:00"
+    assert asyncio.run(patch(f"/api/tasks/{task.id}", {"due_at": None}))["due_at"] is None
+    assert asyncio.run(patch(f"/api/meetings/{meeting.id}", {}))["reminder_minutes"] == 10
+    assert asyncio.run(patch(f"/api/meetings/{meeting.id}", {"reminder_minutes": None}))["reminder_minutes"] is None
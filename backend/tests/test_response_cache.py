@@ -0,0 +1,114 @@
+import asyncio
+import json
+import pytest
+from prometheus_client import REGISTRY, generate_latest
+from app.services.ai_service import AIAssistant
+from app.services.response_cache import MemoryCacheBackend, ResponseCache, SQLiteCacheBackend, self_contained
+
+PARAMS = {"model": "stub", "temperature": 0.7, "prompt": "3"}
+ADD_MILK = {"type": "action", "content": {"action": "add_task", "task": "buy milk"}}
+OFF_TOPIC = {"type": "message", "content": "Paris is the capital of France."}
+HISTORY = [{"role": "user", "content": "remind me to buy milk"}, {"role": "assistant", "content": "{}"}]
+
+def cache():
+    return ResponseCache(MemoryCacheBackend(100, 1 << 20), ttl=60)
+
+def test_self_contained():
+    assert self_contained("remind me to buy milk", ADD_MILK)
+    assert self_contained("set up a meeting with Sam tomorrow at 3pm", {"type": "action", "content": {
+        "action": "schedule_meeting", "meeting": {"title": "Meeting with Sam", "date_info": "tomorrow at 3pm"}
+    }})
+    assert self_contained("what's on my plate", {"type": "action", "content": {"action": "get_tasks"}})
+    # Arguments taken from earlier turns
+    assert not self_contained("actually drop it", {"type": "action", "content": {"action": "delete_task", "task": "buy milk"}})
+    assert not self_contained("hello", {"type": "message", "content": "hi"})
+
+def test_history_only_serves_self_contained_replies():
+    responses = cache()
+    responses.set("remind me to buy milk", PARAMS, ADD_MILK, 0.5)
+    responses.set("drop it", PARAMS, {"type": "action", "content": {"action": "delete_task", "task": "buy milk"}}, 0.5)
+
+    assert responses.get("remind me to buy milk", PARAMS, self_contained_only=True) == ADD_MILK
+    assert responses.get("drop it", PARAMS, self_contained_only=True) is None
+    assert responses.get("drop it", PARAMS) is not None
+    assert (responses.hits, responses.misses) == (2, 1)
+
+def test_follow_ups_cache_self_contained_actions():
+    assistant = AIAssistant()
+    assistant.response_cache = cache()
+    drop = {"type": "action", "content": {"action": "delete_task", "task": "buy milk"}}
+
+    assert assistant.parse_completion("please add buy milk", '{"type":"action","content":{"action":"add_task","task":"buy milk"}}',
+                                      history=HISTORY) == ADD_MILK
+    assert assistant.parse_completion("actually drop it", '{"type":"action","content":{"action":"delete_task","task":"buy milk"}}',
+                                      history=HISTORY) == drop
+
+    # The context-free action is served to a later conversation, the follow-up is not
+    assert asyncio.run(assistant.classify_async("please add buy milk", HISTORY)) == ADD_MILK
+    assert assistant.response_cache.hits == 1
+    assert assistant.response_cache.get("actually drop it", assistant.llm_params) is None
+
+def test_off_topic_filter_with_history():
+    assistant = AIAssistant()
+    reply = '{"type":"message","content":"Paris is the capital of France."}'
+    chat = [{"role": "user", "content": "tell me a joke"}, {"role": "assistant", "content": "{}"}]
+
+    assert assistant.parse_completion("what's the capital of France", reply, history=chat) != OFF_TOPIC
+    # A follow-up to a task question keeps the conversation's topic
+    assert assistant.parse_completion("and the one after that?", reply, history=HISTORY + [
+        {"role": "user", "content": "which task is next"}, {"role": "assistant", "content": "{}"}
+    ]) == OFF_TOPIC
+
+COUNTERS = [
+    ("response_cache_saved_seconds_total", None, "saved"),
+    ("response_cache_lookups_total", "result", "hit"),
+    ("response_cache_lookups_total", "result", "miss"),
+    ("response_cache_evictions_total", "reason", "capacity"),
+    ("response_cache_evictions_total", "reason", "expired"),
+]
+
+def counters() -> dict:
+    return {value: REGISTRY.get_sample_value(name, {label: value} if label else {}) or 0.0
+            for name, label, value in COUNTERS}
+
+def backend_cache(backend, tmp_path, max_entries, max_bytes):
+    if backend == "memory":
+        return ResponseCache(MemoryCacheBackend(max_entries, max_bytes), ttl=60)
+    return ResponseCache(SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries, max_bytes), ttl=60)
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_counters_reach_metrics(backend, tmp_path):
+    responses = backend_cache(backend, tmp_path, 2, 1 << 20)
+    before = counters()
+
+    for message in ("one", "two", "three"):
+        responses.set(message, PARAMS, ADD_MILK, 0.5)
+    assert responses.get("three", PARAMS) == ADD_MILK
+    # Pushed out by "three"
+    assert responses.get("one", PARAMS) is None
+    responses.backend.max_entries = 10
+    responses.ttl = 0
+    responses.set("four", PARAMS, ADD_MILK, 0.5)
+    assert responses.get("four", PARAMS) is None
+
+    after = counters()
+    delta = {value: after[value] - before[value] for value in after}
+    assert delta == {"saved": 0.5, "hit": 1, "miss": 2, "capacity": 1, "expired": 1}
+    assert responses.stats()["evictions"] == delta["capacity"] + delta["expired"]
+    # What GET /metrics serves
+    assert b'response_cache_evictions_total{reason="capacity"}' in generate_latest()
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_byte_bound(backend, tmp_path):
+    size = len(json.dumps(ADD_MILK))
+    responses = backend_cache(backend, tmp_path, 100, int(size * 2.5))
+
+    responses.set("one", PARAMS, ADD_MILK, 0.5)
+    responses.set("two", PARAMS, ADD_MILK, 0.5)
+    # Recently used, so "two" is the one to go
+    assert responses.get("one", PARAMS) == ADD_MILK
+    responses.set("three", PARAMS, ADD_MILK, 0.5)
+
+    assert responses.stats()["entries"] == 2
+    assert responses.get("two", PARAMS) is None
+    assert responses.get("one", PARAMS) == responses.get("three", PARAMS) == ADD_MILK
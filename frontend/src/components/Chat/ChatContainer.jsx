@@ -2,6 +2,16 @@ import { useState } from "react";
 import { Box, Paper, TextField, Button, Typography } from "@mui/material";
 import { alpha } from "@mui/material/styles";
 
+// One conversation per browser tab, so follow-ups keep their context
+const sessionId = () => {
+  let id = sessionStorage.getItem("chatSessionId");
+  if (!id) {
+    id = crypto.randomUUID().replace(/-/g, "");
+    sessionStorage.setItem("chatSessionId", id);
+  }
+  return id;
+};
+
 const ChatContainer = () => {
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState("");
@@ -14,11 +24,22 @@ const ChatContainer = () => {
     setMessages((prev) => [...prev, userMessage]);
     setInputMessage("");
 
+    // Placeholder for the assistant's reply, filled in as tokens stream in
+    setMessages((prev) => [...prev, { text: "", isUser: false }]);
+    const updateReply = (update) =>
+      setMessages((prev) => {
+        const next = [...prev];
+        const last = next[next.length - 1];
+        next[next.length - 1] = { ...last, text: update(last.text) };
+        return next;
+      });
+
     try {
-      const response = await fetch("http://localhost:8000/api/chat", {
+      const response = await fetch("http://localhost:8000/api/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "X-Session-Id": sessionId(),
         },
         body: JSON.stringify({ message: inputMessage }),
       });
@@ -27,30 +48,57 @@ const ChatContainer = () => {
         throw new Error("Failed to send message");
       }
 
-      const data = await response.json();
-
-      // Add assistant's response to chat
-      const assistantMessage = { text: data.content, isUser: false };
-      setMessages((prev) => [...prev, assistantMessage]);
-
-      // Trigger dashboard update if the response indicates a task/meeting modification
-      if (
-        data.content.includes("Task added:") ||
-        data.content.includes("Meeting scheduled:") ||
-        data.content.includes("Marked task") ||
-        data.content.includes("Deleted task") ||
-        data.content.includes("Deleted meeting")
-      ) {
-        // Dispatch custom event to trigger dashboard refresh
-        window.dispatchEvent(new CustomEvent("dashboardUpdate"));
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      const handleEvent = (event, data) => {
+        if (event === "token") {
+          updateReply((text) => text + data.content);
+        } else if (event === "action") {
+          updateReply(() => "Working on it…");
+        } else if (event === "done") {
+          updateReply(() => data.content);
+
+          // Trigger dashboard update if the response indicates a task/meeting modification
+          if (
+            data.content.includes("Task added:") ||
+            data.content.includes("Meeting scheduled:") ||
+            data.content.includes("Marked task") ||
+            data.content.includes("Deleted task") ||
+            data.content.includes("Deleted meeting")
+          ) {
+            // Dispatch custom event to trigger dashboard refresh
+            window.dispatchEvent(new CustomEvent("dashboardUpdate"));
+          }
+        } else if (event === "error") {
+          throw new Error(data.detail);
+        }
+      };
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-sent events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = "message";
+          let data = "";
+          for (const line of block.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          handleEvent(event, JSON.parse(data));
+        }
       }
     } catch (error) {
       console.error("Error:", error);
-      const errorMessage = {
-        text: "Error: Failed to fetch response",
-        isUser: false,
-      };
-      setMessages((prev) => [...prev, errorMessage]);
+      updateReply(() => "Error: Failed to fetch response");
     }
   };
 
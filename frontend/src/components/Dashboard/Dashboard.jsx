@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   Box,
   Paper,
@@ -13,6 +13,7 @@ import {
   CircularProgress,
   Alert,
   Tooltip,
+  Snackbar,
   alpha,
 } from "@mui/material";
 import DeleteIcon from "@mui/icons-material/Delete";
@@ -20,31 +21,63 @@ import EventIcon from "@mui/icons-material/Event";
 import TaskAltIcon from "@mui/icons-material/TaskAlt";
 import { format } from "date-fns";
 
+// Live events that carry a whole row; reminders share the channel but don't
+const ROW_ACTIONS = new Set(["created", "updated", "completed"]);
+
+// Largest page /api/tasks and /api/meetings serve
+const PAGE_SIZE = 500;
+
+// Follows next_cursor to the last page. The version is the first page's, so
+// a write between pages is still replayed by the next change feed request
+const fetchAllPages = async (path, key) => {
+  const rows = [];
+  let cursor = null;
+  let version = null;
+  do {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+    const response = await fetch(`http://localhost:8000/api/${path}?${params}`);
+    if (!response.ok) {
+      throw new Error(`Failed to fetch ${path}`);
+    }
+    const page = await response.json();
+    rows.push(...page[key]);
+    version ??= page.version;
+    cursor = page.next_cursor;
+  } while (cursor);
+  return { rows, version };
+};
+
+const reminderText = (event, data) =>
+  event === "task.due"
+    ? `"${data.title}" is due now`
+    : `"${data.title}" starts at ${format(new Date(data.start_time), "h:mm a")}`;
+
 const Dashboard = () => {
   const [tasks, setTasks] = useState([]);
   const [meetings, setMeetings] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [reminder, setReminder] = useState(null);
+  // Last data version seen, used to ask the server only for what changed since
+  const versionRef = useRef(0);
+  const socketRef = useRef(null);
 
   const fetchData = async () => {
     try {
       setLoading(true);
       setError(null);
 
-      const [tasksResponse, meetingsResponse] = await Promise.all([
-        fetch("http://localhost:8000/api/tasks"),
-        fetch("http://localhost:8000/api/meetings"),
+      const [tasksData, meetingsData] = await Promise.all([
+        fetchAllPages("tasks", "tasks"),
+        fetchAllPages("meetings", "meetings"),
       ]);
 
-      if (!tasksResponse.ok || !meetingsResponse.ok) {
-        throw new Error("Failed to fetch data");
-      }
-
-      const tasksData = await tasksResponse.json();
-      const meetingsData = await meetingsResponse.json();
-
-      setTasks(tasksData.tasks);
-      setMeetings(meetingsData.meetings);
+      setTasks(tasksData.rows);
+      setMeetings(meetingsData.rows);
+      versionRef.current = Math.max(tasksData.version, meetingsData.version);
     } catch (error) {
       console.error("Error fetching data:", error);
       setError("Failed to load dashboard data");
@@ -53,6 +86,103 @@ const Dashboard = () => {
     }
   };
 
+  const mergeChanges = (rows, changes, compare) => {
+    const upserted = new Map(changes.upserted.map((row) => [row.id, row]));
+    const deleted = new Set(changes.deleted);
+    const kept = rows
+      .filter((row) => !deleted.has(row.id))
+      .map((row) => upserted.get(row.id) ?? row);
+    const keptIds = new Set(kept.map((row) => row.id));
+    const added = changes.upserted.filter((row) => !keptIds.has(row.id));
+    return [...kept, ...added].sort(compare);
+  };
+
+  const fetchChanges = async () => {
+    try {
+      let more = true;
+      while (more) {
+        const response = await fetch(
+          `http://localhost:8000/api/changes?since=${versionRef.current}`
+        );
+        if (!response.ok) {
+          throw new Error("Failed to fetch changes");
+        }
+        const data = await response.json();
+
+        setTasks((prev) =>
+          mergeChanges(
+            prev,
+            data.tasks,
+            (a, b) => new Date(b.created_at) - new Date(a.created_at) || b.id - a.id
+          )
+        );
+        setMeetings((prev) =>
+          mergeChanges(
+            prev,
+            data.meetings,
+            (a, b) => new Date(a.start_time) - new Date(b.start_time) || a.id - b.id
+          )
+        );
+        versionRef.current = data.version;
+        more = data.more;
+      }
+    } catch (error) {
+      console.error("Error fetching changes:", error);
+    }
+  };
+
+  const isLive = () => socketRef.current?.readyState === WebSocket.OPEN;
+
+  const applyEvent = ({ event, data }) => {
+    if (event === "task.due" || event === "meeting.reminder") {
+      setReminder({ key: `${event}:${data.id}`, text: reminderText(event, data) });
+      return;
+    }
+
+    const [kind, action] = event.split(".");
+    let changes;
+    if (action === "deleted") {
+      changes = { upserted: [], deleted: [data.id] };
+    } else if (ROW_ACTIONS.has(action)) {
+      changes = { upserted: [data], deleted: [] };
+    } else {
+      return;
+    }
+
+    if (kind === "task") {
+      setTasks((prev) =>
+        mergeChanges(
+          prev,
+          changes,
+          (a, b) => new Date(b.created_at) - new Date(a.created_at) || b.id - a.id
+        )
+      );
+    } else if (kind === "meeting") {
+      setMeetings((prev) =>
+        mergeChanges(
+          prev,
+          changes,
+          (a, b) => new Date(a.start_time) - new Date(b.start_time) || a.id - b.id
+        )
+      );
+    }
+  };
+
+  const connectUpdates = () => {
+    const socket = new WebSocket("ws://localhost:8000/ws/updates");
+    socketRef.current = socket;
+    socket.onmessage = (message) => applyEvent(JSON.parse(message.data));
+    socket.onclose = () => {
+      if (socketRef.current !== socket) return;
+      // Reconnect and catch up on anything missed while disconnected
+      setTimeout(() => {
+        if (socketRef.current !== socket) return;
+        fetchChanges();
+        connectUpdates();
+      }, 2000);
+    };
+  };
+
   const handleCompleteTask = async (taskId) => {
     try {
       const response = await fetch("http://localhost:8000/api/chat", {
@@ -69,8 +199,8 @@ const Dashboard = () => {
         throw new Error("Failed to complete task");
       }
 
-      // Refresh the dashboard
-      fetchData();
+      // The live feed delivers the change; otherwise pull it
+      if (!isLive()) fetchChanges();
     } catch (error) {
       console.error("Error completing task:", error);
     }
@@ -92,8 +222,8 @@ const Dashboard = () => {
         throw new Error("Failed to delete task");
       }
 
-      // Refresh the dashboard
-      fetchData();
+      // The live feed delivers the change; otherwise pull it
+      if (!isLive()) fetchChanges();
     } catch (error) {
       console.error("Error deleting task:", error);
     }
@@ -117,8 +247,8 @@ const Dashboard = () => {
         throw new Error("Failed to delete meeting");
       }
 
-      // Refresh the dashboard
-      fetchData();
+      // The live feed delivers the change; otherwise pull it
+      if (!isLive()) fetchChanges();
     } catch (error) {
       console.error("Error deleting meeting:", error);
     }
@@ -126,9 +256,16 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchData();
-    // Listen for updates from chat
-    window.addEventListener("dashboardUpdate", fetchData);
-    return () => window.removeEventListener("dashboardUpdate", fetchData);
+    connectUpdates();
+    // Listen for updates from chat, only needed while the live feed is down
+    const handleUpdate = () => !isLive() && fetchChanges();
+    window.addEventListener("dashboardUpdate", handleUpdate);
+    return () => {
+      window.removeEventListener("dashboardUpdate", handleUpdate);
+      const socket = socketRef.current;
+      socketRef.current = null;
+      socket?.close();
+    };
   }, []);
 
   if (loading) {
@@ -336,6 +473,18 @@ const Dashboard = () => {
           )}
         </List>
       </Paper>
+
+      <Snackbar
+        key={reminder?.key}
+        open={reminder !== null}
+        autoHideDuration={10000}
+        onClose={(_, reason) => reason !== "clickaway" && setReminder(null)}
+        anchorOrigin={{ vertical: "bottom", horizontal: "right" }}
+      >
+        <Alert severity="info" onClose={() => setReminder(null)} sx={{ width: "100%" }}>
+          {reminder?.text}
+        </Alert>
+      </Snackbar>
     </Box>
   );
 };